@@ -1,12 +1,69 @@
 """
 Application Flask DSN - Gestion de la norme DSN
 """
-from flask import Flask, render_template, request
+from flask import Flask, g, jsonify, make_response, render_template, request, url_for
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.utils import secure_filename
 import sqlite3
 import pandas as pd
 import os
+import time
+
+import dsn_api
+import dsn_faits
+import dsn_jobs
+import dsn_metrics
+import dsn_timing
+from dsn_cache import ParseCache
+from dsn_header import scan_header, verifier_entetes
+from dsn_ingestion import est_archive, format_taille, ingerer_archive, ingerer_upload
+from dsn_jobs import FileJobs
+from dsn_records import Enregistrement, LigneEffectif, MontantsParType
+from dsn_timing import Chronometre
+
+
+class DSNJSONProvider(DefaultJSONProvider):
+    """Sérialise aussi les enregistrements compacts (salariés, rémunérations) pour |tojson"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (Enregistrement, LigneEffectif, MontantsParType)):
+            return dict(o.items())
+        return DefaultJSONProvider.default(o)
+
 
 app = Flask(__name__)
+app.json = DSNJSONProvider(app)
+
+# Nombre de processus pour le parsing des fichiers DSN (0 = nombre de cœurs)
+app.config['DSN_PARSE_WORKERS'] = int(os.environ.get('DSN_PARSE_WORKERS', 0)) or None
+
+# Mesure du temps par étape des analyses (ligne de log "Timing {...}") et en-tête Server-Timing
+app.config['DSN_TIMING'] = dsn_timing.TIMING_ACTIF
+app.config['DSN_SERVER_TIMING'] = dsn_timing.SERVER_TIMING_ACTIF
+# Métriques Prometheus (/metrics), si prometheus_client est installé
+app.config['DSN_METRICS'] = dsn_metrics.METRICS_ACTIF
+
+# Cache des fichiers déjà parsés (empreinte du contenu), pour les recalculs avec keep_files
+parse_cache = ParseCache(
+    max_disk_bytes=int(os.environ.get('DSN_CACHE_MAX_MB', 512)) * 1024 * 1024
+)
+
+# Analyses exécutées en arrière-plan par des workers (file de jobs SQLite, voir dsn_jobs)
+app.config['DSN_JOBS'] = os.environ.get('DSN_JOBS', '1') not in ('', '0')
+# Nombre de workers d'analyse démarrés à la demande (0 = workers lancés à part : python dsn_jobs.py)
+app.config['DSN_JOBS_WORKERS'] = int(os.environ.get('DSN_JOBS_WORKERS', 1))
+
+file_jobs = FileJobs()
+
+# Fichiers uploadés parsés pendant la lecture de la requête (empreinte et en-tête dans le même passage)
+app.config['DSN_INGESTION_FLUX'] = os.environ.get('DSN_INGESTION_FLUX', '1') not in ('', '0')
+# Conserver la copie des fichiers reçus dans uploads/ (nécessaire pour recalculer avec keep_files)
+app.config['DSN_CONSERVER_FICHIERS'] = os.environ.get('DSN_CONSERVER_FICHIERS', '1') not in ('', '0')
+
+# Base de faits SQLite : fichiers reçus en flux chargés dans dsn.db (DSN_FAITS, voir dsn_faits)
+app.config['DSN_FAITS'] = dsn_faits.FAITS_ACTIF
+base_faits = dsn_faits.BaseFaits() if app.config['DSN_FAITS'] else None
 
 # Créer le dossier uploads au démarrage si inexistant
 UPLOAD_FOLDER = 'uploads'
@@ -20,6 +77,190 @@ if not os.path.exists(UPLOAD_FOLDER):
             pass
     print(f"✅ Dossier '{UPLOAD_FOLDER}/' créé")
 
+@app.before_request
+def debut_requete():
+    g.debut_requete = time.perf_counter()
+
+@app.after_request
+def latence_requete(reponse):
+    """Latence de chaque requête par règle de route (pages, API, statiques, réponses d'erreur)"""
+    _observer_requete(reponse.status_code)
+    return reponse
+
+@app.teardown_request
+def fin_requete(exception=None):
+    """Requête terminée sans passer par after_request (exception non gérée) : comptée en 500"""
+    _observer_requete(500)
+
+def _observer_requete(statut: int):
+    debut = g.pop('debut_requete', None)
+    if debut is None or not app.config['DSN_METRICS']:
+        return
+    route = request.url_rule.rule if request.url_rule is not None else '<aucune>'
+    dsn_metrics.observer_requete(route, statut, time.perf_counter() - debut)
+
+def nouveau_chronometre() -> Chronometre:
+    """Chronomètre d'une requête d'analyse (actif si le timing ou les métriques sont activés)"""
+    return Chronometre(actif=app.config['DSN_TIMING'] or app.config['DSN_SERVER_TIMING']
+                       or app.config['DSN_METRICS'])
+
+def reponse_chronometree(html: str, chrono: Chronometre, route: str):
+    """Réponse HTML avec, si activés, la ligne de log des durées, l'en-tête Server-Timing et les métriques"""
+    reponse = make_response(html)
+    if chrono.actif:
+        if app.config['DSN_TIMING'] or app.config['DSN_SERVER_TIMING']:
+            chrono.journaliser(route)
+        if app.config['DSN_SERVER_TIMING']:
+            reponse.headers['Server-Timing'] = chrono.server_timing()
+        if app.config['DSN_METRICS']:
+            dsn_metrics.enregistrer(route, chrono)
+    return reponse
+
+def client_json() -> bool:
+    """Le client attend du JSON (appel d'API) plutôt qu'une page HTML"""
+    return request.accept_mimetypes.best == 'application/json'
+
+def soumettre_job(type_job: str, parametres: dict, contexte: dict) -> dict:
+    """Enregistre une analyse dans la file de jobs et s'assure qu'un worker la traitera"""
+    job_id = file_jobs.soumettre(type_job, parametres, contexte,
+                                 fichiers_total=len(contexte.get('files_info', [])))
+    file_jobs.assurer_workers(app.config['DSN_JOBS_WORKERS'])
+    return file_jobs.lire(job_id)
+
+def lire_job(job_id: str, type_job: str):
+    """
+    Job d'une page et son résultat s'il est terminé
+
+    Returns:
+        Tuple (job ou None, résultat ou None, message d'erreur ou None)
+    """
+    job = file_jobs.lire(job_id)
+    if job is None or job['type'] != type_job:
+        return None, None, "Analyse introuvable (expirée ou supprimée)"
+    if job['statut'] == dsn_jobs.ERREUR:
+        return job, None, job['erreur']
+    if job['statut'] != dsn_jobs.TERMINE:
+        return job, None, None
+    try:
+        return job, file_jobs.resultat(job_id), None
+    except FileNotFoundError:
+        return job, None, "Résultat de l'analyse expiré, veuillez relancer l'analyse"
+
+def statut_job(job: dict) -> dict:
+    """Avancement public d'un job (page de suivi et /jobs/<id>)"""
+    return {
+        'id': job['id'],
+        'type': job['type'],
+        'statut': job['statut'],
+        'etape': job['etape'],
+        'fichiers_total': job['fichiers_total'],
+        'fichiers_parses': job['fichiers_parses'],
+        'lignes': job['lignes'],
+        'lignes_par_seconde': job['lignes_par_seconde'],
+        'erreur': job['erreur'],
+        'url_statut': url_for('statut_job_route', job_id=job['id']),
+        # Le type de job est le nom de la route de la page (egalite_hf, evolution_effectif)
+        'url_resultat': url_for(job['type'], job=job['id']),
+    }
+
+def reponse_job(job: dict):
+    """Réponse JSON 202 d'un job en cours (client d'API)"""
+    statut = statut_job(job)
+    return jsonify(statut), 202, {'Location': statut['url_statut']}
+
+def recevoir_fichiers(files: list, upload_folder: str, chrono: Chronometre, api: bool = False):
+    """
+    Reçoit les fichiers uploadés (DSN ou archives .zip / .gz de DSN mensuelles)
+
+    Args:
+        api: Appel d'API : fichiers toujours parsés en flux et jamais copiés dans uploads/
+             (pas de recalcul keep_files, et pas de collision entre entreprises de même nom de fichier)
+
+    Returns:
+        Tuple (infos des fichiers : filename, size, path (None sans copie), ..., parser des
+        fichiers reçus en flux (voir parsers_recus), message d'erreur ou None)
+    """
+    if not os.path.exists(upload_folder):
+        os.makedirs(upload_folder)
+    conserver = app.config['DSN_CONSERVER_FICHIERS'] and not api
+
+    files_info = []
+    for file in files:
+        if not file.filename:
+            continue
+        # Nom sans dossier ni point initial : un upload ne doit pas pouvoir écrire dans les
+        # dossiers de uploads/ qui contiennent des pickles (.cache, .jobs, .espaces)
+        file.filename = secure_filename(file.filename)
+        if not file.filename:
+            return files_info, "Nom de fichier invalide"
+        filepath = os.path.join(upload_folder, file.filename)
+
+        if est_archive(file.filename):
+            # Archive : chaque mois est décompressé en flux et parsé, sans extraction sur disque
+            with chrono.etape('ingestion'):
+                try:
+                    files_info.extend(ingerer_archive(file, upload_folder, conserver=conserver,
+                                                      cache=parse_cache, chrono=chrono, faits=base_faits))
+                except ValueError as e:
+                    return files_info, str(e)
+        elif app.config['DSN_INGESTION_FLUX'] or api:
+            # Une seule lecture : parsing, empreinte, en-tête et copie du fichier
+            with chrono.etape('ingestion'):
+                files_info.append(ingerer_upload(file, filepath, conserver=conserver,
+                                                 cache=parse_cache, chrono=chrono, faits=base_faits))
+        else:
+            with chrono.etape('sauvegarde'):
+                file.save(filepath)
+            files_info.append({
+                'filename': file.filename,
+                'size': format_taille(os.path.getsize(filepath)),
+                'path': filepath
+            })
+    return files_info, None
+
+def parsers_recus(files_info: list):
+    """
+    Retire des infos des fichiers les parsers obtenus à la réception (voir dsn_ingestion)
+
+    Les infos des fichiers peuvent ensuite être sérialisées (job, template) ; les parsers
+    sont passés directement à l'analyse faite dans la requête.
+
+    Returns:
+        Parsers dans l'ordre de files_info (None pour un fichier non reçu dans la requête),
+        ou None si aucun fichier n'a été reçu
+    """
+    parsers = [file_info.pop('parser', None) for file_info in files_info]
+    return parsers if any(parser is not None for parser in parsers) else None
+
+def fichiers_api(chrono: Chronometre):
+    """
+    Fichiers d'un appel d'API (champ dsn_files : DSN ou archives), triés et contrôlés
+
+    Les fichiers ne sont jamais copiés dans uploads/ (path None) : l'analyse utilise les
+    parsers obtenus à leur réception, sans dépendre du cache de parsing.
+
+    Returns:
+        Tuple (files_info, parsers dans l'ordre de files_info, message d'erreur ou None)
+    """
+    files = [file for file in request.files.getlist('dsn_files') if file.filename]
+    if not files:
+        return [], None, "Aucun fichier DSN (champ dsn_files)"
+
+    files_info, erreur = recevoir_fichiers(files, UPLOAD_FOLDER, chrono, api=True)
+    if not erreur:
+        with chrono.etape('entetes'):
+            files_info, erreur = verifier_entetes(files_info)
+    return files_info, parsers_recus(files_info), erreur
+
+def reponse_api(data: dict, chrono: Chronometre, route: str, status: int = 200):
+    """Réponse JSON compacte d'un appel d'API (durées et métriques comme pour les pages)"""
+    with chrono.etape('serialisation'):
+        corps = dsn_api.serialiser(data)
+    reponse = reponse_chronometree(corps, chrono, route)
+    reponse.status_code = status
+    reponse.mimetype = 'application/json'
+    return reponse
+
 def get_db_connection():
     """Connexion à la base de données SQLite"""
     conn = sqlite3.connect('dsn.db')
@@ -31,6 +272,22 @@ def accueil():
     """Page d'accueil"""
     return render_template('accueil.html')
 
+@app.route('/metrics')
+def metrics():
+    """Métriques Prometheus (latences, parsing, caches, mémoire), agrégées sur les workers gunicorn"""
+    if not app.config['DSN_METRICS']:
+        return "Métriques indisponibles (prometheus_client non installé ou DSN_METRICS=0)", 501
+    contenu, content_type = dsn_metrics.exposer()
+    return contenu, 200, {'Content-Type': content_type}
+
+@app.route('/jobs/<job_id>')
+def statut_job_route(job_id):
+    """Avancement d'une analyse en arrière-plan (interrogé par la page toutes les secondes)"""
+    job = file_jobs.lire(job_id)
+    if job is None:
+        return jsonify({'erreur': "Analyse introuvable"}), 404
+    return jsonify(statut_job(job))
+
 @app.route('/structures')
 def structures():
     """Page des structures hiérarchiques DSN"""
@@ -159,13 +416,15 @@ def analyse():
 def egalite_hf():
     """Page indicateur égalité homme-femme"""
     import os
-    from dsn_parser import DSNParser
+    from dsn_analyses import analyser_egalite_hf
 
     upload_success = False
     upload_error = None
     files_info = []
     analyse_data = None
+    job = None
     upload_folder = 'uploads'
+    chrono = nouveau_chronometre()
 
     if request.method == 'POST':
         # Vérifier si on doit garder des fichiers déjà uploadés
@@ -174,8 +433,9 @@ def egalite_hf():
         if keep_files:
             # Recalculer avec les fichiers existants
             for keep_file in keep_files:
+                keep_file = secure_filename(keep_file)
                 filepath = os.path.join(upload_folder, keep_file)
-                if os.path.exists(filepath):
+                if keep_file and os.path.isfile(filepath):
                     file_size = os.path.getsize(filepath)
                     files_info.append({
                         'filename': keep_file,
@@ -190,25 +450,18 @@ def egalite_hf():
             files = request.files.getlist('dsn_files')
             if not files or files[0].filename == '':
                 upload_error = "Aucun fichier sélectionné"
-            elif len(files) > 12:
-                upload_error = "Vous ne pouvez uploader que 12 fichiers maximum"
             else:
-                # Sauvegarder les fichiers
-                if not os.path.exists(upload_folder):
-                    os.makedirs(upload_folder)
-
-                for file in files:
-                    if file.filename:
-                        filepath = os.path.join(upload_folder, file.filename)
-                        file.save(filepath)
-
-                        # Récupérer les infos du fichier
-                        file_size = os.path.getsize(filepath)
-                        files_info.append({
-                            'filename': file.filename,
-                            'size': f"{file_size / 1024:.2f} KB" if file_size < 1024*1024 else f"{file_size / (1024*1024):.2f} MB",
-                            'path': filepath
-                        })
+                # Recevoir les fichiers (parsés pendant la lecture de la requête, voir dsn_ingestion)
+                files_info, upload_error = recevoir_fichiers(files, upload_folder, chrono)
+
+        # Lire les en-têtes (mois déclaré, SIRET) pour trier et contrôler les fichiers avant le parsing
+        if files_info and not upload_error:
+            with chrono.etape('entetes'):
+                for file_info in files_info:
+                    if 'entete' not in file_info:
+                        file_info['entete'] = scan_header(file_info['path'])
+                files_info, upload_error = verifier_entetes(files_info)
+        parsers = parsers_recus(files_info)
 
         # Si on a des fichiers (nouveaux ou existants), les analyser
         if files_info and not upload_error:
@@ -230,63 +483,78 @@ def egalite_hf():
                 except:
                     pass
 
-            # Analyser les fichiers DSN
-            try:
-                # Parser pour chaque fichier
-                parsers = []
-                for file_info in files_info:
-                    parser = DSNParser()
-                    parser.parse_file(file_info['path'])
-                    parsers.append(parser)
-
-                # Si un seul fichier, utiliser le mode classique
-                if len(parsers) == 1:
-                    analyse_data = parsers[0].get_results(
-                        types_filtres=types_selectionnes,
-                        date_reference=date_reference
-                    )
-                else:
-                    # Mode multi-mois : analyser les données comparatives
-                    analyse_data = parsers[0].get_results_multi_mois(
-                        parsers_list=parsers,
-                        types_filtres=types_selectionnes,
-                        date_reference=date_reference
-                    )
-
-                upload_success = True
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                upload_error = f"Erreur lors de l'analyse des fichiers : {str(e)}"
+            parametres = {
+                'chemins': [file_info['path'] for file_info in files_info],
+                'empreintes': [file_info.get('empreinte') for file_info in files_info],
+                'types_selectionnes': types_selectionnes,
+                'date_reference': date_reference
+            }
+            contexte = {
+                'files_info': files_info,
+                'types_selectionnes': types_selectionnes,
+                'date_reference_form': date_reference_html
+            }
+
+            if app.config['DSN_JOBS']:
+                # Analyse en arrière-plan : la page affiche l'avancement puis le résultat
+                job = soumettre_job('egalite_hf', parametres, contexte)
+            else:
+                # Analyser les fichiers DSN dans la requête
+                try:
+                    analyse_data = analyser_egalite_hf(**parametres, parsers=parsers,
+                                                       workers=app.config['DSN_PARSE_WORKERS'],
+                                                       cache=parse_cache, chrono=chrono)
+                    upload_success = True
+                except Exception as e:
+                    import traceback
+                    traceback.print_exc()
+                    upload_error = f"Erreur lors de l'analyse des fichiers : {str(e)}"
+
+    elif request.args.get('job'):
+        # Résultat (ou avancement) d'une analyse exécutée en arrière-plan
+        job, analyse_data, upload_error = lire_job(request.args['job'], 'egalite_hf')
+        if job is not None:
+            files_info = job['contexte'].get('files_info', [])
+            upload_success = analyse_data is not None
 
     # Récupérer les types sélectionnés et la date de référence pour les passer au template
-    types_selectionnes = request.form.getlist('types_remuneration') if request.method == 'POST' else ['003']
-    if not types_selectionnes:
-        types_selectionnes = ['003']
-
-    date_reference_form = request.form.get('date_reference', '') if request.method == 'POST' else ''
-
-    return render_template('egalite_hf.html',
-                         upload_success=upload_success,
-                         upload_error=upload_error,
-                         files_info=files_info,
-                         analyse=analyse_data,
-                         types_selectionnes=types_selectionnes,
-                         date_reference_form=date_reference_form)
+    if job is not None:
+        types_selectionnes = job['contexte'].get('types_selectionnes') or ['003']
+        date_reference_form = job['contexte'].get('date_reference_form', '')
+    else:
+        types_selectionnes = request.form.getlist('types_remuneration') if request.method == 'POST' else ['003']
+        if not types_selectionnes:
+            types_selectionnes = ['003']
+
+        date_reference_form = request.form.get('date_reference', '') if request.method == 'POST' else ''
+
+    if job is not None and job['statut'] not in (dsn_jobs.TERMINE, dsn_jobs.ERREUR) and client_json():
+        return reponse_job(job)
+
+    with chrono.etape('rendu'):
+        html = render_template('egalite_hf.html',
+                               upload_success=upload_success,
+                               upload_error=upload_error,
+                               files_info=files_info,
+                               analyse=analyse_data,
+                               types_selectionnes=types_selectionnes,
+                               date_reference_form=date_reference_form,
+                               job=statut_job(job) if job is not None else None)
+    return reponse_chronometree(html, chrono, 'egalite_hf')
 
 @app.route('/evolution-effectif', methods=['GET', 'POST'])
 def evolution_effectif():
     """Page d'évolution de l'effectif"""
     import os
-    from dsn_parser import DSNParser
-    from datetime import datetime
-    from collections import defaultdict
+    from dsn_analyses import analyser_evolution_effectif
 
     upload_success = False
     upload_error = None
     files_info = []
     evolution_data = None
+    job = None
     upload_folder = 'uploads'
+    chrono = nouveau_chronometre()
 
     if request.method == 'POST':
         # Vérifier si on doit garder des fichiers déjà uploadés
@@ -295,8 +563,9 @@ def evolution_effectif():
         if keep_files:
             # Recalculer avec les fichiers existants
             for keep_file in keep_files:
+                keep_file = secure_filename(keep_file)
                 filepath = os.path.join(upload_folder, keep_file)
-                if os.path.exists(filepath):
+                if keep_file and os.path.isfile(filepath):
                     file_size = os.path.getsize(filepath)
                     files_info.append({
                         'filename': keep_file,
@@ -311,472 +580,225 @@ def evolution_effectif():
             files = request.files.getlist('dsn_files')
             if not files or files[0].filename == '':
                 upload_error = "Aucun fichier sélectionné"
-            elif len(files) > 24:
-                upload_error = "Vous ne pouvez uploader que 24 fichiers maximum"
             else:
-                # Sauvegarder les fichiers
-                if not os.path.exists(upload_folder):
-                    os.makedirs(upload_folder)
-
-                for file in files:
-                    if file.filename:
-                        filepath = os.path.join(upload_folder, file.filename)
-                        file.save(filepath)
-
-                        # Récupérer les infos du fichier
-                        file_size = os.path.getsize(filepath)
-                        files_info.append({
-                            'filename': file.filename,
-                            'size': f"{file_size / 1024:.2f} KB" if file_size < 1024*1024 else f"{file_size / (1024*1024):.2f} MB",
-                            'path': filepath
-                        })
+                # Recevoir les fichiers (parsés pendant la lecture de la requête, voir dsn_ingestion)
+                files_info, upload_error = recevoir_fichiers(files, upload_folder, chrono)
+
+        # Lire les en-têtes (mois déclaré, SIRET) pour trier et contrôler les fichiers avant le parsing
+        if files_info and not upload_error:
+            with chrono.etape('entetes'):
+                for file_info in files_info:
+                    if 'entete' not in file_info:
+                        file_info['entete'] = scan_header(file_info['path'])
+                files_info, upload_error = verifier_entetes(files_info)
+        parsers = parsers_recus(files_info)
 
         # Si on a des fichiers (nouveaux ou existants), les analyser
         if files_info and not upload_error:
-            try:
-                # Fonction pour convertir la date DSN en libellé
-                def format_date_dsn(date_str):
-                    """Convertit une date DSN (01MMYYYY) en 'MOIS ANNEE'"""
-                    if not date_str or len(date_str) != 8:
-                        return "Date invalide"
-                    mois_names = {
-                        '01': 'JANVIER', '02': 'FÉVRIER', '03': 'MARS',
-                        '04': 'AVRIL', '05': 'MAI', '06': 'JUIN',
-                        '07': 'JUILLET', '08': 'AOÛT', '09': 'SEPTEMBRE',
-                        '10': 'OCTOBRE', '11': 'NOVEMBRE', '12': 'DÉCEMBRE'
-                    }
-                    mois = date_str[2:4]
-                    annee = date_str[4:8]
-                    return f"{mois_names.get(mois, mois)} {annee}"
+            if app.config['DSN_JOBS']:
+                # Analyse en arrière-plan : la page affiche l'avancement puis le résultat
+                job = soumettre_job('evolution_effectif', {'files_info': files_info},
+                                    {'files_info': files_info})
+            else:
+                try:
+                    files_info, evolution_data = analyser_evolution_effectif(
+                        files_info, parsers=parsers, workers=app.config['DSN_PARSE_WORKERS'],
+                        cache=parse_cache, chrono=chrono
+                    )
+                    upload_success = True
+                except Exception as e:
+                    import traceback
+                    traceback.print_exc()
+                    upload_error = f"Erreur lors de l'analyse des fichiers : {str(e)}"
+
+    elif request.args.get('job'):
+        # Résultat (ou avancement) d'une analyse exécutée en arrière-plan
+        job, resultat, upload_error = lire_job(request.args['job'], 'evolution_effectif')
+        if job is not None:
+            files_info = job['contexte'].get('files_info', [])
+        if resultat is not None:
+            files_info, evolution_data = resultat
+            upload_success = True
+
+    if job is not None and job['statut'] not in (dsn_jobs.TERMINE, dsn_jobs.ERREUR) and client_json():
+        return reponse_job(job)
+
+    with chrono.etape('rendu'):
+        html = render_template('evolution_effectif.html',
+                               upload_success=upload_success,
+                               upload_error=upload_error,
+                               files_info=files_info,
+                               evolution=evolution_data,
+                               job=statut_job(job) if job is not None else None)
+    return reponse_chronometree(html, chrono, 'evolution_effectif')
+
+@app.route('/api/v1/index', methods=['POST'])
+def api_index():
+    """
+    Index Égalité en JSON (appels programmatiques)
+
+    Formulaire multipart : dsn_files (fichiers DSN ou archives .zip / .gz), types_remuneration
+    (codes, par défaut 003), date_reference (YYYY-MM-DD ou DDMMYYYY, optionnelle).
+    Réponse : fichiers analysés et indicateurs, sans le détail des salariés.
+    """
+    from dsn_analyses import analyser_egalite_hf
+
+    chrono = nouveau_chronometre()
+    files_info, parsers, erreur = fichiers_api(chrono)
+    try:
+        date_reference = dsn_api.date_reference_api(request.form.get('date_reference'))
+    except ValueError:
+        erreur = erreur or "date_reference invalide (YYYY-MM-DD ou DDMMYYYY)"
+    if erreur:
+        return reponse_api({'erreur': erreur}, chrono, 'api_index', 400)
 
-                # Parser chaque fichier et extraire les dates
-                files_data = []
-                for file_info in files_info:
-                    parser = DSNParser()
-                    parser.parse_file(file_info['path'])
-
-                    date_declaration = parser.date_declaration or ""
-
-                    # Créer une clé de tri au format YYYYMM pour trier par année puis par mois
-                    # Format date_declaration: "01MMYYYY" (ex: "01012024")
-                    if date_declaration and len(date_declaration) == 8:
-                        annee = date_declaration[4:8]  # YYYY
-                        mois = date_declaration[2:4]   # MM
-                        date_sort_key = annee + mois   # YYYYMM (ex: "202401")
-                    else:
-                        date_sort_key = '999999'  # Valeur par défaut si pas de date
-
-                    files_data.append({
-                        'parser': parser,
-                        'filename': file_info['filename'],
-                        'size': file_info['size'],
-                        'path': file_info['path'],
-                        'date_declaration': date_declaration,
-                        'date_sort_key': date_sort_key  # Pour le tri au format YYYYMM
-                    })
+    try:
+        resultats = analyser_egalite_hf([file_info['path'] for file_info in files_info],
+                                        request.form.getlist('types_remuneration') or ['003'],
+                                        date_reference=date_reference,
+                                        empreintes=[file_info.get('empreinte') for file_info in files_info],
+                                        complet=False, parsers=parsers,
+                                        workers=app.config['DSN_PARSE_WORKERS'],
+                                        cache=parse_cache, chrono=chrono)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return reponse_api({'erreur': f"Erreur lors de l'analyse des fichiers : {str(e)}"},
+                           chrono, 'api_index', 500)
 
-                # Trier les fichiers par date de déclaration (année puis mois)
-                files_data.sort(key=lambda x: x['date_sort_key'])
-
-                # Calculer la longueur maximale des labels de date pour l'alignement
-                max_date_length = 0
-                for file_data in files_data:
-                    if file_data['date_declaration']:
-                        date_label = format_date_dsn(file_data['date_declaration'])
-                        max_date_length = max(max_date_length, len(date_label))
-
-                # Mettre à jour files_info avec les données triées et formatées
-                files_info_sorted = []
-                parsers = []
-                mois_labels = []
-                periodes = []  # Liste des périodes seules (MOIS ANNEE)
-                for file_data in files_data:
-                    parsers.append(file_data['parser'])
-
-                    # Formater le label pour l'affichage avec alignement
-                    if file_data['date_declaration']:
-                        date_label = format_date_dsn(file_data['date_declaration'])
-                        # Ajouter des espaces pour aligner les ":"
-                        padding = ' ' * (max_date_length - len(date_label))
-                        label = f"DSN {date_label}{padding} : {file_data['filename']}"
-                        display_label = f"{date_label}{padding} : {file_data['filename']}"
-                        periodes.append(date_label)  # Stocker uniquement la période
-                    else:
-                        label = f"DSN : {file_data['filename']}"
-                        display_label = file_data['filename']
-                        periodes.append(file_data['filename'])  # Fallback si pas de date
-
-                    mois_labels.append(label)
-                    files_info_sorted.append({
-                        'filename': file_data['filename'],
-                        'size': file_data['size'],
-                        'path': file_data['path'],
-                        'display_label': display_label
-                    })
+    return reponse_api({'version': dsn_api.VERSION_API, 'fichiers': dsn_api.fichiers_api(files_info),
+                        **resultats}, chrono, 'api_index')
 
-                # Remplacer files_info par la version triée et formatée
-                files_info = files_info_sorted
-
-                # Calculer l'évolution de l'effectif
-                evolution_data = {
-                    'mois': [],
-                    'periodes': [],  # Périodes seules (MOIS ANNEE)
-                    'effectif_total': [],
-                    'effectif_hommes': [],
-                    'effectif_femmes': [],
-                    'par_groupe': defaultdict(list),  # Répartition par groupe de CSP (21-26)
-                    'entrees': [],
-                    'sorties': [],
-                    'entrees_details': [],  # Détails des entrées (nom, prénom, date d'embauche)
-                    'sorties_details': [],  # Détails des sorties (nom, prénom)
-                    'age_moyen': [],  # Âge moyen global par mois
-                    'age_moyen_hommes': [],  # Âge moyen des hommes par mois
-                    'age_moyen_femmes': [],  # Âge moyen des femmes par mois
-                    'salaries_details': [],  # Détails complets de tous les salariés par période
-                    'fichiers': [f['filename'] for f in files_info]
-                }
-
-                # Fonction pour vérifier si une date (DDMMYYYY) correspond au mois de la déclaration (01MMYYYY)
-                def date_dans_mois(date_ddmmyyyy, date_declaration):
-                    """Vérifie si une date DDMMYYYY correspond au mois de la date_declaration 01MMYYYY"""
-                    if not date_ddmmyyyy or len(date_ddmmyyyy) != 8:
-                        return False
-                    if not date_declaration or len(date_declaration) != 8:
-                        return False
-
-                    # Extraire mois et année
-                    mois_date = date_ddmmyyyy[2:4]
-                    annee_date = date_ddmmyyyy[4:8]
-                    mois_decl = date_declaration[2:4]
-                    annee_decl = date_declaration[4:8]
-
-                    return mois_date == mois_decl and annee_date == annee_decl
-
-                for idx, parser in enumerate(parsers):
-                    # Récupérer la date de déclaration du mois en cours
-                    date_declaration_mois = files_data[idx]['date_declaration']
-
-                    # Compter les salariés actifs ce mois
-                    effectif_h = 0
-                    effectif_f = 0
-                    groupe_count = defaultdict(int)  # Comptage par groupe (21-26)
-
-                    # Listes pour stocker les entrées et sorties du mois
-                    entrees_list = []
-                    sorties_list = []
-
-                    # Listes pour calculer l'âge moyen par sexe
-                    ages_hommes = []
-                    ages_femmes = []
-
-                    # Liste pour stocker les détails de tous les salariés de ce mois
-                    salaries_mois = []
-
-                    # Calculer la date de référence pour ce mois (dernier jour du mois)
-                    if date_declaration_mois and len(date_declaration_mois) == 8:
-                        mois_ref = int(date_declaration_mois[2:4])
-                        annee_ref = int(date_declaration_mois[4:8])
-                        # Dernier jour du mois
-                        if mois_ref == 12:
-                            dernier_jour_ref = 31
-                        elif mois_ref in [4, 6, 9, 11]:
-                            dernier_jour_ref = 30
-                        elif mois_ref == 2:
-                            # Année bissextile
-                            if (annee_ref % 4 == 0 and annee_ref % 100 != 0) or (annee_ref % 400 == 0):
-                                dernier_jour_ref = 29
-                            else:
-                                dernier_jour_ref = 28
-                        else:
-                            dernier_jour_ref = 31
-                        date_ref_mois = datetime(annee_ref, mois_ref, dernier_jour_ref)
-                    else:
-                        date_ref_mois = None
-
-                    if hasattr(parser, 'stats') and 'salaries' in parser.stats:
-                        for sal in parser.stats['salaries']:
-                            # Utiliser le matricule (S21.G00.30.019) comme identifiant unique
-                            matricule = sal.get('matricule', '')
-                            nir = sal.get('nir', '')
-                            groupe = sal.get('groupe', 'Non renseigné')  # Groupe de CSP (textuel)
-                            groupe_code = sal.get('groupe_code', None)  # Code groupe (21-26)
-                            csp = sal.get('csp', None)  # Code CSP (2 chiffres)
-                            csp_libelle = sal.get('csp_libelle', '')  # Libellé de la CSP
-                            date_embauche = sal.get('date_embauche', '')
-                            date_sortie = sal.get('date_sortie', '')
-                            date_naissance = sal.get('date_naissance', '')
-
-                            # Utiliser le matricule si disponible, sinon le NIR
-                            identifiant = matricule if matricule else nir
-                            if identifiant:
-                                # Déterminer le sexe à partir du premier caractère du NIR
-                                sexe = None
-                                sexe_libelle = ''
-                                if nir and len(nir) > 0:
-                                    premier_char = nir[0]
-                                    if premier_char == '1':
-                                        effectif_h += 1
-                                        sexe = 'H'
-                                        sexe_libelle = 'Homme'
-                                    elif premier_char == '2':
-                                        effectif_f += 1
-                                        sexe = 'F'
-                                        sexe_libelle = 'Femme'
-
-                                # Compter par code groupe numérique (21-26) si disponible
-                                if groupe_code:
-                                    groupe_count[groupe_code] += 1
-
-                                # Calculer l'âge pour ce mois
-                                age_calcule = None
-                                if date_naissance and len(date_naissance) == 8 and date_ref_mois and sexe:
-                                    try:
-                                        jour_naiss = int(date_naissance[0:2])
-                                        mois_naiss = int(date_naissance[2:4])
-                                        annee_naiss = int(date_naissance[4:8])
-                                        date_naiss = datetime(annee_naiss, mois_naiss, jour_naiss)
-
-                                        # Calculer l'âge
-                                        age = date_ref_mois.year - date_naiss.year
-                                        if (date_ref_mois.month, date_ref_mois.day) < (date_naiss.month, date_naiss.day):
-                                            age -= 1
-
-                                        age_calcule = age
-
-                                        if sexe == 'H':
-                                            ages_hommes.append(age)
-                                        elif sexe == 'F':
-                                            ages_femmes.append(age)
-                                    except (ValueError, IndexError):
-                                        pass
-
-                                # Vérifier si c'est une entrée ce mois
-                                est_entree = date_dans_mois(date_embauche, date_declaration_mois)
-                                if est_entree:
-                                    entrees_list.append({
-                                        'nom': sal.get('nom', 'N/A'),
-                                        'prenom': sal.get('prenom', 'N/A'),
-                                        'date_embauche': date_embauche
-                                    })
-
-                                # Vérifier si c'est une sortie ce mois
-                                est_sortie = date_dans_mois(date_sortie, date_declaration_mois)
-                                if est_sortie:
-                                    sorties_list.append({
-                                        'nom': sal.get('nom', 'N/A'),
-                                        'prenom': sal.get('prenom', 'N/A'),
-                                        'date_sortie': date_sortie
-                                    })
-
-                                # Ajouter les détails complets du salarié pour ce mois
-                                # Mapping des codes groupe vers les libellés
-                                groupe_libelle_map = {
-                                    '21': 'Ouvriers',
-                                    '22': 'Employés',
-                                    '23': 'Agents de maîtrise',
-                                    '24': 'Cadres',
-                                    '25': 'Cadres dirigeants',
-                                    '26': 'Autres'
-                                }
-                                groupe_libelle = groupe_libelle_map.get(groupe_code, groupe)
-
-                                # Récupérer le code emploi (PCS-ESE), le libellé et le statut conventionnel
-                                code_emploi = sal.get('code_pcs_ese', '')
-                                libelle_emploi = sal.get('libelle_emploi', '')
-                                statut_conv = sal.get('statut_conventionnel', '')
-
-                                salaries_mois.append({
-                                    'matricule': matricule,
-                                    'nir': nir,
-                                    'nom': sal.get('nom', ''),
-                                    'prenom': sal.get('prenom', ''),
-                                    'sexe': sexe_libelle,
-                                    'date_naissance': date_naissance,
-                                    'age': age_calcule if age_calcule is not None else '',
-                                    'groupe': groupe_libelle,  # Groupe de CSP (ex: "Ouvriers")
-                                    'groupe_code': groupe_code,  # Code groupe (ex: "21")
-                                    'csp': csp,  # Code CSP (2 chiffres, ex: "63")
-                                    'csp_libelle': csp_libelle,  # Libellé de la CSP
-                                    'code_emploi': code_emploi,
-                                    'libelle_emploi': libelle_emploi,
-                                    'statut_conventionnel': statut_conv,
-                                    'date_embauche': date_embauche,
-                                    'date_sortie': date_sortie,
-                                    'est_entree': est_entree,
-                                    'est_sortie': est_sortie
-                                })
-
-                    effectif = effectif_h + effectif_f
-
-                    # Calculer les moyennes d'âge
-                    age_moyen_h = int(round(sum(ages_hommes) / len(ages_hommes))) if ages_hommes else 0
-                    age_moyen_f = int(round(sum(ages_femmes) / len(ages_femmes))) if ages_femmes else 0
-                    # Âge moyen global (tous sexes confondus)
-                    ages_tous = ages_hommes + ages_femmes
-                    age_moyen_global = int(round(sum(ages_tous) / len(ages_tous))) if ages_tous else 0
-
-                    evolution_data['mois'].append(mois_labels[idx])
-                    evolution_data['periodes'].append(periodes[idx])  # Période seule
-                    evolution_data['effectif_total'].append(effectif)
-                    evolution_data['effectif_hommes'].append(effectif_h)
-                    evolution_data['effectif_femmes'].append(effectif_f)
-                    evolution_data['entrees_details'].append(entrees_list)
-                    evolution_data['sorties_details'].append(sorties_list)
-                    evolution_data['entrees'].append(len(entrees_list))
-                    evolution_data['sorties'].append(len(sorties_list))
-                    evolution_data['age_moyen'].append(age_moyen_global)
-                    evolution_data['age_moyen_hommes'].append(age_moyen_h)
-                    evolution_data['age_moyen_femmes'].append(age_moyen_f)
-                    evolution_data['salaries_details'].append(salaries_mois)
-
-                    # Ajouter les compteurs par groupe de CSP
-                    for groupe in ['21', '22', '23', '24', '25', '26']:
-                        evolution_data['par_groupe'][groupe].append(groupe_count.get(groupe, 0))
-
-                # Calculer les statistiques globales
-                if evolution_data['effectif_total']:
-                    evolution_data['stats'] = {
-                        'effectif_initial': evolution_data['effectif_total'][0],
-                        'effectif_final': evolution_data['effectif_total'][-1],
-                        'variation_absolue': evolution_data['effectif_total'][-1] - evolution_data['effectif_total'][0],
-                        'variation_pct': ((evolution_data['effectif_total'][-1] - evolution_data['effectif_total'][0]) / evolution_data['effectif_total'][0] * 100) if evolution_data['effectif_total'][0] > 0 else 0,
-                        'effectif_moyen': int(round(sum(evolution_data['effectif_total']) / len(evolution_data['effectif_total']))),
-                        'total_entrees': sum(evolution_data['entrees']),
-                        'total_sorties': sum(evolution_data['sorties'])
-                    }
+@app.route('/api/v1/effectif', methods=['POST'])
+def api_effectif():
+    """
+    Évolution de l'effectif en JSON (appels programmatiques)
+
+    Formulaire multipart : dsn_files (fichiers DSN ou archives .zip / .gz).
+    Réponse : fichiers analysés et séries mensuelles, sans le détail des salariés.
+    """
+    from dsn_analyses import analyser_evolution_effectif
+
+    chrono = nouveau_chronometre()
+    files_info, parsers, erreur = fichiers_api(chrono)
+    if erreur:
+        return reponse_api({'erreur': erreur}, chrono, 'api_effectif', 400)
+
+    try:
+        _, evolution_data = analyser_evolution_effectif(files_info, details=False, parsers=parsers,
+                                                        workers=app.config['DSN_PARSE_WORKERS'],
+                                                        cache=parse_cache, chrono=chrono)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return reponse_api({'erreur': f"Erreur lors de l'analyse des fichiers : {str(e)}"},
+                           chrono, 'api_effectif', 500)
+
+    return reponse_api({'version': dsn_api.VERSION_API, 'fichiers': dsn_api.fichiers_api(files_info),
+                        **dsn_api.effectif_compact(evolution_data)}, chrono, 'api_effectif')
 
-                # Ajouter la date de référence CSP (dernier jour du dernier mois)
-                if files_data:
-                    derniere_date = files_data[-1]['date_declaration']
-                    if derniere_date and len(derniere_date) == 8:
-                        mois = int(derniere_date[2:4])
-                        annee = int(derniere_date[4:8])
-                        # Dernier jour du mois
-                        if mois == 12:
-                            dernier_jour = 31
-                        elif mois in [4, 6, 9, 11]:
-                            dernier_jour = 30
-                        elif mois == 2:
-                            # Année bissextile
-                            if (annee % 4 == 0 and annee % 100 != 0) or (annee % 400 == 0):
-                                dernier_jour = 29
-                            else:
-                                dernier_jour = 28
-                        else:
-                            dernier_jour = 31
-                        date_reference_csp = datetime(annee, mois, dernier_jour)
-                        evolution_data['date_reference_csp'] = date_reference_csp.strftime('%d/%m/%Y')
-
-                # Calculer la pyramide des âges pour le dernier mois
-                if parsers:
-                    dernier_parser = parsers[-1]
-                    derniere_date = files_data[-1]['date_declaration']
-
-                    # Calculer le dernier jour du mois (date de référence)
-                    if derniere_date and len(derniere_date) == 8:
-                        mois = int(derniere_date[2:4])
-                        annee = int(derniere_date[4:8])
-                        # Dernier jour du mois
-                        if mois == 12:
-                            dernier_jour = 31
-                        elif mois in [4, 6, 9, 11]:
-                            dernier_jour = 30
-                        elif mois == 2:
-                            # Année bissextile
-                            if (annee % 4 == 0 and annee % 100 != 0) or (annee % 400 == 0):
-                                dernier_jour = 29
-                            else:
-                                dernier_jour = 28
-                        else:
-                            dernier_jour = 31
-
-                        date_reference = datetime(annee, mois, dernier_jour)
-                        date_reference_str = date_reference.strftime('%d/%m/%Y')
-
-                        # Définir les tranches d'âge (du plus élevé au plus faible pour affichage en haut en bas)
-                        tranches = ['65+', '60-64', '55-59', '50-54', '45-49', '40-44', '35-39', '30-34', '25-29', '20-24', '<20']
-                        pyramide_hommes = {t: 0 for t in tranches}
-                        pyramide_femmes = {t: 0 for t in tranches}
-
-                        # Liste pour calculer l'âge moyen
-                        ages_list = []
-
-                        # Calculer l'âge de chaque salarié
-                        if hasattr(dernier_parser, 'stats') and 'salaries' in dernier_parser.stats:
-                            for sal in dernier_parser.stats['salaries']:
-                                date_naissance = sal.get('date_naissance', '')
-                                nir = sal.get('nir', '')
-
-                                if date_naissance and len(date_naissance) == 8:
-                                    try:
-                                        jour_naiss = int(date_naissance[0:2])
-                                        mois_naiss = int(date_naissance[2:4])
-                                        annee_naiss = int(date_naissance[4:8])
-                                        date_naiss = datetime(annee_naiss, mois_naiss, jour_naiss)
-
-                                        # Calculer l'âge
-                                        age = date_reference.year - date_naiss.year
-                                        if (date_reference.month, date_reference.day) < (date_naiss.month, date_naiss.day):
-                                            age -= 1
-
-                                        # Ajouter l'âge à la liste pour calculer la moyenne
-                                        ages_list.append(age)
-
-                                        # Déterminer la tranche d'âge
-                                        if age < 20:
-                                            tranche = '<20'
-                                        elif age < 25:
-                                            tranche = '20-24'
-                                        elif age < 30:
-                                            tranche = '25-29'
-                                        elif age < 35:
-                                            tranche = '30-34'
-                                        elif age < 40:
-                                            tranche = '35-39'
-                                        elif age < 45:
-                                            tranche = '40-44'
-                                        elif age < 50:
-                                            tranche = '45-49'
-                                        elif age < 55:
-                                            tranche = '50-54'
-                                        elif age < 60:
-                                            tranche = '55-59'
-                                        elif age < 65:
-                                            tranche = '60-64'
-                                        else:
-                                            tranche = '65+'
-
-                                        # Déterminer le sexe à partir du NIR
-                                        if nir and len(nir) > 0:
-                                            if nir[0] == '1':
-                                                pyramide_hommes[tranche] += 1
-                                            elif nir[0] == '2':
-                                                pyramide_femmes[tranche] += 1
-                                    except (ValueError, IndexError):
-                                        pass
-
-                        evolution_data['pyramide'] = {
-                            'tranches': tranches,
-                            'hommes': [pyramide_hommes[t] for t in tranches],
-                            'femmes': [pyramide_femmes[t] for t in tranches],
-                            'date_reference': date_reference_str
-                        }
-
-                        # Calculer l'âge moyen et l'ajouter aux stats
-                        if ages_list and evolution_data.get('stats'):
-                            evolution_data['stats']['age_moyen'] = int(round(sum(ages_list) / len(ages_list)))
-
-                upload_success = True
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                upload_error = f"Erreur lors de l'analyse des fichiers : {str(e)}"
-
-    return render_template('evolution_effectif.html',
-                         upload_success=upload_success,
-                         upload_error=upload_error,
-                         files_info=files_info,
-                         evolution=evolution_data)
+def espace_api(siret: str, chrono: Chronometre, route: str):
+    """
+    Espace de travail d'une entreprise (voir dsn_espace)
+
+    Returns:
+        Tuple (espace, réponse d'erreur ou None)
+    """
+    from dsn_espace import EspaceEntreprise
+
+    try:
+        espace = EspaceEntreprise(siret)
+    except ValueError as e:
+        return None, reponse_api({'erreur': str(e)}, chrono, route, 400)
+    return espace, None
+
+@app.route('/api/v1/entreprises/<siret>/mois', methods=['POST'])
+def api_espace_ajouter(siret):
+    """
+    Ajoute un ou plusieurs mois à l'espace de travail d'une entreprise
+
+    Formulaire multipart : dsn_files (le ou les nouveaux mois, DSN ou archives .zip / .gz).
+    Seuls les fichiers envoyés sont parsés ; un mois déjà présent est remplacé si son
+    contenu a changé. Réponse : mois de l'espace et évolution de l'effectif mise à jour.
+    """
+    chrono = nouveau_chronometre()
+    espace, erreur = espace_api(siret, chrono, 'api_espace')
+    if erreur is not None:
+        return erreur
+    files_info, parsers, erreur = fichiers_api(chrono)
+    if erreur:
+        return reponse_api({'erreur': erreur}, chrono, 'api_espace', 400)
+
+    ajoutes, inchanges = [], []
+    try:
+        for file_info, parser in zip(files_info, parsers):
+            mois = file_info['entete']['mois_cle']
+            (ajoutes if espace.ajouter(file_info, parser, chrono) else inchanges).append(mois)
+    except ValueError as e:
+        return reponse_api({'erreur': str(e), 'ajoutes': ajoutes}, chrono, 'api_espace', 400)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return reponse_api({'erreur': f"Erreur lors de l'ajout des fichiers : {str(e)}", 'ajoutes': ajoutes},
+                           chrono, 'api_espace', 500)
+
+    with chrono.etape('agregation'):
+        evolution_data = espace.evolution_effectif()
+    return reponse_api({'version': dsn_api.VERSION_API, 'siret': siret, 'ajoutes': ajoutes,
+                        'inchanges': inchanges, 'mois': espace.fichiers(),
+                        **dsn_api.effectif_compact(evolution_data)}, chrono, 'api_espace')
+
+@app.route('/api/v1/entreprises/<siret>/mois/<mois>', methods=['DELETE'])
+def api_espace_retirer(siret, mois):
+    """Retire un mois (YYYYMM) de l'espace de travail d'une entreprise"""
+    chrono = nouveau_chronometre()
+    espace, erreur = espace_api(siret, chrono, 'api_espace')
+    if erreur is not None:
+        return erreur
+    if not espace.retirer(mois):
+        return reponse_api({'erreur': f"Mois {mois} absent de l'espace {siret}"}, chrono, 'api_espace', 404)
+    return reponse_api({'version': dsn_api.VERSION_API, 'siret': siret, 'mois': espace.fichiers()},
+                       chrono, 'api_espace')
+
+@app.route('/api/v1/entreprises/<siret>/index', methods=['GET'])
+def api_espace_index(siret):
+    """
+    Index Égalité des mois de l'espace de travail, sans reparser l'historique
+
+    Paramètres : types_remuneration (répétable, par défaut 003), date_reference (optionnelle).
+    """
+    chrono = nouveau_chronometre()
+    espace, erreur = espace_api(siret, chrono, 'api_espace_index')
+    if erreur is not None:
+        return erreur
+    if not espace.existe():
+        return reponse_api({'erreur': f"Aucun mois dans l'espace {siret}"}, chrono, 'api_espace_index', 404)
+    try:
+        date_reference = dsn_api.date_reference_api(request.args.get('date_reference'))
+    except ValueError:
+        return reponse_api({'erreur': "date_reference invalide (YYYY-MM-DD ou DDMMYYYY)"},
+                           chrono, 'api_espace_index', 400)
+    try:
+        resultats = espace.index(request.args.getlist('types_remuneration') or ['003'],
+                                 date_reference=date_reference, chrono=chrono)
+    except ValueError as e:
+        return reponse_api({'erreur': str(e)}, chrono, 'api_espace_index', 400)
+    return reponse_api({'version': dsn_api.VERSION_API, 'siret': siret, 'mois': espace.fichiers(),
+                        **resultats}, chrono, 'api_espace_index')
+
+@app.route('/api/v1/entreprises/<siret>/effectif', methods=['GET'])
+def api_espace_effectif(siret):
+    """Évolution de l'effectif des mois de l'espace de travail (agrégats conservés, aucun parsing)"""
+    chrono = nouveau_chronometre()
+    espace, erreur = espace_api(siret, chrono, 'api_espace_effectif')
+    if erreur is not None:
+        return erreur
+    if not espace.existe():
+        return reponse_api({'erreur': f"Aucun mois dans l'espace {siret}"}, chrono, 'api_espace_effectif', 404)
+    with chrono.etape('agregation'):
+        evolution_data = espace.evolution_effectif()
+    return reponse_api({'version': dsn_api.VERSION_API, 'siret': siret, 'mois': espace.fichiers(),
+                        **dsn_api.effectif_compact(evolution_data)}, chrono, 'api_espace_effectif')
 
 if __name__ == '__main__':
     import os
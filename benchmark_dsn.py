@@ -0,0 +1,217 @@
+"""
+Benchmarks du parsing et des indicateurs DSN sur des fichiers synthétiques
+
+Mesure, pour chaque taille d'effectif :
+- parse_file : parsing complet d'un mois et calcul des indicateurs (DSNParser.parse_file)
+- get_results : calcul des indicateurs seul, sur un mois déjà parsé
+- get_results_multi_mois : indicateurs multi-mois sur la série de mois déjà parsés
+- evolution_effectif : agrégation de la page /evolution-effectif (fichiers déjà en cache)
+
+Les fichiers sont générés par dsn_synthetique (déterministes) dans uploads/.benchmark
+et réutilisés d'une exécution à l'autre. Les résultats sont écrits dans un fichier JSON
+qui peut servir de référence pour une exécution suivante (--reference).
+
+Usage :
+    python benchmark_dsn.py [--tailles 1000,10000,100000] [--mois 3] [--format virgule]
+                            [--repetitions 3] [--sortie benchmark_dsn.json]
+                            [--reference ancien.json] [--seuil 10]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from dsn_parser import PARSER_VERSION, DSNParser
+from dsn_synthetique import FORMATS, generer_serie
+from dsn_tokenizer import FORMAT_VIRGULE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Dossier des fichiers générés (réutilisés d'une exécution à l'autre)
+DOSSIER_BENCHMARK = os.path.join('uploads', '.benchmark')
+
+BENCHMARKS = ('parse_file', 'get_results', 'get_results_multi_mois', 'evolution_effectif')
+
+
+def preparer_serie(nb_salaries: int, nb_mois: int, format_lignes: str, graine: int = 0) -> List[str]:
+    """Génère (ou réutilise) la série de fichiers d'une taille donnée"""
+    dossier = os.path.join(DOSSIER_BENCHMARK, f"{format_lignes}_{nb_salaries}_{nb_mois}m_g{graine}")
+    chemins = sorted(glob.glob(os.path.join(dossier, '*', '*.dsn')))
+    if len(chemins) == nb_mois:
+        return chemins
+
+    print(f"Génération de {nb_mois} mois x {nb_salaries} salariés ({format_lignes})...")
+    return generer_serie(dossier, nb_salaries=nb_salaries, nb_mois=nb_mois,
+                         format_lignes=format_lignes, graine=graine)
+
+
+def mesurer(fonction: Callable[[], Any], repetitions: int) -> float:
+    """Meilleur temps (secondes) sur plusieurs répétitions"""
+    meilleur = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        duree = time.perf_counter() - debut
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur
+
+
+def _compter_lignes(chemin: str) -> int:
+    with open(chemin, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def _evolution_effectif(chemins: List[str]) -> Callable[[], Any]:
+    """
+    Prépare l'analyse de la page /evolution-effectif sur des fichiers déjà en cache
+
+    Mêmes étapes que la route (en-têtes, tri et contrôle des mois, analyse), sans Flask :
+    les fichiers de la série sont rangés par SIRET, hors de portée de keep_files.
+    """
+    from dsn_analyses import analyser_evolution_effectif
+    from dsn_cache import ParseCache
+    from dsn_header import scan_header, verifier_entetes
+
+    # Cache propre au benchmark (mémoire seule)
+    cache = ParseCache(directory=None)
+
+    def appel():
+        files_info = [{'filename': os.path.basename(chemin), 'size': '', 'path': chemin,
+                       'entete': scan_header(chemin)} for chemin in chemins]
+        files_info, erreur = verifier_entetes(files_info)
+        if erreur:
+            raise RuntimeError(f"Évolution de l'effectif : {erreur}")
+        _, evolution = analyser_evolution_effectif(files_info, cache=cache)
+        # Une série vide ou incomplète signale une régression (et fausserait la mesure)
+        if len(evolution.get('effectif_total', [])) != len(chemins) or not all(evolution['effectif_total']):
+            raise RuntimeError("Évolution de l'effectif incomplète : "
+                               f"{evolution.get('effectif_total')} pour {len(chemins)} mois")
+
+    # Premier appel hors mesure : remplit le cache de parsing
+    appel()
+    return appel
+
+
+def executer(tailles: List[int], nb_mois: int, format_lignes: str, repetitions: int) -> Dict[str, Any]:
+    """Exécute tous les benchmarks et retourne les résultats"""
+    resultats = {nom: {} for nom in BENCHMARKS}
+
+    for taille in tailles:
+        chemins = preparer_serie(taille, nb_mois, format_lignes)
+        premier = chemins[0]
+        nb_lignes = _compter_lignes(premier)
+        print(f"\n{taille} salariés ({nb_lignes} lignes par mois, {len(chemins)} mois)")
+
+        def enregistrer(nom: str, secondes: float, lignes: int, salaries: int):
+            resultats[nom][str(taille)] = {
+                'secondes': round(secondes, 4),
+                'lignes_par_seconde': round(lignes / secondes) if secondes else None,
+                'salaries_par_seconde': round(salaries / secondes) if secondes else None,
+            }
+            print(f"  {nom:<24} {secondes:9.3f} s  {lignes / secondes:>12,.0f} lignes/s")
+
+        # Parsing complet + indicateurs d'un mois
+        secondes = mesurer(lambda: DSNParser().parse_file(premier), repetitions)
+        enregistrer('parse_file', secondes, nb_lignes, taille)
+
+        # Indicateurs seuls sur un mois déjà parsé
+        parser = DSNParser.lean().parse(premier)
+        secondes = mesurer(parser.get_results, repetitions)
+        enregistrer('get_results', secondes, nb_lignes, taille)
+
+        # Indicateurs multi-mois sur la série déjà parsée
+        parsers = [DSNParser.lean().parse(chemin) for chemin in chemins]
+        secondes = mesurer(lambda: parsers[0].get_results_multi_mois(parsers_list=parsers), repetitions)
+        enregistrer('get_results_multi_mois', secondes, nb_lignes * len(chemins), taille * len(chemins))
+        del parser, parsers
+
+        # Agrégation de l'évolution de l'effectif (parsing servi par le cache)
+        appel = _evolution_effectif(chemins)
+        secondes = mesurer(appel, repetitions)
+        enregistrer('evolution_effectif', secondes, nb_lignes * len(chemins), taille * len(chemins))
+
+    return resultats
+
+
+def comparer(resultats: Dict[str, Any], reference: Dict[str, Any], seuil: float) -> List[str]:
+    """
+    Compare les temps à ceux d'une exécution de référence
+
+    Returns:
+        Liste des régressions (temps augmenté de plus de `seuil` %)
+    """
+    regressions = []
+    print(f"\nComparaison avec la référence du {reference.get('horodatage', '?')}")
+    for nom, par_taille in resultats.items():
+        for taille, mesure in par_taille.items():
+            ancien = reference.get('resultats', {}).get(nom, {}).get(taille)
+            if not ancien or not ancien.get('secondes'):
+                continue
+            variation = (mesure['secondes'] / ancien['secondes'] - 1) * 100
+            marque = ''
+            if variation > seuil:
+                marque = '  <-- régression'
+                regressions.append(f"{nom} ({taille} salariés) : {variation:+.1f} %")
+            print(f"  {nom:<24} {taille:>7}  {ancien['secondes']:9.3f} s -> {mesure['secondes']:9.3f} s"
+                  f"  ({variation:+.1f} %){marque}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks DSN sur fichiers synthétiques")
+    parser.add_argument('--tailles', default='1000,10000,100000',
+                        help="Effectifs à mesurer, séparés par des virgules")
+    parser.add_argument('--mois', type=int, default=3, help="Nombre de mois de la série")
+    parser.add_argument('--format', choices=FORMATS, default=FORMAT_VIRGULE)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--sortie', default='benchmark_dsn.json', help="Fichier JSON des résultats")
+    parser.add_argument('--reference', help="Résultats JSON d'une exécution précédente à comparer")
+    parser.add_argument('--seuil', type=float, default=10.0,
+                        help="Ralentissement toléré (%%) avant de signaler une régression")
+    args = parser.parse_args()
+
+    tailles = [int(taille) for taille in args.tailles.split(',') if taille.strip()]
+    resultats = executer(tailles, args.mois, args.format, args.repetitions)
+
+    rapport = {
+        'horodatage': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plateforme': platform.platform(),
+        'parser_version': PARSER_VERSION,
+        'parametres': {
+            'tailles': tailles,
+            'mois': args.mois,
+            'format': args.format,
+            'repetitions': args.repetitions,
+        },
+        'resultats': resultats,
+    }
+    if resource is not None:
+        rapport['memoire_max_mo'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    with open(args.sortie, 'w', encoding='utf-8') as f:
+        json.dump(rapport, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats écrits dans {args.sortie}")
+
+    if args.reference:
+        with open(args.reference, 'r', encoding='utf-8') as f:
+            reference = json.load(f)
+        regressions = comparer(resultats, reference, args.seuil)
+        if regressions:
+            print("\nRégressions :")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
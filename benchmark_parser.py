@@ -0,0 +1,138 @@
+"""
+Benchmark du découpage des lignes DSN (lignes/seconde)
+
+Compare l'ancienne cascade de trois expressions régulières non compilées
+avec le tokenizer à détection de format (dsn_tokenizer.DSNTokenizer).
+Avec un fichier, compare aussi le parsing complet en mode texte et en mode mmap
+(DSNParser.parse_mmap).
+
+Usage :
+    python benchmark_parser.py [fichier.dsn]
+
+Sans fichier, un échantillon synthétique est construit en mémoire.
+"""
+
+import re
+import sys
+import time
+
+import dsn_parser
+from dsn_tokenizer import DSNTokenizer
+
+
+def _legacy_parse_line(line):
+    """Ancien DSNParser.parse_line (trois re.match successifs + dict par ligne)"""
+    match1 = re.match(r'^(S\d{2}\.G\d{2}\.\d{2}\.\d{3}),(.*)$', line)
+    if match1:
+        rubrique, valeur = match1.groups()
+        return {'rubrique': rubrique, 'valeur': valeur.strip().strip("'"), 'raw': line}
+
+    if len(line) >= 18:
+        match2 = re.match(r'^(S\d{2}G\d{2}\d{2}\d{3})(.*)$', line)
+        if match2:
+            rubrique_edi, valeur = match2.groups()
+            if len(rubrique_edi) == 15:
+                rubrique_standard = f"{rubrique_edi[0:3]}.{rubrique_edi[3:6]}.{rubrique_edi[6:8]}.{rubrique_edi[8:11]}"
+                return {'rubrique': rubrique_standard, 'valeur': valeur.strip(), 'raw': line}
+
+    match3 = re.match(r'^(S\d{2}\.G\d{2}\.\d{2}\.\d{3})\s+(.*)$', line)
+    if match3:
+        rubrique, valeur = match3.groups()
+        return {'rubrique': rubrique, 'valeur': valeur.strip(), 'raw': line}
+
+    return None
+
+
+def _sample_lines(nb_salaries=20000):
+    """Construit un échantillon de lignes au format virgule"""
+    lines = [
+        "S10.G00.00.001,'LOGICIEL PAIE'",
+        "S20.G00.05.001,'01'",
+        "S20.G00.05.005,'01012024'",
+        "S21.G00.06.001,'123456789'",
+        "S21.G00.11.001,'00012'",
+    ]
+    for i in range(nb_salaries):
+        lines.extend([
+            f"S21.G00.30.001,'{1 + i % 2}850575123{i % 1000:03d}'",
+            f"S21.G00.30.002,'NOM{i}'",
+            f"S21.G00.30.004,'PRENOM{i}'",
+            "S21.G00.30.006,'15051985'",
+            f"S21.G00.30.019,'M{i:06d}'",
+            "S21.G00.40.001,'01092015'",
+            "S21.G00.40.002,'04'",
+            "S21.G00.40.004,'382a'",
+            "S21.G00.51.001,'01012024'",
+            "S21.G00.51.002,'31012024'",
+            "S21.G00.51.011,'003'",
+            f"S21.G00.51.013,'{2000 + i % 3000}.00'",
+        ])
+    return lines
+
+
+def _mesurer(nom, fonction, lines):
+    debut = time.perf_counter()
+    nb = fonction(lines)
+    duree = time.perf_counter() - debut
+    print(f"{nom:<32} {nb:>9} rubriques  {duree:7.3f} s  {len(lines) / duree:>12,.0f} lignes/s")
+    return duree
+
+
+def _avant(lines):
+    nb = 0
+    for line in lines:
+        if _legacy_parse_line(line):
+            nb += 1
+    return nb
+
+
+def _apres(lines):
+    split = DSNTokenizer().split
+    nb = 0
+    for line in lines:
+        if split(line):
+            nb += 1
+    return nb
+
+
+def _parse_texte(chemin):
+    # parse() sans bascule vers le mode mmap, quelle que soit la taille du fichier
+    seuil, dsn_parser.SEUIL_MMAP = dsn_parser.SEUIL_MMAP, 0
+    try:
+        return dsn_parser.DSNParser.lean().parse(chemin).stats['total_lines']
+    finally:
+        dsn_parser.SEUIL_MMAP = seuil
+
+
+def _parse_mmap(chemin):
+    return dsn_parser.DSNParser.lean().parse_mmap(chemin).stats['total_lines']
+
+
+def _mesurer_fichier(nom, fonction, chemin):
+    debut = time.perf_counter()
+    nb = fonction(chemin)
+    duree = time.perf_counter() - debut
+    print(f"{nom:<32} {nb:>9} lignes      {duree:7.3f} s  {nb / duree:>12,.0f} lignes/s")
+    return duree
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='latin-1') as f:
+            lines = [line.rstrip('\n\r') for line in f if line.strip()]
+    else:
+        lines = _sample_lines()
+
+    print(f"{len(lines)} lignes")
+    duree_avant = _mesurer("Avant (3 x re.match)", _avant, lines)
+    duree_apres = _mesurer("Après (DSNTokenizer)", _apres, lines)
+    print(f"Gain : x{duree_avant / duree_apres:.1f}")
+
+    if len(sys.argv) > 1:
+        duree_texte = _mesurer_fichier("Parsing texte (parse)", _parse_texte, sys.argv[1])
+        duree_mmap = _mesurer_fichier("Parsing mmap (parse_mmap)", _parse_mmap, sys.argv[1])
+        print(f"Gain : x{duree_texte / duree_mmap:.1f}")
+
+
+if __name__ == '__main__':
+    main()
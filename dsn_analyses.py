@@ -0,0 +1,207 @@
+"""
+Analyses DSN des pages Index Égalité et Évolution de l'effectif
+Appelées directement par les routes Flask, ou par un worker de la file de jobs (dsn_jobs)
+pour les analyses exécutées en arrière-plan : les paramètres sont alors relus depuis la
+file (JSON) et le résultat renvoyé à la page par pickle.
+
+Paramètres communs (mots-clés) :
+    workers: Nombre de processus de parsing (None = DSN_PARSE_WORKERS)
+    cache: Cache de parsing (ParseCache) ou None
+    chrono: Chronomètre de la requête ou du job (voir dsn_timing)
+    suivi: Avancement, appelé avec l'étape en cours et chaque parser obtenu (voir dsn_jobs.SuiviJob)
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import dsn_dates
+from dsn_effectif import EffectifEngine, MoisEffectif, table_salaries
+from dsn_jobs import tache
+from dsn_pool import parse_files
+from dsn_timeline import TimelineIndex
+from dsn_timing import CHRONO_INACTIF, Chronometre
+
+
+def _suivi_inactif(etape: str, parser: Any = None):
+    """Suivi par défaut : aucun avancement publié"""
+
+
+def _parser(chemins: List[Optional[str]], workers: Optional[int], cache: Any, chrono: Chronometre,
+            suivi: Callable, empreintes: Optional[List[Optional[str]]] = None,
+            parsers: Optional[list] = None) -> list:
+    """Parse les fichiers (parsers reçus, cache, pool de processus) en publiant l'avancement"""
+    suivi('parsing')
+    with chrono.etape('parsing'):
+        parsers = parse_files(chemins, workers=workers, cache=cache, chrono=chrono,
+                              suivi=lambda parser: suivi('parsing', parser),
+                              empreintes=empreintes, parsers_recus=parsers)
+    chrono.compter_parsers(parsers)
+    return parsers
+
+
+@tache('egalite_hf')
+def analyser_egalite_hf(chemins: List[Optional[str]], types_selectionnes: List[str],
+                        date_reference: Optional[str] = None,
+                        empreintes: Optional[List[Optional[str]]] = None, complet: bool = True,
+                        parsers: Optional[list] = None,
+                        workers: Optional[int] = None, cache: Any = None,
+                        chrono: Chronometre = CHRONO_INACTIF,
+                        suivi: Callable = _suivi_inactif) -> Dict[str, Any]:
+    """
+    Index Égalité d'un ou plusieurs mois DSN
+
+    Args:
+        chemins: Fichiers DSN (triés par mois déclaré ; None pour un fichier reçu sans copie)
+        types_selectionnes: Codes des types de rémunération inclus
+        date_reference: Date de référence pour le calcul de l'âge (DDMMYYYY)
+        empreintes: Empreintes des fichiers déjà calculées à la réception (voir dsn_ingestion)
+        complet: False = indicateurs seuls, sans stats, blocks ni raw_lines (API JSON)
+        parsers: Parsers obtenus à la réception des fichiers (dans la requête seulement,
+                 jamais pour un job : voir app.parsers_recus)
+
+    Returns:
+        Résultats de get_results (un fichier) ou get_results_multi_mois (plusieurs)
+    """
+    parsers = _parser(chemins, workers, cache, chrono, suivi, empreintes, parsers)
+
+    suivi('indicateurs')
+    # Si un seul fichier, utiliser le mode classique
+    if len(parsers) == 1:
+        return parsers[0].get_results(
+            types_filtres=types_selectionnes,
+            date_reference=date_reference,
+            chrono=chrono,
+            complet=complet
+        )
+
+    # Mode multi-mois : analyser les données comparatives
+    return parsers[0].get_results_multi_mois(
+        parsers_list=parsers,
+        types_filtres=types_selectionnes,
+        date_reference=date_reference,
+        chrono=chrono,
+        complet=complet
+    )
+
+
+def format_date_dsn(date_str: str) -> str:
+    """Convertit une date DSN (01MMYYYY) en 'MOIS ANNEE'"""
+    if not date_str or len(date_str) != 8:
+        return "Date invalide"
+    mois_names = {
+        '01': 'JANVIER', '02': 'FÉVRIER', '03': 'MARS',
+        '04': 'AVRIL', '05': 'MAI', '06': 'JUIN',
+        '07': 'JUILLET', '08': 'AOÛT', '09': 'SEPTEMBRE',
+        '10': 'OCTOBRE', '11': 'NOVEMBRE', '12': 'DÉCEMBRE'
+    }
+    mois = date_str[2:4]
+    annee = date_str[4:8]
+    return f"{mois_names.get(mois, mois)} {annee}"
+
+
+def libelles_mois(fichiers: List[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+    """
+    Libellés des mois de l'évolution de l'effectif, alignés sur les ':'
+
+    Args:
+        fichiers: (nom du fichier, date de déclaration 01MMYYYY ou '') de chaque mois
+
+    Returns:
+        (label du graphique, label affiché dans la liste des fichiers, période) de chaque mois
+    """
+    # Calculer la longueur maximale des labels de date pour l'alignement
+    max_date_length = 0
+    for _, date_declaration in fichiers:
+        if date_declaration:
+            max_date_length = max(max_date_length, len(format_date_dsn(date_declaration)))
+
+    libelles = []
+    for filename, date_declaration in fichiers:
+        # Formater le label pour l'affichage avec alignement
+        if date_declaration:
+            date_label = format_date_dsn(date_declaration)
+            # Ajouter des espaces pour aligner les ":"
+            padding = ' ' * (max_date_length - len(date_label))
+            libelles.append((f"DSN {date_label}{padding} : {filename}",
+                             f"{date_label}{padding} : {filename}",
+                             date_label))  # Période seule
+        else:
+            libelles.append((f"DSN : {filename}", filename, filename))  # Fallback si pas de date
+    return libelles
+
+
+@tache('evolution_effectif')
+def analyser_evolution_effectif(files_info: List[Dict[str, Any]], details: bool = True,
+                                parsers: Optional[list] = None,
+                                workers: Optional[int] = None, cache: Any = None,
+                                chrono: Chronometre = CHRONO_INACTIF,
+                                suivi: Callable = _suivi_inactif) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Évolution de l'effectif sur plusieurs mois DSN
+
+    Args:
+        files_info: Fichiers uploadés (filename, size, path et, s'il est connu, empreinte)
+        details: False = séries seules, sans le détail des salariés, entrées et sorties (API JSON)
+        parsers: Parsers obtenus à la réception des fichiers, dans l'ordre de files_info
+
+    Returns:
+        Tuple (files_info trié par mois avec display_label, données d'évolution de la page)
+    """
+    parsers_fichiers = _parser([file_info['path'] for file_info in files_info], workers, cache, chrono, suivi,
+                               [file_info.get('empreinte') for file_info in files_info], parsers)
+
+    suivi('agregation')
+    debut_agregation = time.perf_counter()
+    files_data = []
+    for file_info, parser in zip(files_info, parsers_fichiers):
+        date_declaration = parser.date_declaration or ""
+
+        # Mois déclaré au format YYYYMM (ex: 202401), utilisé pour le tri et les entrées/sorties
+        if parser.date_declaration_int:
+            mois_declaration = dsn_dates.mois_de(parser.date_declaration_int)
+        else:
+            mois_declaration = None
+
+        files_data.append({
+            'parser': parser,
+            'filename': file_info['filename'],
+            'size': file_info['size'],
+            'path': file_info['path'],
+            'date_declaration': date_declaration,
+            'date_declaration_int': parser.date_declaration_int,
+            'mois_declaration': mois_declaration
+        })
+
+    # Trier les fichiers par date de déclaration (année puis mois, fichiers sans date à la fin)
+    files_data.sort(key=lambda x: x['mois_declaration'] or 999999)
+
+    # Mettre à jour files_info avec les données triées et formatées
+    files_info_sorted = []
+    mois_labels = []
+    periodes = []  # Liste des périodes seules (MOIS ANNEE)
+    libelles = libelles_mois([(f['filename'], f['date_declaration']) for f in files_data])
+    for file_data, (label, display_label, periode) in zip(files_data, libelles):
+        periodes.append(periode)
+        mois_labels.append(label)
+        files_info_sorted.append({
+            'filename': file_data['filename'],
+            'size': file_data['size'],
+            'path': file_data['path'],
+            'display_label': display_label
+        })
+
+    # Remplacer files_info par la version triée et formatée
+    files_info = files_info_sorted
+
+    # Évolution de l'effectif : un passage par mois sur la table compacte des salariés
+    mois = [
+        MoisEffectif(label, periode, file_data['date_declaration_int'],
+                     table_salaries(file_data['parser'].stats.get('salaries', [])))
+        for label, periode, file_data in zip(mois_labels, periodes, files_data)
+    ]
+    timeline = TimelineIndex.depuis_parsers([file_data['parser'] for file_data in files_data])
+    evolution_data = EffectifEngine(details=details).calculer(mois, timeline)
+    evolution_data['fichiers'] = [f['filename'] for f in files_info]
+
+    chrono.ajouter('agregation', time.perf_counter() - debut_agregation)
+    return files_info, evolution_data
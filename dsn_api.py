@@ -0,0 +1,83 @@
+"""
+API JSON des analyses DSN (/api/v1/index, /api/v1/effectif)
+Réponses compactes pour les appels programmatiques : indicateurs calculés uniquement,
+sans les stats détaillées des salariés, blocks ni raw_lines (jamais construits pour ces
+appels), sérialisées avec orjson si disponible.
+
+orjson est optionnel : sans lui, la sérialisation se replie sur le module json.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from dsn_records import Enregistrement, LigneEffectif, MontantsParType
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+VERSION_API = 'v1'
+
+# Séries de l'évolution de l'effectif renvoyées par /api/v1/effectif
+SERIES_EFFECTIF = (
+    'periodes', 'effectif_total', 'effectif_hommes', 'effectif_femmes', 'par_groupe',
+    'entrees', 'sorties', 'arrivees', 'departs', 'age_moyen', 'age_moyen_hommes', 'age_moyen_femmes',
+)
+
+
+def _defaut(o: Any):
+    """Types non natifs : enregistrements compacts (salariés, rémunérations)"""
+    if isinstance(o, (Enregistrement, LigneEffectif, MontantsParType)):
+        return dict(o.items())
+    raise TypeError(f"Type non sérialisable : {type(o).__name__}")
+
+
+def serialiser(data: Any) -> bytes:
+    """Sérialise une réponse de l'API en JSON compact (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_defaut, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_defaut, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def date_reference_api(valeur: Optional[str]) -> Optional[str]:
+    """
+    Date de référence de l'API au format DSN (DDMMYYYY)
+
+    Accepte YYYY-MM-DD (comme le formulaire) ou DDMMYYYY.
+
+    Raises:
+        ValueError: Date invalide
+    """
+    if not valeur:
+        return None
+    if len(valeur) == 8 and valeur.isdigit():
+        datetime.strptime(valeur, '%d%m%Y')
+        return valeur
+    return datetime.strptime(valeur, '%Y-%m-%d').strftime('%d%m%Y')
+
+
+def fichiers_api(files_info: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fichiers analysés (nom, archive d'origine, mois déclaré, SIRET)"""
+    fichiers = []
+    for file_info in files_info:
+        entete = file_info.get('entete') or {}
+        fichier = {
+            'filename': file_info['filename'],
+            'mois': entete.get('mois_cle') if entete.get('mois_cle') != '999999' else None,
+            'siret': entete.get('siret'),
+        }
+        if file_info.get('archive'):
+            fichier['archive'] = file_info['archive']
+        fichiers.append(fichier)
+    return fichiers
+
+
+def effectif_compact(evolution: Dict[str, Any]) -> Dict[str, Any]:
+    """Évolution de l'effectif réduite aux séries mensuelles, statistiques et pyramide des âges"""
+    resultat = {cle: evolution[cle] for cle in SERIES_EFFECTIF}
+    for cle in ('stats', 'pyramide', 'date_reference_csp'):
+        if cle in evolution:
+            resultat[cle] = evolution[cle]
+    return resultat
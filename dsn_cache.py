@@ -0,0 +1,176 @@
+"""
+Cache des résultats de parsing DSN
+Les parsers sont indexés par l'empreinte SHA-256 du contenu du fichier et la version
+du parser : un fichier déjà analysé (ex: recalcul avec d'autres types de rémunération
+ou une autre date de référence) n'est pas reparsé.
+
+Deux niveaux :
+- mémoire : LRU des derniers parsers dans le processus
+- disque : un fichier pickle par entrée dans uploads/.cache, taille totale plafonnée
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dsn_parser import DSNParser, PARSER_VERSION
+
+CACHE_FOLDER = os.path.join('uploads', '.cache')
+
+
+def file_digest(file_path: str) -> str:
+    """Calcule l'empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Cache à deux niveaux (mémoire LRU + disque) des parsers DSN
+
+    Les parsers renvoyés sont partagés entre les appels (et les threads) : get_results()
+    calcule les tranches d'âge dans une liste propre à l'appel, les données extraites ne
+    sont jamais modifiées.
+    """
+
+    def __init__(self, directory: str = CACHE_FOLDER, max_memory_entries: int = 48,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            directory: Dossier du cache disque (None = cache mémoire uniquement)
+            max_memory_entries: Nombre de parsers conservés en mémoire
+            max_disk_bytes: Taille maximale du cache disque (les entrées les moins
+                            récemment utilisées sont supprimées au-delà)
+        """
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: 'OrderedDict[str, DSNParser]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits_memoire': 0, 'hits_disque': 0, 'misses': 0, 'evictions_disque': 0}
+
+    def key(self, file_path: str) -> str:
+        """Clé de cache d'un fichier : version du parser + empreinte du contenu"""
+        return self.key_for_digest(file_digest(file_path))
+
+    @staticmethod
+    def key_for_digest(digest: str) -> str:
+        """Clé de cache d'un contenu dont l'empreinte SHA-256 est déjà connue"""
+        return f"v{PARSER_VERSION}-{digest}"
+
+    def get(self, key: str) -> Optional[DSNParser]:
+        """Retourne le parser en cache pour cette clé, ou None (compte un hit ou un miss)"""
+        with self._lock:
+            parser = self._memory.get(key)
+            if parser is not None:
+                self._memory.move_to_end(key)
+                self.counters['hits_memoire'] += 1
+                return parser
+
+        parser = self._read_disk(key)
+        with self._lock:
+            if parser is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['hits_disque'] += 1
+            self._remember(key, parser)
+        return parser
+
+    def put(self, key: str, parser: DSNParser):
+        """Ajoute un parser au cache (mémoire et disque)"""
+        with self._lock:
+            self._remember(key, parser)
+        self._write_disk(key, parser)
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs de hits / misses et taux de hit"""
+        with self._lock:
+            counters = dict(self.counters)
+            counters['entrees_memoire'] = len(self._memory)
+        total = counters['hits_memoire'] + counters['hits_disque'] + counters['misses']
+        hits = counters['hits_memoire'] + counters['hits_disque']
+        counters['taux_hit'] = round(hits / total * 100, 1) if total else 0
+        return counters
+
+    def clear(self):
+        """Vide le cache mémoire et le cache disque"""
+        with self._lock:
+            self._memory.clear()
+        for path in self._disk_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key: str, parser: DSNParser):
+        self._memory[key] = parser
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _disk_entries(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith('.pkl')]
+
+    def _read_disk(self, key: str) -> Optional[DSNParser]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                parser = pickle.load(f)
+            # Marquer l'entrée comme récemment utilisée (éviction LRU)
+            os.utime(path)
+            return parser
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Entrée de cache illisible {path} : {e}")
+            return None
+
+    def _write_disk(self, key: str, parser: DSNParser):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(parser, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Écriture du cache de parsing impossible : {e}")
+
+    def _evict_disk(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_disk_bytes"""
+        entries = []
+        for path in self._disk_entries():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.counters['evictions_disque'] += 1
+            except OSError:
+                pass
@@ -0,0 +1,96 @@
+"""
+Dates DSN encodées en entiers
+Les dates DSN (DDMMYYYY) sont converties une seule fois, au parsing, en entiers
+YYYYMMDD. L'ordre des entiers est l'ordre chronologique : les calculs d'âge, de
+tranche d'âge et d'appartenance à un mois deviennent de simples opérations entières
+(et se vectorisent directement avec NumPy).
+"""
+
+import calendar
+from bisect import bisect_right
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+# Tranches d'âge de l'indicateur 1 de l'Index Égalité (bornes inférieures)
+BORNES_TRANCHES_INDEX = [30, 40, 50]
+TRANCHES_INDEX = ['<30', '30-39', '40-49', '50+']
+
+# Tranches d'âge de la pyramide des âges (bornes inférieures)
+BORNES_TRANCHES_PYRAMIDE = [20, 25, 30, 35, 40, 45, 50, 55, 60, 65]
+TRANCHES_PYRAMIDE = ['<20', '20-24', '25-29', '30-34', '35-39', '40-44',
+                     '45-49', '50-54', '55-59', '60-64', '65+']
+
+
+@lru_cache(maxsize=65536)
+def date_vers_int(valeur: Optional[str]) -> Optional[int]:
+    """
+    Convertit une date DSN DDMMYYYY en entier YYYYMMDD
+
+    Mémorisée : les dates se répètent d'un salarié à l'autre (naissances, embauches,
+    périodes de paie) et partagent ainsi le même entier.
+
+    Args:
+        valeur: Date au format DDMMYYYY (ex: '15051985')
+
+    Returns:
+        Entier YYYYMMDD (ex: 19850515) ou None si la date est absente ou invalide
+    """
+    if not valeur or len(valeur) != 8 or not valeur.isdigit():
+        return None
+
+    jour = int(valeur[0:2])
+    mois = int(valeur[2:4])
+    annee = int(valeur[4:8])
+    if annee < 1 or not 1 <= mois <= 12 or not 1 <= jour <= calendar.monthrange(annee, mois)[1]:
+        return None
+    return annee * 10000 + mois * 100 + jour
+
+
+def aujourd_hui() -> int:
+    """Date du jour en entier YYYYMMDD"""
+    jour = date.today()
+    return jour.year * 10000 + jour.month * 100 + jour.day
+
+
+def mois_de(date_int: int) -> int:
+    """Mois YYYYMM d'une date YYYYMMDD"""
+    return date_int // 100
+
+
+def fin_de_mois(date_int: int) -> int:
+    """Dernier jour du mois d'une date YYYYMMDD (ex: 20240201 -> 20240229)"""
+    annee, mois = divmod(date_int // 100, 100)
+    return (date_int // 100) * 100 + calendar.monthrange(annee, mois)[1]
+
+
+def dans_mois(date_int: Optional[int], mois: Optional[int]) -> bool:
+    """Vérifie qu'une date YYYYMMDD tombe dans le mois YYYYMM"""
+    return date_int is not None and mois is not None and date_int // 100 == mois
+
+
+def age(date_naissance: int, date_reference: int) -> int:
+    """
+    Âge en années révolues à une date de référence
+
+    Les dates étant des entiers YYYYMMDD, la différence divisée par 10000 donne
+    l'écart en années en tenant compte du mois et du jour d'anniversaire.
+    """
+    return (date_reference - date_naissance) // 10000
+
+
+def tranche_age_index(age_annees: int) -> str:
+    """Tranche d'âge de l'indicateur 1 : '<30', '30-39', '40-49', '50+'"""
+    return TRANCHES_INDEX[bisect_right(BORNES_TRANCHES_INDEX, age_annees)]
+
+
+def tranche_age_pyramide(age_annees: int) -> str:
+    """Tranche d'âge de la pyramide des âges : '<20', '20-24', ..., '65+'"""
+    return TRANCHES_PYRAMIDE[bisect_right(BORNES_TRANCHES_PYRAMIDE, age_annees)]
+
+
+def formater(date_int: int) -> str:
+    """Formate une date YYYYMMDD en JJ/MM/AAAA"""
+    annee, reste = divmod(date_int, 10000)
+    mois, jour = divmod(reste, 100)
+    return f"{jour:02d}/{mois:02d}/{annee:04d}"
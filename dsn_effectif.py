@@ -0,0 +1,284 @@
+"""
+Moteur de l'évolution de l'effectif (page /evolution-effectif et /api/v1/effectif)
+Chaque mois est décrit par une table compacte de ses salariés (un tuple par salarié :
+sexe, groupe, dates en entiers YYYYMMDD) ; EffectifEngine en tire en un seul passage
+par mois l'effectif, la répartition H/F et par groupe de CSP, les entrées / sorties,
+les âges moyens et, pour le dernier mois, la pyramide des âges.
+
+Le moteur ne dépend ni de Flask ni du parser : il peut être appelé (et testé) avec des
+tables construites à la main, via table_salaries() sur des dictionnaires.
+"""
+
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import dsn_dates
+from dsn_records import LigneEffectif, Salarie
+from dsn_timeline import TimelineIndex
+
+# Groupes de CSP suivis (codes 21-26, voir LigneEffectif.LIBELLES_GROUPE)
+GROUPES = ('21', '22', '23', '24', '25', '26')
+
+# Sexe d'un salarié d'après le premier caractère du NIR
+SEXE_HOMME = 1
+SEXE_FEMME = 2
+_SEXES_NIR = {'1': SEXE_HOMME, '2': SEXE_FEMME}
+
+# Ligne de table : (identifié, sexe, groupe_code, naissance, embauche, sortie, salarié)
+LigneTable = Tuple[bool, int, Optional[str], Optional[int], Optional[int], Optional[int], Any]
+
+
+def table_salaries(salaries: Iterable[Any]) -> List[LigneTable]:
+    """
+    Table compacte des salariés d'un mois (stats['salaries'] d'un parser)
+
+    Un salarié est identifié s'il a un matricule (S21.G00.30.019) ou, à défaut, un NIR ;
+    seuls les salariés identifiés comptent dans l'effectif, tous comptent dans la pyramide.
+    """
+    table = []
+    ajouter = table.append
+    sexes = _SEXES_NIR
+    for sal in salaries:
+        if type(sal) is Salarie:
+            # Accès direct aux __slots__ (champs non renseignés : None)
+            nir = sal.nir
+            matricule = getattr(sal, 'matricule', None)
+            groupe_code = getattr(sal, 'groupe_code', None)
+            naissance = getattr(sal, 'date_naissance_int', None)
+            embauche = getattr(sal, 'date_embauche_int', None)
+            sortie = getattr(sal, 'date_sortie_int', None)
+        else:
+            nir = sal.get('nir', '')
+            matricule = sal.get('matricule', '')
+            groupe_code = sal.get('groupe_code', None)
+            naissance = sal.get('date_naissance_int')
+            embauche = sal.get('date_embauche_int')
+            sortie = sal.get('date_sortie_int')
+
+        sexe = sexes.get(nir[:1], 0) if nir else 0
+        ajouter((bool(matricule or nir), sexe, groupe_code, naissance, embauche, sortie, sal))
+    return table
+
+
+class MoisEffectif:
+    """Mois de l'évolution : libellés affichés, mois déclaré et table des salariés"""
+
+    __slots__ = ('label', 'periode', 'mois_declaration', 'date_declaration_int', 'table')
+
+    def __init__(self, label: str, periode: str, date_declaration_int: Optional[int],
+                 table: List[LigneTable]):
+        self.label = label
+        self.periode = periode
+        self.date_declaration_int = date_declaration_int
+        self.mois_declaration = dsn_dates.mois_de(date_declaration_int) if date_declaration_int else None
+        self.table = table
+
+
+class EffectifEngine:
+    """
+    Calcul de l'évolution de l'effectif sur une série de mois
+
+    Args:
+        details: Conserver le détail par salarié (LigneEffectif), entrées et sorties
+                 (False pour l'API JSON : séries seules)
+    """
+
+    def __init__(self, details: bool = True):
+        self.details = details
+
+    def calculer(self, mois: List[MoisEffectif],
+                 timeline: Optional[TimelineIndex] = None) -> Dict[str, Any]:
+        """
+        Évolution de l'effectif d'une série de mois triés (du plus ancien au plus récent)
+
+        Args:
+            mois: Tables des salariés de chaque mois
+            timeline: Index chronologique des mêmes mois : ajoute les arrivées et départs
+                      constatés d'après la présence (en plus des entrées / sorties datées)
+
+        Returns:
+            Données de la page : séries mensuelles, stats globales, pyramide des âges
+            du dernier mois et date de référence CSP
+        """
+        resultats = []
+        pyramide = None
+        for idx, mois_effectif in enumerate(mois):
+            # Pyramide des âges : calculée dans le passage du dernier mois (s'il est daté)
+            dernier = idx == len(mois) - 1 and mois_effectif.date_declaration_int is not None
+            resultat, pyramide_mois = self.calculer_mois(mois_effectif, dernier)
+            resultats.append(resultat)
+            if dernier:
+                pyramide = pyramide_mois
+
+        mouvements = timeline.mouvements() if timeline is not None else None
+        return self.assembler([(m.label, m.periode) for m in mois], resultats, pyramide, mouvements)
+
+    def assembler(self, libelles: List[Tuple[str, str]], resultats: List[Dict[str, Any]],
+                  pyramide: Optional[Dict[str, Any]] = None,
+                  mouvements: Optional[Tuple[List[int], List[int]]] = None) -> Dict[str, Any]:
+        """
+        Séries de l'évolution à partir des résultats de chaque mois (voir calculer_mois)
+
+        Args:
+            libelles: (label, période) de chaque mois
+            resultats: Résultat de calculer_mois pour chaque mois
+            pyramide: Pyramide des âges du dernier mois (ou None)
+            mouvements: Arrivées et départs de chaque mois (voir TimelineIndex.mouvements)
+        """
+        evolution = {
+            'mois': [],
+            'periodes': [],  # Périodes seules (MOIS ANNEE)
+            'effectif_total': [],
+            'effectif_hommes': [],
+            'effectif_femmes': [],
+            'par_groupe': {groupe: [] for groupe in GROUPES},  # Répartition par groupe de CSP
+            'entrees': [],
+            'sorties': [],
+            'entrees_details': [],  # Détails des entrées (nom, prénom, date d'embauche)
+            'sorties_details': [],  # Détails des sorties (nom, prénom)
+            'age_moyen': [],  # Âge moyen global par mois
+            'age_moyen_hommes': [],
+            'age_moyen_femmes': [],
+            'salaries_details': [],  # Détails complets de tous les salariés par période
+        }
+
+        for (label, periode), resultat in zip(libelles, resultats):
+            evolution['mois'].append(label)
+            evolution['periodes'].append(periode)
+            for cle in ('effectif_total', 'effectif_hommes', 'effectif_femmes', 'entrees', 'sorties',
+                        'age_moyen', 'age_moyen_hommes', 'age_moyen_femmes',
+                        'entrees_details', 'sorties_details', 'salaries_details'):
+                evolution[cle].append(resultat.get(cle, []))
+            for groupe in GROUPES:
+                evolution['par_groupe'][groupe].append(resultat['par_groupe'].get(groupe, 0))
+
+        if mouvements is not None:
+            evolution['arrivees'], evolution['departs'] = mouvements
+
+        effectifs = evolution['effectif_total']
+        if effectifs:
+            evolution['stats'] = {
+                'effectif_initial': effectifs[0],
+                'effectif_final': effectifs[-1],
+                'variation_absolue': effectifs[-1] - effectifs[0],
+                'variation_pct': ((effectifs[-1] - effectifs[0]) / effectifs[0] * 100) if effectifs[0] > 0 else 0,
+                'effectif_moyen': int(round(sum(effectifs) / len(effectifs))),
+                'total_entrees': sum(evolution['entrees']),
+                'total_sorties': sum(evolution['sorties'])
+            }
+
+        if pyramide is not None:
+            evolution['date_reference_csp'] = pyramide['date_reference']
+            evolution['pyramide'] = {cle: pyramide[cle] for cle in ('tranches', 'hommes', 'femmes', 'date_reference')}
+            if pyramide['nb_ages'] and evolution.get('stats'):
+                evolution['stats']['age_moyen'] = int(round(pyramide['somme_ages'] / pyramide['nb_ages']))
+
+        if not self.details:
+            for cle in ('entrees_details', 'sorties_details', 'salaries_details'):
+                del evolution[cle]
+        return evolution
+
+    def calculer_mois(self, mois: MoisEffectif, pyramide: bool) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Un passage sur la table d'un mois (et la pyramide des âges si demandée)
+
+        Returns:
+            Tuple (résultat du mois, pyramide des âges ou None)
+        """
+        details = self.details
+        mois_declaration = mois.mois_declaration
+        # Âges calculés au dernier jour du mois déclaré
+        date_ref = dsn_dates.fin_de_mois(mois.date_declaration_int) if mois.date_declaration_int else None
+        bornes = dsn_dates.BORNES_TRANCHES_PYRAMIDE
+
+        effectif_h = effectif_f = 0
+        groupes: Dict[str, int] = {}
+        nb_entrees = nb_sorties = 0
+        somme_ages_h = nb_ages_h = somme_ages_f = nb_ages_f = 0
+        entrees_list, sorties_list, salaries_mois = [], [], []
+
+        nb_tranches = len(dsn_dates.TRANCHES_PYRAMIDE)
+        pyramide_h = [0] * nb_tranches
+        pyramide_f = [0] * nb_tranches
+        somme_ages = nb_ages = 0
+
+        for identifie, sexe, groupe_code, naissance, embauche, sortie, sal in mois.table:
+            # Âge en années révolues (voir dsn_dates.age), calculé sur les entiers YYYYMMDD
+            age_mois = (date_ref - naissance) // 10000 if naissance and date_ref else None
+
+            if pyramide and age_mois is not None:
+                somme_ages += age_mois
+                nb_ages += 1
+                tranche = bisect_right(bornes, age_mois)
+                if sexe == SEXE_HOMME:
+                    pyramide_h[tranche] += 1
+                elif sexe == SEXE_FEMME:
+                    pyramide_f[tranche] += 1
+
+            if not identifie:
+                continue
+
+            if sexe == SEXE_HOMME:
+                effectif_h += 1
+                if age_mois is not None:
+                    somme_ages_h += age_mois
+                    nb_ages_h += 1
+            elif sexe == SEXE_FEMME:
+                effectif_f += 1
+                if age_mois is not None:
+                    somme_ages_f += age_mois
+                    nb_ages_f += 1
+
+            if groupe_code:
+                groupes[groupe_code] = groupes.get(groupe_code, 0) + 1
+
+            est_entree = embauche is not None and mois_declaration is not None and embauche // 100 == mois_declaration
+            est_sortie = sortie is not None and mois_declaration is not None and sortie // 100 == mois_declaration
+            nb_entrees += est_entree
+            nb_sorties += est_sortie
+
+            if details:
+                if est_entree:
+                    entrees_list.append({
+                        'nom': sal.get('nom', 'N/A'),
+                        'prenom': sal.get('prenom', 'N/A'),
+                        'date_embauche': sal.get('date_embauche', '')
+                    })
+                if est_sortie:
+                    sorties_list.append({
+                        'nom': sal.get('nom', 'N/A'),
+                        'prenom': sal.get('prenom', 'N/A'),
+                        'date_sortie': sal.get('date_sortie', '')
+                    })
+                # Âge affiché seulement pour les salariés dont le sexe est connu
+                age_affiche = age_mois if age_mois is not None and sexe else ''
+                salaries_mois.append(LigneEffectif(sal, age_affiche, est_entree, est_sortie))
+
+        nb_ages_tous = nb_ages_h + nb_ages_f
+        resultat = {
+            'effectif_total': effectif_h + effectif_f,
+            'effectif_hommes': effectif_h,
+            'effectif_femmes': effectif_f,
+            'par_groupe': groupes,
+            'entrees': nb_entrees,
+            'sorties': nb_sorties,
+            'age_moyen': int(round((somme_ages_h + somme_ages_f) / nb_ages_tous)) if nb_ages_tous else 0,
+            'age_moyen_hommes': int(round(somme_ages_h / nb_ages_h)) if nb_ages_h else 0,
+            'age_moyen_femmes': int(round(somme_ages_f / nb_ages_f)) if nb_ages_f else 0,
+            'entrees_details': entrees_list,
+            'sorties_details': sorties_list,
+            'salaries_details': salaries_mois,
+        }
+
+        if not pyramide:
+            return resultat, None
+
+        # Tranches du plus élevé au plus faible pour affichage de haut en bas
+        return resultat, {
+            'tranches': list(reversed(dsn_dates.TRANCHES_PYRAMIDE)),
+            'hommes': pyramide_h[::-1],
+            'femmes': pyramide_f[::-1],
+            'date_reference': dsn_dates.formater(date_ref),
+            'somme_ages': somme_ages,
+            'nb_ages': nb_ages,
+        }
@@ -0,0 +1,126 @@
+"""
+Détection de l'encodage des fichiers DSN
+Par couches, de la plus rapide à la plus coûteuse, sur l'échantillon lu en début de
+fichier :
+
+1. BOM (UTF-8, UTF-16, UTF-32)
+2. Échantillon ASCII : aucun indice, on retient l'encodage de la norme (le cahier
+   technique DSN impose l'ISO/IEC 8859-1)
+3. Décodage UTF-8 strict (un caractère coupé en fin d'échantillon est toléré)
+4. Heuristique Latin-1 / CP1252 : octets non ASCII isolés et presque tous des lettres
+   latines (noms, prénoms, adresses)
+5. chardet, seulement si les couches précédentes ne concluent pas (octets nuls, texte
+   multi-octets...)
+
+Les couches 1 à 4 ne coûtent que quelques microsecondes ; le résultat de chardet (plusieurs
+millisecondes) est mémorisé par empreinte de l'échantillon : un même fichier n'est analysé
+qu'une fois par processus.
+"""
+
+import codecs
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import chardet
+
+ENCODAGE_DSN = 'ISO-8859-1'
+ENCODAGE_CP1252 = 'Windows-1252'
+
+# BOM -> encodage (UTF-32 LE avant UTF-16 LE : même début FF FE)
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'UTF-32'),
+    (codecs.BOM_UTF32_BE, 'UTF-32'),
+    (codecs.BOM_UTF8, 'UTF-8-SIG'),
+    (codecs.BOM_UTF16_LE, 'UTF-16'),
+    (codecs.BOM_UTF16_BE, 'UTF-16'),
+)
+
+_ASCII = bytes(range(128))
+
+# Octets non ASCII attendus dans une DSN en Latin-1 / CP1252 : lettres latines accentuées
+# (hors × et ÷), espace insécable, °, ², guillemets « », et en CP1252 €, Œ, œ, apostrophes
+# et tiret typographiques
+LETTRES_LATINES = bytes(b for b in range(0xC0, 0x100) if b not in (0xD7, 0xF7)) + bytes(
+    [0xA0, 0xB0, 0xB2, 0xAB, 0xBB, 0x80, 0x8C, 0x9C, 0x91, 0x92, 0x96])
+
+# Part minimale de lettres latines parmi les octets non ASCII
+PART_LETTRES_LATINES = 0.9
+
+# Octets ASCII -> 0x00, non ASCII -> 0xFF : trois octets non ASCII consécutifs, rares en
+# français, sont courants dans les encodages multi-octets
+_MASQUE_NON_ASCII = bytes(0x00 if b < 0x80 else 0xFF for b in range(256))
+_SUITE_NON_ASCII = b'\xff\xff\xff'
+
+# Octets 0x80-0x9F : caractères de contrôle en Latin-1, typographie en CP1252
+_CONTROLES_C1 = re.compile(rb'[\x80-\x9f]')
+
+# Empreinte de l'échantillon -> encodage détecté par chardet
+TAILLE_CACHE = 1024
+_cache: 'OrderedDict[bytes, str]' = OrderedDict()
+_verrou = threading.Lock()
+
+
+def detecter_encodage(data: bytes) -> str:
+    """
+    Encodage d'un fichier DSN d'après ses premiers octets
+
+    Args:
+        data: Échantillon lu en début de fichier (voir dsn_parser.TAILLE_DETECTION_ENCODAGE)
+
+    Returns:
+        Nom d'encodage utilisable par open() / bytes.decode()
+    """
+    for bom, encodage in BOMS:
+        if data.startswith(bom):
+            return encodage
+
+    if b'\x00' not in data:
+        if data.isascii():
+            return ENCODAGE_DSN
+        if _utf8_strict(data):
+            return 'utf-8'
+
+        encodage = _latin(data)
+        if encodage is not None:
+            return encodage
+
+    empreinte = hashlib.blake2b(data, digest_size=16).digest()
+    with _verrou:
+        encodage = _cache.get(empreinte)
+        if encodage is not None:
+            _cache.move_to_end(empreinte)
+            return encodage
+
+    encodage = chardet.detect(data)['encoding'] or 'utf-8'
+    with _verrou:
+        _cache[empreinte] = encodage
+        while len(_cache) > TAILLE_CACHE:
+            _cache.popitem(last=False)
+    return encodage
+
+
+def _utf8_strict(data: bytes) -> bool:
+    """Vrai si l'échantillon est de l'UTF-8 valide (dernier caractère éventuellement coupé)"""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _latin(data: bytes) -> Optional[str]:
+    """
+    Latin-1 ou CP1252 si les octets non ASCII ressemblent à du texte latin, sinon None
+
+    CP1252 seulement si l'échantillon contient des octets 0x80-0x9F (€, œ, ’...) :
+    sinon les deux encodages décodent l'échantillon de la même façon.
+    """
+    non_ascii = data.translate(None, _ASCII)
+    autres = non_ascii.translate(None, LETTRES_LATINES)
+    if (len(autres) > len(non_ascii) * (1 - PART_LETTRES_LATINES)
+            or _SUITE_NON_ASCII in data.translate(_MASQUE_NON_ASCII)):
+        return None
+    return ENCODAGE_CP1252 if _CONTROLES_C1.search(non_ascii) else ENCODAGE_DSN
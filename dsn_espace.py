@@ -0,0 +1,262 @@
+"""
+Espace de travail persistant d'une entreprise (un dossier par SIRET)
+Chaque mois ajouté est parsé une seule fois : l'espace conserve le parser allégé du mois
+(pickle, comme le cache de parsing) et, dans le manifeste JSON, ses agrégats dérivés
+(ligne de l'évolution de l'effectif, pyramide des âges, arrivées / départs par rapport
+au mois précédent).
+
+Ajouter le mois N ne parse que ce fichier et ne relit que les parsers de ses voisins
+(arrivées / départs) ; l'évolution de l'effectif est reconstruite depuis le manifeste
+et l'Index Égalité ne charge que le premier et le dernier mois (indicateurs 2 et 3 :
+jointure de ces deux mois, indicateurs 1 et 5 : dernier mois).
+
+Disposition :
+    uploads/.espaces/<SIRET>/espace.json    manifeste (mois, empreintes, agrégats)
+    uploads/.espaces/<SIRET>/<YYYYMM>.pkl   parser du mois
+"""
+
+import json
+import os
+import pickle
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from dsn_analyses import libelles_mois
+from dsn_effectif import EffectifEngine, MoisEffectif, table_salaries
+from dsn_parser import PARSER_VERSION, DSNParser
+from dsn_timeline import TimelineIndex
+from dsn_timing import CHRONO_INACTIF, Chronometre
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : pas de verrou entre processus (un seul worker en développement)
+    fcntl = None
+
+ESPACES_FOLDER = os.path.join('uploads', '.espaces')
+
+MANIFESTE = 'espace.json'
+
+# SIRET : 14 chiffres (aussi nom du dossier de l'espace)
+_SIRET = re.compile(r'^\d{14}$')
+
+
+def siret_valide(siret: str) -> bool:
+    return bool(siret and _SIRET.match(siret))
+
+
+class EspaceEntreprise:
+    """
+    Mois DSN d'une entreprise et agrégats dérivés, mis à jour mois par mois
+
+    Args:
+        siret: SIRET de l'établissement
+        racine: Dossier des espaces
+
+    Raises:
+        ValueError: SIRET invalide
+    """
+
+    def __init__(self, siret: str, racine: str = ESPACES_FOLDER):
+        if not siret_valide(siret):
+            raise ValueError(f"SIRET invalide : {siret}")
+        self.siret = siret
+        self.dossier = os.path.join(racine, siret)
+        self.manifeste = self._lire_manifeste()
+
+    def existe(self) -> bool:
+        return bool(self.manifeste['mois'])
+
+    def mois(self) -> List[str]:
+        """Mois de l'espace (YYYYMM), du plus ancien au plus récent"""
+        return sorted(self.manifeste['mois'])
+
+    def perime(self) -> bool:
+        """Vrai si les parsers conservés proviennent d'une autre version du parser"""
+        return self.existe() and self.manifeste['version_parser'] != PARSER_VERSION
+
+    def parser(self, mois: str) -> DSNParser:
+        """Parser conservé d'un mois"""
+        with open(self._chemin_parser(mois), 'rb') as f:
+            return pickle.load(f)
+
+    def ajouter(self, file_info: Dict[str, Any], parser: DSNParser,
+                chrono: Chronometre = CHRONO_INACTIF) -> bool:
+        """
+        Ajoute (ou remplace) un mois de l'espace
+
+        Args:
+            file_info: Fichier reçu (filename, entete, empreinte ; voir dsn_ingestion)
+            parser: Parser du fichier (obtenu à la réception ou dans le cache de parsing)
+
+        Returns:
+            False si ce mois est déjà dans l'espace avec le même contenu (rien n'est recalculé)
+
+        Raises:
+            ValueError: Fichier sans mois déclaré, d'un autre SIRET, ou espace d'une autre
+                        version du parser
+        """
+        entete = file_info['entete']
+        mois = entete['mois_cle']
+        if mois == '999999' or not parser.date_declaration_int:
+            raise ValueError(f"{file_info['filename']} : mois déclaré introuvable (S20.G00.05.005)")
+        if entete['siret'] and entete['siret'] != self.siret:
+            raise ValueError(f"{file_info['filename']} concerne le SIRET {entete['siret']}, pas {self.siret}")
+
+        with self._verrou(), chrono.etape('agregation'):
+            self.manifeste = self._lire_manifeste()
+            if self.perime():
+                raise ValueError(
+                    f"Espace {self.siret} construit par la version {self.manifeste['version_parser']} du parser : "
+                    "le supprimer et renvoyer tous les mois"
+                )
+            self.manifeste['version_parser'] = PARSER_VERSION
+            precedent = self.manifeste['mois'].get(mois)
+            if precedent is not None and precedent['empreinte'] == file_info.get('empreinte'):
+                return False
+
+            self._ecrire_parser(mois, parser)
+            resultat, pyramide = EffectifEngine(details=False).calculer_mois(
+                MoisEffectif('', '', parser.date_declaration_int,
+                             table_salaries(parser.stats.get('salaries', []))),
+                pyramide=True,
+            )
+            self.manifeste['mois'][mois] = {
+                'filename': file_info['filename'],
+                'empreinte': file_info.get('empreinte'),
+                'date_declaration': parser.date_declaration,
+                'date_declaration_int': parser.date_declaration_int,
+                'nb_salaries': len(parser.stats.get('salaries', [])),
+                'ajoute_le': datetime.now().isoformat(timespec='seconds'),
+                'effectif': {cle: valeur for cle, valeur in resultat.items() if not cle.endswith('_details')},
+                'pyramide': pyramide,
+            }
+
+            # Arrivées / départs du mois ajouté et du mois suivant (seuls mois dont le
+            # mois précédent a changé)
+            tous = self.mois()
+            idx = tous.index(mois)
+            self._mouvements(tous, idx, parser)
+            if idx + 1 < len(tous):
+                self._mouvements(tous, idx + 1, None, parser)
+            self._ecrire_manifeste()
+        return True
+
+    def retirer(self, mois: str) -> bool:
+        """Retire un mois de l'espace (False s'il n'y était pas)"""
+        with self._verrou():
+            self.manifeste = self._lire_manifeste()
+            if mois not in self.manifeste['mois']:
+                return False
+            tous = self.mois()
+            idx = tous.index(mois)
+            del self.manifeste['mois'][mois]
+            tous.remove(mois)
+            if idx < len(tous):
+                self._mouvements(tous, idx)
+            self._ecrire_manifeste()
+            try:
+                os.remove(self._chemin_parser(mois))
+            except OSError:
+                pass
+        return True
+
+    def evolution_effectif(self) -> Dict[str, Any]:
+        """Évolution de l'effectif (séries seules, comme l'API) reconstruite depuis le manifeste"""
+        tous = self.mois()
+        entrees = [self.manifeste['mois'][mois] for mois in tous]
+        libelles = libelles_mois([(entree['filename'], entree['date_declaration'] or '') for entree in entrees])
+        evolution = EffectifEngine(details=False).assembler(
+            [(label, periode) for label, _, periode in libelles],
+            [entree['effectif'] for entree in entrees],
+            entrees[-1]['pyramide'] if entrees else None,
+            ([entree['arrivees'] for entree in entrees], [entree['departs'] for entree in entrees]),
+        )
+        evolution['fichiers'] = [entree['filename'] for entree in entrees]
+        return evolution
+
+    def index(self, types_filtres: List[str], date_reference: Optional[str] = None,
+              chrono: Chronometre = CHRONO_INACTIF) -> Dict[str, Any]:
+        """
+        Index Égalité sur les mois de l'espace (indicateurs seuls, comme l'API)
+
+        Seuls le premier et le dernier mois sont chargés : les indicateurs 1 et 5 portent
+        sur le dernier mois, les indicateurs 2 et 3 sur la jointure du premier et du dernier.
+        """
+        tous = self.mois()
+        if not tous:
+            raise ValueError(f"Aucun mois dans l'espace {self.siret}")
+        if self.perime():
+            raise ValueError(f"Espace {self.siret} construit par une autre version du parser : renvoyer tous les mois")
+
+        with chrono.etape('cache'):
+            dernier = self.parser(tous[-1])
+            premier = self.parser(tous[0]) if len(tous) > 1 else None
+
+        if premier is None:
+            return dernier.get_results(types_filtres=types_filtres, date_reference=date_reference,
+                                       chrono=chrono, complet=False)
+        resultats = premier.get_results_multi_mois(parsers_list=[premier, dernier], types_filtres=types_filtres,
+                                                   date_reference=date_reference, chrono=chrono, complet=False)
+        resultats['summary']['nb_mois_analyses'] = len(tous)
+        return resultats
+
+    def fichiers(self) -> List[Dict[str, Any]]:
+        """Mois de l'espace (nom du fichier, empreinte, nombre de salariés, date d'ajout)"""
+        return [
+            {'mois': mois, **{cle: entree[cle] for cle in ('filename', 'empreinte', 'nb_salaries', 'ajoute_le')}}
+            for mois, entree in sorted(self.manifeste['mois'].items())
+        ]
+
+    def _mouvements(self, tous: List[str], idx: int, parser: Optional[DSNParser] = None,
+                    parser_precedent: Optional[DSNParser] = None):
+        """Arrivées et départs d'un mois par rapport au mois précédent de l'espace"""
+        entree = self.manifeste['mois'][tous[idx]]
+        if idx == 0:
+            entree['arrivees'] = entree['departs'] = 0
+            return
+        parser = parser or self.parser(tous[idx])
+        parser_precedent = parser_precedent or self.parser(tous[idx - 1])
+        arrivees, departs = TimelineIndex([parser_precedent.stats.get('salaries', []),
+                                           parser.stats.get('salaries', [])]).mouvements()
+        entree['arrivees'] = arrivees[1]
+        entree['departs'] = departs[1]
+
+    def _chemin_parser(self, mois: str) -> str:
+        return os.path.join(self.dossier, f"{mois}.pkl")
+
+    def _lire_manifeste(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.dossier, MANIFESTE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'siret': self.siret, 'version_parser': PARSER_VERSION, 'mois': {}}
+
+    def _ecrire_manifeste(self):
+        chemin = os.path.join(self.dossier, MANIFESTE)
+        tmp_path = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifeste, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, chemin)
+
+    def _ecrire_parser(self, mois: str, parser: DSNParser):
+        chemin = self._chemin_parser(mois)
+        tmp_path = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(parser, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, chemin)
+
+    @contextmanager
+    def _verrou(self):
+        """Verrou exclusif de l'espace (plusieurs workers gunicorn peuvent ajouter des mois)"""
+        os.makedirs(self.dossier, exist_ok=True)
+        with open(os.path.join(self.dossier, '.verrou'), 'w') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
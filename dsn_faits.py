@@ -0,0 +1,395 @@
+"""
+Base de faits DSN (SQLite, optionnelle)
+Conserve le contenu des DSN parsées à côté des tables de référence de dsn.db :
+déclarations, salariés, contrats (S21.G00.40), lignes de paie (S21.G00.51) et arrêts
+de travail (S21.G00.60), indexés par SIRET, mois, matricule et NIR. Les analyses sur
+plusieurs années d'historique deviennent des requêtes SQL au lieu de reparser les fichiers.
+
+Chaque fichier est chargé dans une seule transaction (executemany par table) ; un mois
+déjà chargé pour le même SIRET est remplacé, un fichier identique (même empreinte) ignoré.
+Les faits détaillés sont relevés pendant le parsing par ParserFaits, sous-classe de
+DSNParser qui ajoute ses handlers au registre (voir DSNParser.register_handler).
+
+Activée dans l'application par DSN_FAITS=1 (fichiers reçus en flux, voir dsn_ingestion).
+Chargement en ligne de commande :
+    python dsn_faits.py FICHIER_OU_DOSSIER [...] [--db dsn.db]
+
+Variables d'environnement :
+    DSN_FAITS      chargement des fichiers reçus par l'application (0 par défaut)
+    DSN_FAITS_DB   base des faits (par défaut dsn.db, avec les tables de référence)
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import dsn_dates
+from dsn_parser import DSNParser
+
+FAITS_ACTIF = os.environ.get('DSN_FAITS', '0') not in ('', '0')
+
+FAITS_DB = os.environ.get('DSN_FAITS_DB', 'dsn.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS declarations (
+    id INTEGER PRIMARY KEY,
+    siret TEXT NOT NULL,
+    mois TEXT NOT NULL,
+    date_declaration INTEGER,
+    fichier TEXT,
+    empreinte TEXT,
+    nb_salaries INTEGER,
+    nb_lignes INTEGER,
+    charge_le REAL NOT NULL,
+    UNIQUE (siret, mois)
+);
+CREATE TABLE IF NOT EXISTS salaries (
+    declaration_id INTEGER NOT NULL,
+    siret TEXT NOT NULL,
+    mois TEXT NOT NULL,
+    nir TEXT,
+    matricule TEXT,
+    nom TEXT,
+    prenom TEXT,
+    sexe TEXT,
+    date_naissance INTEGER,
+    date_embauche INTEGER,
+    date_sortie INTEGER,
+    statut_conventionnel TEXT,
+    code_pcs_ese TEXT,
+    groupe_code TEXT,
+    csp TEXT
+);
+CREATE TABLE IF NOT EXISTS contrats (
+    declaration_id INTEGER NOT NULL,
+    siret TEXT NOT NULL,
+    mois TEXT NOT NULL,
+    nir TEXT,
+    matricule TEXT,
+    numero TEXT,
+    nature TEXT,
+    date_debut INTEGER,
+    date_fin INTEGER,
+    statut_conventionnel TEXT,
+    code_pcs_ese TEXT,
+    libelle_emploi TEXT
+);
+CREATE TABLE IF NOT EXISTS remunerations (
+    declaration_id INTEGER NOT NULL,
+    siret TEXT NOT NULL,
+    mois TEXT NOT NULL,
+    nir TEXT,
+    matricule TEXT,
+    date_debut INTEGER,
+    date_fin INTEGER,
+    type_code TEXT,
+    montant REAL
+);
+CREATE TABLE IF NOT EXISTS absences (
+    declaration_id INTEGER NOT NULL,
+    siret TEXT NOT NULL,
+    mois TEXT NOT NULL,
+    nir TEXT,
+    matricule TEXT,
+    motif TEXT,
+    date_dernier_jour INTEGER,
+    date_fin_previsionnelle INTEGER,
+    date_reprise INTEGER
+);
+"""
+
+# Tables de faits (une ligne par salarié, contrat, ligne de paie ou arrêt)
+TABLES_FAITS = ('salaries', 'contrats', 'remunerations', 'absences')
+
+# Index de chaque table de faits : (SIRET, mois), matricule, NIR
+INDEX = ''.join(
+    f"CREATE INDEX IF NOT EXISTS idx_{table}_siret_mois ON {table} (siret, mois);\n"
+    f"CREATE INDEX IF NOT EXISTS idx_{table}_matricule ON {table} (matricule);\n"
+    f"CREATE INDEX IF NOT EXISTS idx_{table}_nir ON {table} (nir);\n"
+    for table in TABLES_FAITS
+)
+
+# Rubriques relevées par ParserFaits : (table, colonne, date DDMMYYYY convertie en YYYYMMDD,
+# ouvre une nouvelle ligne : premier champ du bloc)
+RUBRIQUES_FAITS = {
+    'S21.G00.40.001': ('contrats', 'date_debut', True, True),     # Date de début du contrat
+    'S21.G00.40.002': ('contrats', 'statut_conventionnel', False, False),
+    'S21.G00.40.004': ('contrats', 'code_pcs_ese', False, False),
+    'S21.G00.40.006': ('contrats', 'libelle_emploi', False, False),
+    'S21.G00.40.007': ('contrats', 'nature', False, False),       # Nature du contrat
+    'S21.G00.40.009': ('contrats', 'numero', False, False),       # Numéro du contrat
+    'S21.G00.62.001': ('contrats', 'date_fin', True, False),      # Date de fin du contrat
+    'S21.G00.60.001': ('absences', 'motif', False, True),         # Motif de l'arrêt
+    'S21.G00.60.002': ('absences', 'date_dernier_jour', True, False),
+    'S21.G00.60.003': ('absences', 'date_fin_previsionnelle', True, False),
+    'S21.G00.60.010': ('absences', 'date_reprise', True, False),
+}
+
+
+def _handler_fait(rubrique: str, table: str, colonne: str, date: bool, ouvre: bool):
+    """Handler qui relève la valeur dans la ligne en cours de `table`, après le handler existant"""
+    precedent = DSNParser.RUBRIQUE_HANDLERS.get(rubrique)
+
+    def handler(parser: 'ParserFaits', valeur: str):
+        if precedent is not None:
+            precedent(parser, valeur)
+        salaries = parser.stats['salaries']
+        if not salaries:
+            return
+        idx = len(salaries) - 1
+        lignes = parser.faits[table]
+        if ouvre or not lignes or lignes[-1]['salarie'] != idx:
+            lignes.append({'salarie': idx})
+        lignes[-1][colonne] = dsn_dates.date_vers_int(valeur) if date else valeur
+    handler.__name__ = f'_handle_fait_{colonne}'
+    return handler
+
+
+class ParserFaits(DSNParser):
+    """
+    Parser qui relève aussi les faits détaillés de la déclaration (pour BaseFaits)
+
+    Contrats et arrêts sont gardés en dictionnaires (un par bloc), les lignes de paie en
+    tuples (salarié, début, fin, type, montant) : le détail des rémunérations des
+    Salarie n'est pas conservé (keep_remunerations=0).
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('keep_raw_lines', 0)
+        kwargs.setdefault('keep_remunerations', 0)
+        super().__init__(**kwargs)
+        self.faits: Optional[Dict[str, list]] = {'contrats': [], 'absences': [], 'remunerations': []}
+
+    def _handle_montant_fait(self, valeur: str):
+        nb_lignes_paie = self.nb_lignes_paie
+        DSNParser.RUBRIQUE_HANDLERS['S21.G00.51.013'](self, valeur)
+        if self.nb_lignes_paie == nb_lignes_paie:
+            return  # Montant illisible ou hors salarié
+        periode = self.current_period
+        self.faits['remunerations'].append((
+            len(self.stats['salaries']) - 1, periode.get('date_debut_int'), periode.get('date_fin_int'),
+            periode.get('type_code', ''), float(valeur.replace(',', '.')),
+        ))
+
+    def liberer_faits(self):
+        """Libère les faits relevés une fois chargés (le parser peut rester en cache)"""
+        self.faits = None
+
+
+for _rubrique, (_table, _colonne, _date, _ouvre) in RUBRIQUES_FAITS.items():
+    ParserFaits.register_handler(_rubrique, _handler_fait(_rubrique, _table, _colonne, _date, _ouvre))
+ParserFaits.register_handler('S21.G00.51.013', ParserFaits._handle_montant_fait)
+
+
+class BaseFaits:
+    """Base SQLite des faits DSN"""
+
+    def __init__(self, chemin: str = FAITS_DB):
+        self.chemin = chemin
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        with self._connexion() as conn:
+            conn.executescript(SCHEMA + INDEX)
+
+    @contextmanager
+    def _connexion(self) -> Iterator[sqlite3.Connection]:
+        """Connexion en autocommit (transactions explicites par BEGIN IMMEDIATE), fermée en sortie"""
+        conn = sqlite3.connect(self.chemin, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transaction avec verrou d'écriture immédiat (une seule à la fois sur la base)"""
+        with self._connexion() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def charger(self, parser: ParserFaits, siret: str, mois: str, fichier: str = None,
+                empreinte: str = None) -> bool:
+        """
+        Charge les faits d'une déclaration parsée (une transaction)
+
+        Args:
+            parser: Parser du fichier (ParserFaits, faits non libérés)
+            siret: SIRET de l'établissement (en-tête S21.G00.06 / S21.G00.11)
+            mois: Mois déclaré YYYYMM
+            fichier: Nom du fichier
+            empreinte: Empreinte SHA-256 du contenu
+
+        Returns:
+            False si la même déclaration (même empreinte) est déjà chargée
+        """
+        if parser.faits is None:
+            raise ValueError("Faits du parser déjà libérés : reparser le fichier avec ParserFaits")
+
+        salaries = parser.stats['salaries']
+        # Identifiants de chaque salarié, recopiés sur ses lignes de faits (index matricule / NIR)
+        identifiants = [(salarie.get('nir'), salarie.get('matricule')) for salarie in salaries]
+
+        with self._transaction() as conn:
+            existante = conn.execute('SELECT id, empreinte FROM declarations WHERE siret = ? AND mois = ?',
+                                     (siret, mois)).fetchone()
+            if existante is not None:
+                if empreinte and existante['empreinte'] == empreinte:
+                    return False
+                for table in TABLES_FAITS:
+                    conn.execute(f'DELETE FROM {table} WHERE siret = ? AND mois = ?', (siret, mois))
+                conn.execute('DELETE FROM declarations WHERE id = ?', (existante['id'],))
+
+            declaration_id = conn.execute(
+                'INSERT INTO declarations (siret, mois, date_declaration, fichier, empreinte, nb_salaries, '
+                'nb_lignes, charge_le) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (siret, mois, parser.date_declaration_int, fichier, empreinte, len(salaries),
+                 parser.stats['total_lines'], time.time())
+            ).lastrowid
+            cle = (declaration_id, siret, mois)
+
+            conn.executemany(
+                'INSERT INTO salaries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [cle + (salarie.get('nir'), salarie.get('matricule'), salarie.get('nom'), salarie.get('prenom'),
+                        salarie.get('sexe'), salarie.get('date_naissance_int'), salarie.get('date_embauche_int'),
+                        salarie.get('date_sortie_int'), salarie.get('statut_conventionnel'),
+                        salarie.get('code_pcs_ese'), salarie.get('groupe_code'), salarie.get('csp'))
+                 for salarie in salaries]
+            )
+            conn.executemany(
+                'INSERT INTO contrats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [cle + identifiants[contrat['salarie']] + (
+                    contrat.get('numero'), contrat.get('nature'), contrat.get('date_debut'), contrat.get('date_fin'),
+                    contrat.get('statut_conventionnel'), contrat.get('code_pcs_ese'), contrat.get('libelle_emploi'))
+                 for contrat in parser.faits['contrats']]
+            )
+            conn.executemany(
+                'INSERT INTO remunerations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [cle + identifiants[idx] + (date_debut, date_fin, type_code, montant)
+                 for idx, date_debut, date_fin, type_code, montant in parser.faits['remunerations']]
+            )
+            conn.executemany(
+                'INSERT INTO absences VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [cle + identifiants[absence['salarie']] + (
+                    absence.get('motif'), absence.get('date_dernier_jour'),
+                    absence.get('date_fin_previsionnelle'), absence.get('date_reprise'))
+                 for absence in parser.faits['absences']]
+            )
+        return True
+
+    def empreinte(self, siret: str, mois: str) -> Optional[str]:
+        """Empreinte de la déclaration chargée pour ce SIRET et ce mois (None si absente)"""
+        with self._connexion() as conn:
+            ligne = conn.execute('SELECT empreinte FROM declarations WHERE siret = ? AND mois = ?',
+                                 (siret, mois)).fetchone()
+        return ligne['empreinte'] if ligne is not None else None
+
+    def declarations(self, siret: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Déclarations chargées (d'un SIRET ou de tous), par SIRET puis mois"""
+        with self._connexion() as conn:
+            if siret:
+                lignes = conn.execute('SELECT * FROM declarations WHERE siret = ? ORDER BY mois', (siret,))
+            else:
+                lignes = conn.execute('SELECT * FROM declarations ORDER BY siret, mois')
+            return [dict(ligne) for ligne in lignes]
+
+    def effectif_mensuel(self, siret: str) -> List[Dict[str, Any]]:
+        """Effectif déclaré de chaque mois (total, hommes, femmes)"""
+        with self._connexion() as conn:
+            return [dict(ligne) for ligne in conn.execute(
+                "SELECT mois, COUNT(*) AS effectif, SUM(sexe = 'M') AS hommes, SUM(sexe = 'F') AS femmes "
+                "FROM salaries WHERE siret = ? GROUP BY mois ORDER BY mois", (siret,))]
+
+    def remunerations_salaries(self, siret: str, mois_debut: str, mois_fin: str,
+                               types_filtres: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Rémunération cumulée de chaque salarié (matricule, à défaut NIR) sur une période
+
+        Args:
+            mois_debut: Premier mois inclus (YYYYMM)
+            mois_fin: Dernier mois inclus (YYYYMM)
+            types_filtres: Codes des types de rémunération inclus (None = tous)
+        """
+        requete = ("SELECT COALESCE(NULLIF(matricule, ''), nir) AS salarie, COUNT(DISTINCT mois) AS nb_mois, "
+                   "SUM(montant) AS montant FROM remunerations WHERE siret = ? AND mois BETWEEN ? AND ?")
+        parametres = [siret, mois_debut, mois_fin]
+        if types_filtres:
+            requete += f" AND type_code IN ({', '.join('?' * len(types_filtres))})"
+            parametres.extend(types_filtres)
+        requete += " GROUP BY salarie ORDER BY salarie"
+        with self._connexion() as conn:
+            return [dict(ligne) for ligne in conn.execute(requete, parametres)]
+
+    def absences(self, siret: str, motif: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Arrêts de travail déclarés (d'un motif, ex: '02' maternité), par mois"""
+        requete = "SELECT * FROM absences WHERE siret = ?"
+        parametres = [siret]
+        if motif:
+            requete += " AND motif = ?"
+            parametres.append(motif)
+        with self._connexion() as conn:
+            return [dict(ligne) for ligne in conn.execute(requete + " ORDER BY mois", parametres)]
+
+
+def _fichiers(chemins: List[str]) -> List[str]:
+    """Fichiers DSN des chemins donnés (dossiers parcourus récursivement)"""
+    fichiers = []
+    for chemin in chemins:
+        if os.path.isdir(chemin):
+            for dossier, _, noms in sorted(os.walk(chemin)):
+                fichiers.extend(os.path.join(dossier, nom) for nom in sorted(noms)
+                                if nom.lower().endswith(('.dsn', '.txt', '.edi')))
+        else:
+            fichiers.append(chemin)
+    return fichiers
+
+
+def main():
+    from dsn_cache import file_digest
+    from dsn_header import scan_header
+
+    parser = argparse.ArgumentParser(description="Chargement de fichiers DSN dans la base de faits")
+    parser.add_argument('chemins', nargs='+', help="Fichiers DSN ou dossiers (parcourus récursivement)")
+    parser.add_argument('--db', default=FAITS_DB, help="Base SQLite des faits")
+    args = parser.parse_args()
+
+    base = BaseFaits(args.db)
+    debut = time.perf_counter()
+    nb = nb_ignores = nb_erreurs = lignes = 0
+    for chemin in _fichiers(args.chemins):
+        try:
+            entete = scan_header(chemin)
+            if not entete['siret'] or entete['mois_cle'] == '999999':
+                raise ValueError("SIRET ou mois déclaré introuvable dans l'en-tête")
+            empreinte = file_digest(chemin)
+            if base.empreinte(entete['siret'], entete['mois_cle']) == empreinte:
+                nb_ignores += 1
+                continue
+            dsn = ParserFaits().parse(chemin)
+            if base.charger(dsn, entete['siret'], entete['mois_cle'], os.path.basename(chemin), empreinte):
+                nb += 1
+                lignes += dsn.stats['total_lines']
+            else:
+                nb_ignores += 1
+        except Exception as e:
+            nb_erreurs += 1
+            print(f"Erreur {chemin} : {type(e).__name__}: {e}")
+
+    duree = time.perf_counter() - debut
+    print(f"{nb} déclaration(s) chargée(s), {nb_ignores} déjà présente(s), {nb_erreurs} en erreur "
+          f"en {duree:.1f} s ({lignes / duree if duree else 0:,.0f} lignes/s) -> {args.db}")
+
+
+if __name__ == '__main__':
+    main()
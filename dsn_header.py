@@ -0,0 +1,142 @@
+"""
+Lecture rapide de l'en-tête d'un fichier DSN
+Lit uniquement les rubriques S10 (envoi), S20 (déclaration) et l'identification de
+l'entreprise / de l'établissement (S21.G00.06 / S21.G00.11), puis s'arrête au premier
+salarié. Permet de trier, dédoublonner et rejeter des fichiers avant le parsing complet.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dsn_cache import file_digest
+from dsn_tokenizer import DSNTokenizer
+
+# Rubriques lues dans l'en-tête -> clé du résultat
+RUBRIQUES_ENTETE = {
+    'S10.G00.00.001': 'logiciel',          # Nom du logiciel utilisé
+    'S10.G00.00.002': 'editeur',           # Nom de l'éditeur
+    'S10.G00.00.003': 'version_logiciel',  # Numéro de version du logiciel
+    'S10.G00.00.006': 'version_norme',     # Numéro de version de la norme utilisée
+    'S20.G00.05.001': 'nature',            # Nature de la déclaration (01 = DSN mensuelle)
+    'S20.G00.05.002': 'type',              # Type de la déclaration
+    'S20.G00.05.005': 'date_declaration',  # Date du mois principal déclaré (01MMYYYY)
+    'S21.G00.06.001': 'siren',             # SIREN de l'entreprise
+    'S21.G00.11.001': 'nic',               # NIC de l'établissement
+}
+
+# Premier bloc après l'en-tête : le parcours s'arrête au premier salarié
+DEBUT_SALARIES = 'S21.G00.30.'
+
+# Garde-fou pour les fichiers sans bloc salarié
+MAX_LIGNES_ENTETE = 500
+
+
+def cle_mois(date_declaration: Optional[str]) -> str:
+    """Clé de tri YYYYMM d'une date DSN 01MMYYYY ('999999' si absente ou invalide)"""
+    if date_declaration and len(date_declaration) == 8:
+        return date_declaration[4:8] + date_declaration[2:4]
+    return '999999'
+
+
+def scan_header(file_path: str) -> Dict[str, Any]:
+    """
+    Lit l'en-tête d'un fichier DSN sans parser les salariés
+
+    Args:
+        file_path: Chemin vers le fichier DSN
+
+    Returns:
+        Dictionnaire avec logiciel, editeur, version_logiciel, version_norme, nature,
+        type, date_declaration, siren, nic, siret et mois_cle (YYYYMM)
+    """
+    with open(file_path, 'rb') as f:
+        return lire_entete(f)
+
+
+def lire_entete(lignes: Iterable[bytes]) -> Dict[str, Any]:
+    """
+    Lit l'en-tête DSN dans des lignes brutes (fichier ouvert en binaire, début d'un upload...)
+
+    Returns:
+        Même dictionnaire que scan_header
+    """
+    entete = {cle: None for cle in RUBRIQUES_ENTETE.values()}
+    tokenizer = DSNTokenizer()
+
+    for num_ligne, raw in enumerate(lignes):
+        if num_ligne >= MAX_LIGNES_ENTETE:
+            break
+
+        # Les rubriques d'en-tête sont en ASCII ; repli Latin-1 pour les libellés accentués
+        try:
+            line = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            line = raw.decode('latin-1')
+        line = line.lstrip('\ufeff').rstrip('\n\r')
+        if not line:
+            continue
+
+        record = tokenizer.split(line)
+        if record is None:
+            continue
+
+        rubrique, valeur = record
+        if rubrique.startswith(DEBUT_SALARIES):
+            break
+
+        cle = RUBRIQUES_ENTETE.get(rubrique)
+        if cle and entete[cle] is None:
+            entete[cle] = valeur
+
+    entete['siret'] = (entete['siren'] + entete['nic']) if entete['siren'] and entete['nic'] else None
+    entete['mois_cle'] = cle_mois(entete['date_declaration'])
+    return entete
+
+
+def _empreinte(file_info: Dict[str, Any]) -> str:
+    return file_info.get('empreinte') or file_digest(file_info['path'])
+
+
+def verifier_entetes(files_info: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Trie les fichiers par mois déclaré et détecte les incohérences avant le parsing
+
+    Chaque élément de files_info doit contenir 'filename' et 'entete' (résultat de
+    scan_header). Un fichier identique (même mois et même contenu) envoyé deux fois
+    n'est gardé qu'une fois ; l'empreinte du contenu est lue dans 'empreinte' si elle
+    a déjà été calculée (fichier reçu par dsn_ingestion), sinon calculée sur le fichier.
+
+    Args:
+        files_info: Informations des fichiers uploadés
+
+    Returns:
+        Tuple (files_info trié par mois, message d'erreur ou None)
+    """
+    files_tries = sorted(files_info, key=lambda f: f['entete']['mois_cle'])
+
+    # SIRET différents : les fichiers ne concernent pas le même établissement
+    sirets = {f['entete']['siret'] for f in files_tries if f['entete']['siret']}
+    if len(sirets) > 1:
+        return files_tries, (
+            f"Les fichiers concernent plusieurs établissements (SIRET : {', '.join(sorted(sirets))})"
+        )
+
+    # Un seul fichier par mois déclaré
+    resultat = []
+    par_mois = {}
+    for file_info in files_tries:
+        mois = file_info['entete']['mois_cle']
+        if mois == '999999':
+            resultat.append(file_info)
+            continue
+
+        precedent = par_mois.get(mois)
+        if precedent is None:
+            par_mois[mois] = file_info
+            resultat.append(file_info)
+        elif _empreinte(precedent) != _empreinte(file_info):
+            return files_tries, (
+                f"Deux fichiers différents pour le mois {mois[4:6]}/{mois[0:4]} : "
+                f"{precedent['filename']} et {file_info['filename']}"
+            )
+
+    return resultat, None
@@ -0,0 +1,240 @@
+"""
+Moteur vectorisé (NumPy / pandas) des indicateurs de l'Index Égalité
+Construit un tableau des salariés d'un mois (sexe, CSP, tranche d'âge, rémunération
+par type) puis calcule l'indicateur 1, l'indicateur 5 et les statistiques H/F par
+opérations vectorielles.
+
+Les sommes par groupe sont faites avec np.bincount, qui additionne dans l'ordre des
+salariés comme les boucles de DSNParser : les résultats sont identiques à ceux de
+calculer_index_officiel, calculer_indicateur_top10 et calculer_egalite_hf, conservés
+comme référence et comparés par test_dsn_indicateurs.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dsn_parser import DSNParser
+
+# Préfixe des colonnes de rémunération par type (remun_003, remun_010...)
+PREFIXE_REMUNERATION = 'remun_'
+
+
+def salaries_frame(salaries: List[Dict[str, Any]],
+                   tranches_age: Optional[List[Optional[str]]] = None) -> pd.DataFrame:
+    """
+    Construit le tableau des salariés d'un mois
+
+    Args:
+        salaries: Liste stats['salaries'] d'un DSNParser
+        tranches_age: Tranche d'âge de chaque salarié (DSNParser.tranches_age) ; à défaut,
+                      champ tranche_age des salariés (voir recalculer_tranches_age)
+
+    Returns:
+        DataFrame avec une ligne par salarié : sexe, csp, tranche_age, nom, prenom,
+        matricule et une colonne remun_<type> par type de rémunération
+    """
+    frame = pd.DataFrame({
+        'sexe': [s.get('sexe') for s in salaries],
+        'csp': [s.get('csp') for s in salaries],
+        'tranche_age': ([tranche or 'Inconnu' for tranche in tranches_age] if tranches_age is not None
+                        else [s.get('tranche_age', 'Inconnu') for s in salaries]),
+        'nom': [s.get('nom', '') for s in salaries],
+        'prenom': [s.get('prenom', '') for s in salaries],
+        'matricule': [s.get('matricule', '') for s in salaries],
+    })
+
+    # Colonnes dans l'ordre d'apparition des types, comme les cumuls par salarié
+    colonnes: Dict[str, int] = {}
+    for salarie in salaries:
+        for code in salarie.get('remunerations_par_type', {}):
+            colonnes.setdefault(code, len(colonnes))
+
+    montants = np.zeros((len(salaries), len(colonnes)))
+    for ligne, salarie in enumerate(salaries):
+        for code, montant in salarie.get('remunerations_par_type', {}).items():
+            montants[ligne, colonnes[code]] = montant
+
+    remunerations = pd.DataFrame(
+        montants,
+        columns=[f'{PREFIXE_REMUNERATION}{code}' for code in colonnes],
+        index=frame.index
+    )
+    return pd.concat([frame, remunerations], axis=1)
+
+
+class IndicateursFrame:
+    """Indicateurs 1 et 5 et statistiques H/F calculés sur le tableau des salariés d'un mois"""
+
+    def __init__(self, salaries: List[Dict[str, Any]], types_filtres: list = None,
+                 tranches_age: Optional[List[Optional[str]]] = None):
+        """
+        Args:
+            salaries: Liste stats['salaries'] d'un DSNParser
+            types_filtres: Codes des types de rémunération à inclure (None = tous)
+            tranches_age: Tranche d'âge de chaque salarié à la date de référence de l'analyse
+                          (DSNParser.tranches_age)
+        """
+        self.frame = salaries_frame(salaries, tranches_age)
+        colonnes = [
+            colonne for colonne in self.frame.columns
+            if colonne.startswith(PREFIXE_REMUNERATION)
+            and (not types_filtres or colonne[len(PREFIXE_REMUNERATION):] in types_filtres)
+        ]
+        if colonnes:
+            self.remuneration = self.frame[colonnes].to_numpy(dtype=float).sum(axis=1)
+        else:
+            self.remuneration = np.zeros(len(self.frame))
+
+        sexe = self.frame['sexe'].to_numpy(dtype=object)
+        self.hommes = sexe == 'M'
+        self.femmes = sexe == 'F'
+
+    def egalite_hf(self) -> Dict[str, Any]:
+        """Équivalent vectorisé de DSNParser.calculer_egalite_hf"""
+        total_h = int(self.hommes.sum())
+        total_f = int(self.femmes.sum())
+        remun_h = self.remuneration[self.hommes & (self.remuneration > 0)]
+        remun_f = self.remuneration[self.femmes & (self.remuneration > 0)]
+
+        moyenne_h = _somme(remun_h) / len(remun_h) if len(remun_h) else 0
+        moyenne_f = _somme(remun_f) / len(remun_f) if len(remun_f) else 0
+
+        ecart = 0
+        if moyenne_h > 0:
+            ecart = ((moyenne_h - moyenne_f) / moyenne_h) * 100
+
+        total = total_h + total_f
+        return {
+            'total_salaries': total,
+            'hommes': total_h,
+            'femmes': total_f,
+            'pourcentage_h': round((total_h / total * 100), 2) if total > 0 else 0,
+            'pourcentage_f': round((total_f / total * 100), 2) if total > 0 else 0,
+            'remuneration_moyenne_h': round(moyenne_h, 2),
+            'remuneration_moyenne_f': round(moyenne_f, 2),
+            'ecart_remuneration': round(ecart, 2),
+            'nb_avec_remuneration_h': len(remun_h),
+            'nb_avec_remuneration_f': len(remun_f)
+        }
+
+    def index_officiel(self) -> Dict[str, Any]:
+        """Équivalent vectorisé de DSNParser.calculer_index_officiel (indicateur 1)"""
+        frame = self.frame
+        csp = frame['csp'].to_numpy(dtype=object)
+        tranche_age = frame['tranche_age'].to_numpy(dtype=object)
+        retenus = (
+            (self.hommes | self.femmes)
+            & pd.notna(csp) & (csp != '')
+            & (self.remuneration > 0)
+            & (tranche_age != 'Inconnu')
+        )
+
+        # Groupes CSP × tranche d'âge, numérotés dans l'ordre d'apparition
+        cles = pd.Series(csp[retenus]).astype(str) + '|' + pd.Series(tranche_age[retenus]).astype(str)
+        codes, groupes = pd.factorize(cles, sort=False)
+        nb_groupes = len(groupes)
+
+        # Case (groupe, sexe) : 2 * groupe pour les hommes, 2 * groupe + 1 pour les femmes
+        cases = codes * 2 + self.femmes[retenus].astype(np.int64)
+        effectifs = np.bincount(cases, minlength=2 * nb_groupes)
+        sommes = np.bincount(cases, weights=self.remuneration[retenus], minlength=2 * nb_groupes)
+
+        resultats_groupes = []
+        ecarts_non_corriges = []
+        for idx, cle_groupe in enumerate(groupes):
+            nb_h = int(effectifs[2 * idx])
+            nb_f = int(effectifs[2 * idx + 1])
+
+            # On ne prend en compte que les groupes avec au moins 3 personnes de chaque sexe
+            if nb_h < 3 or nb_f < 3:
+                continue
+
+            moy_h = float(sommes[2 * idx]) / nb_h
+            moy_f = float(sommes[2 * idx + 1]) / nb_f
+            ecart_pct = ((moy_h - moy_f) / moy_h) * 100 if moy_h > 0 else 0
+
+            groupe_csp, age_group = cle_groupe.split('|')
+            resultats_groupes.append({
+                'csp': groupe_csp,
+                'age_group': age_group,
+                'nb_hommes': nb_h,
+                'nb_femmes': nb_f,
+                'moyenne_h': round(moy_h, 2),
+                'moyenne_f': round(moy_f, 2),
+                'ecart_pct': round(ecart_pct, 2)
+            })
+            ecarts_non_corriges.append(abs(ecart_pct))
+
+        ecart_moyen = sum(ecarts_non_corriges) / len(ecarts_non_corriges) if ecarts_non_corriges else 0
+
+        return {
+            'ecart_moyen_pondere': round(ecart_moyen, 2),
+            'score': DSNParser.score_indicateur_remuneration(ecart_moyen),
+            'score_max': 40,
+            'groupes': sorted(resultats_groupes, key=lambda x: (x['csp'], x['age_group'])),
+            'nb_groupes_valides': len(resultats_groupes)
+        }
+
+    def top10(self) -> Dict[str, Any]:
+        """Équivalent vectorisé de DSNParser.calculer_indicateur_top10 (indicateur 5)"""
+        retenus = np.flatnonzero((self.hommes | self.femmes) & (self.remuneration > 0))
+
+        # Tri décroissant stable : à rémunération égale, l'ordre du fichier est conservé
+        ordre = retenus[np.argsort(-self.remuneration[retenus], kind='stable')[:10]]
+        frame = self.frame
+        top10 = [
+            {
+                'nom': frame.at[idx, 'nom'],
+                'prenom': frame.at[idx, 'prenom'],
+                'matricule': frame.at[idx, 'matricule'],
+                'sexe': frame.at[idx, 'sexe'],
+                'remuneration': float(self.remuneration[idx]),
+                'csp': frame.at[idx, 'csp'] if frame.at[idx, 'csp'] is not None else ''
+            }
+            for idx in ordre
+        ]
+
+        if len(top10) < 10:
+            return {
+                'score': 0,
+                'score_max': 10,
+                'top10': top10,
+                'nb_hommes': 0,
+                'nb_femmes': 0,
+                'sexe_sous_represente': None,
+                'nb_sexe_sous_represente': 0,
+                'message': f"Moins de 10 salariés avec rémunération ({len(top10)} trouvés). Indicateur non calculable."
+            }
+
+        nb_hommes = sum(1 for s in top10 if s['sexe'] == 'M')
+        nb_femmes = sum(1 for s in top10 if s['sexe'] == 'F')
+
+        # Sexe sous-représenté dans l'entreprise globale, pas dans le top 10
+        total_hommes = int(self.hommes.sum())
+        total_femmes = int(self.femmes.sum())
+        if total_femmes < total_hommes:
+            sexe_sous_represente = 'F'
+            nb_sexe_sous_represente = nb_femmes
+        else:
+            sexe_sous_represente = 'M'
+            nb_sexe_sous_represente = nb_hommes
+
+        return {
+            'score': DSNParser.score_indicateur_top10(nb_sexe_sous_represente),
+            'score_max': 10,
+            'top10': top10,
+            'nb_hommes': nb_hommes,
+            'nb_femmes': nb_femmes,
+            'sexe_sous_represente': 'Femmes' if sexe_sous_represente == 'F' else 'Hommes',
+            'nb_sexe_sous_represente': nb_sexe_sous_represente,
+            'total_entreprise_hommes': total_hommes,
+            'total_entreprise_femmes': total_femmes,
+            'message': None
+        }
+
+
+def _somme(valeurs: np.ndarray) -> float:
+    """Somme séquentielle (même ordre d'addition que sum() sur une liste)"""
+    return float(np.bincount(np.zeros(len(valeurs), dtype=np.int64), weights=valeurs, minlength=1)[0])
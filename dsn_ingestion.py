@@ -0,0 +1,226 @@
+"""
+Réception des fichiers DSN uploadés en une seule lecture
+Le fichier est parsé pendant sa lecture depuis la requête (FileStorage.stream) : le même
+passage calcule l'empreinte SHA-256 du contenu, lit l'en-tête et, si demandé, écrit la
+copie dans uploads/. Le parser obtenu est rangé dans le cache de parsing sous la clé de
+l'empreinte : l'analyse qui suit (dans la requête ou dans un worker de dsn_jobs) le
+retrouve sans relire ni re-hacher le fichier.
+
+Une archive .zip ou .gz de DSN mensuelles est décompressée membre par membre, en flux :
+chaque mois est parsé pendant sa décompression, sans extraire l'archive sur le disque
+(seule la copie du membre est écrite si elle est conservée).
+
+Si une base de faits est fournie (DSN_FAITS, voir dsn_faits), le fichier est parsé par
+ParserFaits et ses faits sont chargés dans la base avant que le parser soit mis en cache.
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from werkzeug.utils import secure_filename
+
+from dsn_faits import ParserFaits
+from dsn_header import lire_entete
+from dsn_parser import DSNParser
+from dsn_pool import NB_SALARIES_DETAIL
+from dsn_timing import CHRONO_INACTIF, Chronometre
+
+# Taille des lectures sur le flux de la requête
+TAILLE_TAMPON = 64 * 1024
+
+# Début du fichier conservé pour la lecture de l'en-tête (S10/S20 avant le premier salarié)
+TAILLE_TETE = 64 * 1024
+
+# Extensions des archives de DSN acceptées à l'upload
+EXTENSIONS_ARCHIVES = ('.zip', '.gz')
+
+
+class FluxEmpreinte(io.RawIOBase):
+    """
+    Flux binaire qui relit une source en calculant son empreinte au passage
+
+    Chaque bloc lu est ajouté au SHA-256, écrit dans la copie (si fournie) et compté ;
+    les TAILLE_TETE premiers octets sont gardés pour la lecture de l'en-tête.
+    """
+
+    def __init__(self, source: BinaryIO, copie: Optional[BinaryIO] = None):
+        self.source = source
+        self.copie = copie
+        self.sha256 = hashlib.sha256()
+        self.octets = 0
+        self.tete = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, tampon) -> int:
+        bloc = self.source.read(len(tampon))
+        if not bloc:
+            return 0
+        n = len(bloc)
+        tampon[:n] = bloc
+        self.sha256.update(bloc)
+        if self.copie is not None:
+            self.copie.write(bloc)
+        if len(self.tete) < TAILLE_TETE:
+            self.tete += bloc[:TAILLE_TETE - len(self.tete)]
+        self.octets += n
+        return n
+
+    def terminer(self):
+        """Lit la fin éventuelle de la source (non consommée par le parser)"""
+        tampon = bytearray(TAILLE_TAMPON)
+        while self.readinto(tampon):
+            pass
+
+    def empreinte(self) -> str:
+        return self.sha256.hexdigest()
+
+
+def format_taille(octets: int) -> str:
+    """Taille affichée dans la liste des fichiers (KB ou MB)"""
+    if octets < 1024 * 1024:
+        return f"{octets / 1024:.2f} KB"
+    return f"{octets / (1024 * 1024):.2f} MB"
+
+
+def est_archive(filename: str) -> bool:
+    """Vrai si le fichier uploadé est une archive de DSN (.zip ou .gz)"""
+    return filename.lower().endswith(EXTENSIONS_ARCHIVES)
+
+
+def ingerer_upload(fichier: Any, chemin: str, conserver: bool = True, cache: Any = None,
+                   chrono: Chronometre = CHRONO_INACTIF, faits: Any = None) -> Dict[str, Any]:
+    """
+    Parse un fichier uploadé pendant sa lecture depuis la requête
+
+    Args:
+        fichier: Fichier de la requête (werkzeug FileStorage)
+        chemin: Chemin de la copie dans uploads/
+        conserver: Écrire la copie du fichier (nécessaire pour les recalculs avec keep_files ;
+                   sans copie, path vaut None et l'analyse s'appuie sur le parser renvoyé
+                   ou, dans un worker de dsn_jobs, sur le cache de parsing)
+        cache: Cache de parsing (ParseCache) où ranger le parser
+        chrono: Chronomètre de la requête (étapes encodage / lecture, compteurs de parsing)
+        faits: Base de faits (BaseFaits) où charger le fichier, ou None
+
+    Returns:
+        Infos du fichier (filename, size, path, entete, empreinte), comme pour un fichier sauvegardé,
+        et le parser obtenu (clé 'parser', à retirer avant de sérialiser les infos : voir
+        app.parsers_recus)
+    """
+    return _ingerer(fichier.stream, fichier.filename, chemin, conserver, cache, chrono, faits)
+
+
+def ingerer_archive(fichier: Any, upload_folder: str, conserver: bool = True, cache: Any = None,
+                    chrono: Chronometre = CHRONO_INACTIF, faits: Any = None) -> List[Dict[str, Any]]:
+    """
+    Parse les DSN d'une archive uploadée (.zip : un membre par mois, .gz : un seul fichier)
+
+    Chaque membre est décompressé en flux et parsé au fil de la décompression ; sa copie
+    (si conservée) est écrite dans upload_folder sous son nom sans dossier (secure_filename).
+
+    Returns:
+        Infos des fichiers de l'archive, comme ingerer_upload
+
+    Raises:
+        ValueError: Archive illisible ou sans fichier DSN
+    """
+    archive = fichier.filename
+    files_info = []
+
+    try:
+        if archive.lower().endswith('.gz'):
+            nom = secure_filename(os.path.basename(archive[:-3])) or 'dsn'
+            with gzip.GzipFile(fileobj=fichier.stream, mode='rb') as membre:
+                files_info.append(_ingerer(membre, nom, os.path.join(upload_folder, nom),
+                                           conserver, cache, chrono, faits))
+        else:
+            # Le répertoire central est en fin d'archive : zipfile relit le flux de la requête
+            # (mis en tampon par werkzeug) ; seuls les membres sont décompressés, un par un
+            with zipfile.ZipFile(fichier.stream) as zf:
+                for info in zf.infolist():
+                    nom = os.path.basename(info.filename)
+                    if info.is_dir() or not nom or nom.startswith('.') or info.filename.startswith('__MACOSX/'):
+                        continue
+                    nom = secure_filename(nom) or 'dsn'
+                    with zf.open(info) as membre:
+                        files_info.append(_ingerer(membre, nom, os.path.join(upload_folder, nom),
+                                                   conserver, cache, chrono, faits))
+    except (zipfile.BadZipFile, gzip.BadGzipFile, EOFError, zlib.error) as e:
+        raise ValueError(f"Archive {archive} illisible : {e}") from e
+
+    if not files_info:
+        raise ValueError(f"Aucun fichier DSN dans l'archive {archive}")
+    chrono.compter('archives_ingerees')
+    for file_info in files_info:
+        file_info['archive'] = archive
+    return files_info
+
+
+def _ingerer(source: BinaryIO, filename: str, chemin: str, conserver: bool, cache: Any,
+             chrono: Chronometre, faits: Any = None) -> Dict[str, Any]:
+    """Parse un flux binaire en calculant son empreinte et en écrivant sa copie éventuelle"""
+    copie = tmp_path = None
+    if conserver:
+        # Fichier temporaire propre à la requête : deux uploads du même nom (deux utilisateurs,
+        # une nouvelle tentative) n'écrivent pas dans le même fichier
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(chemin) or '.',
+                                        prefix=f".{os.path.basename(chemin)}.", suffix='.tmp')
+        copie = os.fdopen(fd, 'wb')
+    try:
+        flux = FluxEmpreinte(source, copie)
+        classe = DSNParser if faits is None else ParserFaits
+        parser = classe(keep_raw_lines=0, keep_blocks=False, keep_remunerations=NB_SALARIES_DETAIL)
+        parser.parse_stream(io.BufferedReader(flux, TAILLE_TAMPON))
+        flux.terminer()
+        if copie is not None:
+            copie.close()
+            os.replace(tmp_path, chemin)
+    except BaseException:
+        if copie is not None:
+            copie.close()
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+        raise
+
+    empreinte = flux.empreinte()
+    entete = lire_entete(io.BytesIO(bytes(flux.tete)))
+    chrono.compter('fichiers_ingeres')
+    chrono.compter_parsing(parser, flux.octets)
+    if faits is not None:
+        _charger_faits(faits, parser, entete, filename, empreinte, chrono)
+    if cache is not None:
+        cache.put(cache.key_for_digest(empreinte), parser)
+
+    return {
+        'filename': filename,
+        'size': format_taille(flux.octets),
+        # Sans copie, aucun chemin : l'analyse ne doit jamais relire un autre fichier du même nom
+        'path': chemin if conserver else None,
+        'entete': entete,
+        'empreinte': empreinte,
+        'parser': parser,
+    }
+
+
+def _charger_faits(faits: Any, parser: ParserFaits, entete: Dict[str, Any], filename: str,
+                   empreinte: str, chrono: Chronometre):
+    """Charge les faits du fichier dans la base (une erreur de la base n'empêche pas l'analyse)"""
+    try:
+        if entete['siret'] and entete['mois_cle'] != '999999':
+            with chrono.etape('faits'):
+                if faits.charger(parser, entete['siret'], entete['mois_cle'], filename, empreinte):
+                    chrono.compter('declarations_chargees')
+    except Exception as e:
+        print(f"Chargement de {filename} dans la base de faits impossible : {e}")
+    finally:
+        parser.liberer_faits()
@@ -0,0 +1,424 @@
+"""
+File de jobs d'analyse DSN (SQLite, sans broker externe)
+Les pages d'analyse enregistrent un job et répondent immédiatement avec son identifiant ;
+des processus workers (python dsn_jobs.py) exécutent les jobs et publient leur avancement
+(étape, fichiers parsés, lignes par seconde) que la page interroge sur /jobs/<id>.
+
+La file est une base SQLite (mode WAL) partagée par tous les processus de la machine :
+workers gunicorn qui soumettent les jobs et workers d'analyse qui les exécutent. Un job
+n'est réservé que par un seul worker (transaction BEGIN IMMEDIATE). Le résultat d'un job
+terminé est écrit à côté de la base (pickle), puis relu par la page pour l'affichage.
+
+Les workers sont démarrés à la demande par l'application (assurer_workers) et s'arrêtent
+après une période d'inactivité ; ils peuvent aussi être lancés à part :
+    python dsn_jobs.py [--workers 2] [--inactivite 0]
+
+Variables d'environnement :
+    DSN_JOBS_DB           base de la file (par défaut uploads/.jobs/jobs.db)
+    DSN_JOBS_RETENTION_H  durée de conservation des jobs terminés (heures, 24 par défaut)
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from dsn_timing import Chronometre
+
+# Base SQLite de la file (les résultats sont écrits dans le même dossier)
+JOBS_DB = os.environ.get('DSN_JOBS_DB', os.path.join('uploads', '.jobs', 'jobs.db'))
+
+# Conservation des jobs terminés et de leurs résultats
+RETENTION_SECONDES = float(os.environ.get('DSN_JOBS_RETENTION_H', 24)) * 3600
+
+# Un worker sans battement depuis ce délai est considéré comme arrêté
+DELAI_BATTEMENT = 5
+DELAI_WORKER_MORT = 30
+
+# Arrêt d'un worker démarré à la demande après cette durée sans job (secondes)
+INACTIVITE_DEFAUT = 600
+
+# Intervalle minimal entre deux écritures de l'avancement d'un job (secondes)
+INTERVALLE_AVANCEMENT = 0.5
+
+# Intervalle entre deux nettoyages de la file par un worker inoccupé (secondes)
+INTERVALLE_NETTOYAGE = 30
+
+# Statuts d'un job
+EN_ATTENTE = 'en_attente'
+EN_COURS = 'en_cours'
+TERMINE = 'termine'
+ERREUR = 'erreur'
+
+# Type de job -> fonction d'analyse, appelée avec les paramètres du job et les mots-clés
+# cache, chrono et suivi (voir @tache et dsn_analyses)
+TACHES: Dict[str, Callable[..., Any]] = {}
+
+# Modules déclarant des tâches, importés par les workers
+MODULES_TACHES = ('dsn_analyses',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    statut TEXT NOT NULL,
+    parametres TEXT NOT NULL,
+    contexte TEXT,
+    etape TEXT,
+    fichiers_total INTEGER DEFAULT 0,
+    fichiers_parses INTEGER DEFAULT 0,
+    lignes INTEGER DEFAULT 0,
+    lignes_par_seconde REAL DEFAULT 0,
+    erreur TEXT,
+    durees TEXT,
+    worker_pid INTEGER,
+    cree_le REAL NOT NULL,
+    demarre_le REAL,
+    termine_le REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_statut ON jobs (statut, cree_le);
+CREATE TABLE IF NOT EXISTS workers (
+    pid INTEGER PRIMARY KEY,
+    battement REAL NOT NULL
+);
+"""
+
+
+def tache(nom: str):
+    """Décorateur enregistrant une fonction d'analyse comme type de job"""
+    def decorator(func):
+        TACHES[nom] = func
+        return func
+    return decorator
+
+
+class FileJobs:
+    """File de jobs persistée dans SQLite"""
+
+    def __init__(self, chemin: str = JOBS_DB):
+        self.chemin = chemin
+        self.dossier = os.path.dirname(chemin) or '.'
+        os.makedirs(self.dossier, exist_ok=True)
+        with self._connexion() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connexion(self) -> Iterator[sqlite3.Connection]:
+        """Connexion en autocommit (transactions explicites par BEGIN IMMEDIATE), fermée en sortie"""
+        conn = sqlite3.connect(self.chemin, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transaction avec verrou d'écriture immédiat (une seule à la fois sur la base)"""
+        with self._connexion() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _chemin_resultat(self, job_id: str) -> str:
+        return os.path.join(self.dossier, f"{job_id}.pkl")
+
+    # --- Côté application ---
+
+    def soumettre(self, type_job: str, parametres: Dict[str, Any],
+                  contexte: Optional[Dict[str, Any]] = None, fichiers_total: int = 0) -> str:
+        """
+        Ajoute un job à la file
+
+        Args:
+            type_job: Type de job (clé de TACHES)
+            parametres: Arguments de la fonction d'analyse (sérialisables en JSON)
+            contexte: Données d'affichage de la page (fichiers, filtres...), non utilisées par le worker
+            fichiers_total: Nombre de fichiers à parser (avancement)
+
+        Returns:
+            Identifiant du job
+        """
+        job_id = uuid.uuid4().hex
+        with self._connexion() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, type, statut, parametres, contexte, etape, fichiers_total, cree_le) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, type_job, EN_ATTENTE, json.dumps(parametres), json.dumps(contexte or {}),
+                 EN_ATTENTE, fichiers_total, time.time())
+            )
+        return job_id
+
+    def lire(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job (statut, avancement, paramètres, contexte) ou None s'il n'existe pas"""
+        with self._connexion() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for champ in ('parametres', 'contexte', 'durees'):
+            job[champ] = json.loads(job[champ]) if job[champ] else {}
+        return job
+
+    def resultat(self, job_id: str) -> Any:
+        """Résultat d'un job terminé (FileNotFoundError s'il a été purgé)"""
+        with open(self._chemin_resultat(job_id), 'rb') as f:
+            return pickle.load(f)
+
+    def workers_actifs(self) -> int:
+        """Nombre de workers ayant signalé leur activité récemment"""
+        with self._connexion() as conn:
+            return conn.execute("SELECT COUNT(*) FROM workers WHERE battement > ?",
+                                (time.time() - DELAI_WORKER_MORT,)).fetchone()[0]
+
+    def assurer_workers(self, nombre: int):
+        """
+        Démarre des workers d'analyse si moins de `nombre` sont actifs sur la machine
+
+        Le comptage et l'enregistrement des nouveaux workers se font dans la même transaction :
+        deux processus gunicorn qui soumettent un job en même temps ne démarrent pas chacun
+        leurs workers.
+        """
+        if nombre <= 0:
+            return
+        with self._transaction() as conn:
+            maintenant = time.time()
+            actifs = conn.execute("SELECT COUNT(*) FROM workers WHERE battement > ?",
+                                  (maintenant - DELAI_WORKER_MORT,)).fetchone()[0]
+            for _ in range(nombre - actifs):
+                processus = subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), '--db', self.chemin,
+                     '--inactivite', str(INACTIVITE_DEFAUT)],
+                    cwd=os.getcwd(), stdin=subprocess.DEVNULL, start_new_session=True
+                )
+                conn.execute("INSERT OR REPLACE INTO workers (pid, battement) VALUES (?, ?)",
+                             (processus.pid, maintenant))
+                print(f"Worker d'analyse démarré (pid {processus.pid})")
+
+    # --- Côté worker ---
+
+    def reserver(self, pid: int) -> Optional[Dict[str, Any]]:
+        """Réserve le plus ancien job en attente pour ce worker (None si la file est vide)"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id FROM jobs WHERE statut = ? ORDER BY cree_le LIMIT 1",
+                               (EN_ATTENTE,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET statut = ?, etape = ?, worker_pid = ?, demarre_le = ? WHERE id = ?",
+                             (EN_COURS, 'demarrage', pid, time.time(), row['id']))
+        return self.lire(row['id']) if row is not None else None
+
+    def avancement(self, job_id: str, **champs: Any):
+        """Met à jour l'avancement d'un job (etape, fichiers_parses, lignes, lignes_par_seconde)"""
+        colonnes = ', '.join(f"{nom} = ?" for nom in champs)
+        with self._connexion() as conn:
+            conn.execute(f"UPDATE jobs SET {colonnes} WHERE id = ?", (*champs.values(), job_id))
+
+    def terminer(self, job_id: str, resultat: Any, durees: Optional[Dict[str, Any]] = None):
+        """Enregistre le résultat d'un job et le marque terminé"""
+        chemin = self._chemin_resultat(job_id)
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(resultat, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, chemin)
+        with self._connexion() as conn:
+            conn.execute("UPDATE jobs SET statut = ?, etape = ?, durees = ?, termine_le = ? WHERE id = ?",
+                         (TERMINE, TERMINE, json.dumps(durees or {}), time.time(), job_id))
+
+    def echouer(self, job_id: str, message: str):
+        """Marque un job en erreur"""
+        with self._connexion() as conn:
+            conn.execute("UPDATE jobs SET statut = ?, etape = ?, erreur = ?, termine_le = ? WHERE id = ?",
+                         (ERREUR, ERREUR, message, time.time(), job_id))
+
+    def battement(self, pid: int):
+        """Signale qu'un worker est actif"""
+        with self._connexion() as conn:
+            conn.execute("INSERT OR REPLACE INTO workers (pid, battement) VALUES (?, ?)", (pid, time.time()))
+
+    def retirer_worker(self, pid: int):
+        with self._connexion() as conn:
+            conn.execute("DELETE FROM workers WHERE pid = ?", (pid,))
+
+    def nb_en_attente(self) -> int:
+        with self._connexion() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE statut = ?", (EN_ATTENTE,)).fetchone()[0]
+
+    def nettoyer(self):
+        """Passe en erreur les jobs des workers arrêtés et purge les jobs terminés trop anciens"""
+        maintenant = time.time()
+        with self._connexion() as conn:
+            conn.execute("DELETE FROM workers WHERE battement < ?", (maintenant - DELAI_WORKER_MORT,))
+            conn.execute(
+                "UPDATE jobs SET statut = ?, etape = ?, erreur = ?, termine_le = ? "
+                "WHERE statut = ? AND worker_pid NOT IN (SELECT pid FROM workers)",
+                (ERREUR, ERREUR, "Analyse interrompue (arrêt du worker)", maintenant, EN_COURS)
+            )
+            anciens = [row['id'] for row in conn.execute(
+                "SELECT id FROM jobs WHERE statut IN (?, ?) AND termine_le < ?",
+                (TERMINE, ERREUR, maintenant - RETENTION_SECONDES)
+            )]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in anciens])
+        for job_id in anciens:
+            try:
+                os.remove(self._chemin_resultat(job_id))
+            except OSError:
+                pass
+
+
+class SuiviJob:
+    """
+    Avancement d'un job, appelé par les analyses : suivi(etape) à chaque changement
+    d'étape et suivi('parsing', parser) à chaque fichier parsé (ou servi par le cache)
+    """
+
+    def __init__(self, file: FileJobs, job_id: str):
+        self.file = file
+        self.job_id = job_id
+        self.etape = None
+        self.fichiers_parses = 0
+        self.lignes = 0
+        self.debut = time.perf_counter()
+        self.derniere_ecriture = 0.0
+
+    def __call__(self, etape: str, parser: Any = None):
+        nouvelle_etape = etape != self.etape
+        self.etape = etape
+        if parser is not None:
+            self.fichiers_parses += 1
+            self.lignes += parser.stats['total_lines']
+
+        maintenant = time.perf_counter()
+        if nouvelle_etape or maintenant - self.derniere_ecriture >= INTERVALLE_AVANCEMENT:
+            self.derniere_ecriture = maintenant
+            duree = maintenant - self.debut
+            self.file.avancement(self.job_id, etape=etape, fichiers_parses=self.fichiers_parses,
+                                 lignes=self.lignes,
+                                 lignes_par_seconde=round(self.lignes / duree) if duree else 0)
+
+
+def executer_job(file: FileJobs, job: Dict[str, Any], cache: Any = None):
+    """Exécute un job réservé et enregistre son résultat (ou son erreur)"""
+    import dsn_metrics
+    import dsn_timing
+
+    chrono = Chronometre()
+    fonction = TACHES.get(job['type'])
+    try:
+        if fonction is None:
+            raise ValueError(f"Type de job inconnu : {job['type']}")
+        resultat = fonction(**job['parametres'], cache=cache, chrono=chrono,
+                            suivi=SuiviJob(file, job['id']))
+        file.terminer(job['id'], resultat, chrono.resume())
+    except Exception as e:
+        traceback.print_exc()
+        file.echouer(job['id'], f"Erreur lors de l'analyse des fichiers : {str(e)}")
+
+    if dsn_timing.TIMING_ACTIF:
+        chrono.journaliser(f"job_{job['type']}")
+    dsn_metrics.enregistrer(f"job_{job['type']}", chrono)
+
+
+def executer_worker(chemin_db: str = JOBS_DB, inactivite: Optional[float] = None,
+                    intervalle: float = 0.5):
+    """
+    Boucle d'un worker : réserve et exécute les jobs jusqu'à `inactivite` secondes sans job
+
+    Args:
+        chemin_db: Base SQLite de la file
+        inactivite: Arrêt après ce délai sans job (None ou 0 = jamais)
+        intervalle: Attente entre deux consultations de la file vide (secondes)
+    """
+    from dsn_cache import ParseCache
+
+    for module in MODULES_TACHES:
+        __import__(module)
+
+    file = FileJobs(chemin_db)
+    pid = os.getpid()
+    # Cache de parsing partagé avec l'application par le dossier disque
+    cache = ParseCache(max_disk_bytes=int(os.environ.get('DSN_CACHE_MAX_MB', 512)) * 1024 * 1024)
+
+    arret = threading.Event()
+
+    def battre():
+        while not arret.wait(DELAI_BATTEMENT):
+            file.battement(pid)
+
+    file.battement(pid)
+    threading.Thread(target=battre, daemon=True).start()
+    print(f"Worker d'analyse {pid} en attente de jobs ({chemin_db})")
+
+    derniere_activite = time.monotonic()
+    dernier_nettoyage = 0.0
+    try:
+        while True:
+            job = file.reserver(pid)
+            if job is not None:
+                print(f"Worker {pid} : job {job['id']} ({job['type']})")
+                executer_job(file, job, cache)
+                derniere_activite = time.monotonic()
+                continue
+
+            if inactivite and time.monotonic() - derniere_activite > inactivite:
+                # Se retirer puis vérifier une dernière fois la file : un job soumis entre-temps
+                # sans démarrer de worker (celui-ci paraissant actif) n'est pas oublié
+                file.retirer_worker(pid)
+                if file.nb_en_attente() == 0:
+                    break
+                file.battement(pid)
+                derniere_activite = time.monotonic()
+                continue
+
+            if time.monotonic() - dernier_nettoyage > INTERVALLE_NETTOYAGE:
+                file.nettoyer()
+                dernier_nettoyage = time.monotonic()
+            time.sleep(intervalle)
+    finally:
+        arret.set()
+        file.retirer_worker(pid)
+        print(f"Worker d'analyse {pid} arrêté")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workers d'analyse DSN (file de jobs SQLite)")
+    parser.add_argument('--db', default=JOBS_DB, help="Base SQLite de la file")
+    parser.add_argument('--workers', type=int, default=1, help="Nombre de processus workers")
+    parser.add_argument('--inactivite', type=float, default=0,
+                        help="Arrêt après ce nombre de secondes sans job (0 = jamais)")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        executer_worker(args.db, args.inactivite)
+        return
+
+    import multiprocessing
+    processus: List[multiprocessing.Process] = [
+        multiprocessing.Process(target=executer_worker, args=(args.db, args.inactivite))
+        for _ in range(args.workers)
+    ]
+    for p in processus:
+        p.start()
+    for p in processus:
+        p.join()
+
+
+if __name__ == '__main__':
+    # Passer par le module importable : les tâches (@tache) s'enregistrent dans dsn_jobs.TACHES,
+    # pas dans celles de __main__
+    from dsn_jobs import main as main_worker
+    main_worker()
@@ -0,0 +1,143 @@
+"""
+Métriques Prometheus des analyses DSN (endpoint /metrics)
+Latence des requêtes par route, durée des étapes, octets et lignes parsés, débit du
+parsing, hits du cache de parsing et de la nomenclature PCS-ESE, pic mémoire.
+
+La latence de toutes les requêtes (pages, API, /metrics, fichiers statiques, erreurs) est
+observée par des hooks de l'application, par règle de route et code de statut ; les
+durées d'étapes et compteurs de parsing sont alimentés à la fin de chaque analyse à
+partir du Chronometre de la requête (voir dsn_timing). Sous gunicorn, chaque worker est un processus distinct :
+avec PROMETHEUS_MULTIPROC_DIR (positionné par gunicorn.conf.py), prometheus_client écrit
+les valeurs dans des fichiers partagés et /metrics agrège tous les workers.
+
+prometheus_client est optionnel : sans lui, /metrics répond 501 et rien n'est mesuré.
+
+Variables d'environnement :
+    DSN_METRICS=0              désactive les métriques
+    PROMETHEUS_MULTIPROC_DIR   dossier partagé entre workers (mode multi-processus)
+"""
+
+import os
+from typing import Optional, Tuple
+
+from dsn_timing import Chronometre
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:
+    prometheus_client = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_DISPONIBLES = prometheus_client is not None
+METRICS_ACTIF = METRICS_DISPONIBLES and os.environ.get('DSN_METRICS', '1') not in ('', '0')
+
+# Mode multi-processus : dossier partagé entre workers gunicorn
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# Latences : de 10 ms (page sans fichier) à 2 min (12 mois de gros établissement)
+BUCKETS_DUREE = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# Débit du parsing en lignes par seconde
+BUCKETS_DEBIT = (25_000, 50_000, 100_000, 200_000, 300_000, 400_000, 600_000, 1_000_000, 2_000_000)
+
+if METRICS_ACTIF:
+    REQUETE_DUREE = Histogram(
+        'dsn_requete_duree_secondes', "Durée des requêtes par règle de route et code de statut",
+        ['route', 'statut'], buckets=BUCKETS_DUREE)
+    ETAPE_DUREE = Histogram(
+        'dsn_etape_duree_secondes', "Durée des étapes d'une analyse (encodage, lecture, indicateurs...)",
+        ['route', 'etape'], buckets=BUCKETS_DUREE)
+    OCTETS_PARSES = Counter(
+        'dsn_octets_parses', "Octets de fichiers DSN parsés (hors cache)")
+    LIGNES_PARSEES = Counter(
+        'dsn_lignes_parsees', "Lignes DSN parsées (hors cache)")
+    LIGNES_ANALYSEES = Counter(
+        'dsn_lignes_analysees', "Lignes DSN analysées (parsées ou servies par le cache)", ['route'])
+    SALARIES_ANALYSES = Counter(
+        'dsn_salaries_analyses', "Salariés analysés", ['route'])
+    DEBIT_PARSING = Histogram(
+        'dsn_debit_parsing_lignes_par_seconde',
+        "Débit du parsing d'une requête (lignes parsées / temps d'encodage et de lecture cumulé)",
+        buckets=BUCKETS_DEBIT)
+    CACHE_PARSING = Counter(
+        'dsn_cache_parsing_fichiers', "Fichiers servis par le cache de parsing (hit) ou parsés (miss)",
+        ['resultat'])
+    CACHE_NOMENCLATURE = Counter(
+        'dsn_cache_nomenclature_resolutions', "Résolutions de codes PCS-ESE mémorisées (hit) ou calculées (miss)",
+        ['resultat'])
+    MEMOIRE_PIC = Gauge(
+        'dsn_memoire_pic_octets', "Pic de mémoire résidente (RSS) après une analyse, processus ou pool de parsing",
+        ['route'], multiprocess_mode='max')
+
+
+def pic_memoire() -> Optional[int]:
+    """Pic de mémoire résidente (octets) du processus et de ses processus de parsing"""
+    if resource is None:
+        return None
+    pic = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    return pic if os.uname().sysname == 'Darwin' else pic * 1024
+
+
+def observer_requete(route: str, statut: int, secondes: float):
+    """
+    Latence d'une requête
+
+    Args:
+        route: Règle de la route (ex: /jobs/<job_id>), pas l'URL : nombre de séries borné
+        statut: Code de statut HTTP de la réponse (500 si la vue a levé une exception)
+    """
+    if METRICS_ACTIF:
+        REQUETE_DUREE.labels(route, str(statut)).observe(secondes)
+
+
+def enregistrer(route: str, chrono: Chronometre):
+    """Alimente les métriques avec les durées d'étapes et compteurs d'une analyse"""
+    if not METRICS_ACTIF or not chrono.actif:
+        return
+
+    for etape, secondes in chrono.durees.items():
+        ETAPE_DUREE.labels(route, etape).observe(secondes)
+
+    compteurs = chrono.compteurs
+    if not compteurs:
+        # Affichage de la page sans fichier : ni parsing ni indicateurs
+        return
+
+    OCTETS_PARSES.inc(compteurs.get('octets_parses', 0))
+    LIGNES_PARSEES.inc(compteurs.get('lignes_parsees', 0))
+    LIGNES_ANALYSEES.labels(route).inc(compteurs.get('lignes', 0))
+    SALARIES_ANALYSES.labels(route).inc(compteurs.get('salaries', 0))
+
+    duree_parsing = chrono.durees.get('encodage', 0.0) + chrono.durees.get('lecture', 0.0)
+    if compteurs.get('lignes_parsees') and duree_parsing > 0:
+        DEBIT_PARSING.observe(compteurs['lignes_parsees'] / duree_parsing)
+
+    CACHE_PARSING.labels('hit').inc(compteurs.get('fichiers_en_cache', 0))
+    CACHE_PARSING.labels('miss').inc(compteurs.get('fichiers_parses', 0))
+    CACHE_NOMENCLATURE.labels('hit').inc(compteurs.get('nomenclature_hits', 0))
+    CACHE_NOMENCLATURE.labels('miss').inc(compteurs.get('nomenclature_misses', 0))
+
+    pic = pic_memoire()
+    if pic is not None:
+        MEMOIRE_PIC.labels(route).set(pic)
+
+
+def exposer() -> Tuple[bytes, str]:
+    """
+    Texte Prometheus de toutes les métriques
+
+    Returns:
+        Tuple (contenu, type MIME) ; en mode multi-processus, agrège les fichiers de tous les workers
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -3,13 +3,65 @@ Parser pour fichiers DSN (Déclaration Sociale Nominative)
 Format: Lignes de 200 caractères avec structure S21.G00.05 (code rubrique)
 """
 
-import chardet
-import re
+import codecs
+import io
+import mmap
 import sqlite3
 import os
-from typing import List, Dict, Any, Optional
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from collections import defaultdict
-from datetime import datetime
+
+import dsn_dates
+from dsn_encodage import detecter_encodage
+from dsn_records import Remuneration, Salarie
+from dsn_timeline import TimelineIndex
+from dsn_timing import CHRONO_INACTIF, Chronometre
+from dsn_tokenizer import DSNTokenizer, DSNTokenizerOctets, encodage_compatible_ascii, split_line
+
+# Version du contenu produit par le parser (stats des salariés, rémunérations...)
+# À incrémenter à chaque changement des données extraites : invalide le cache de parsing
+PARSER_VERSION = 7
+
+# Octets lus en début de fichier pour la détection de l'encodage
+TAILLE_DETECTION_ENCODAGE = 10000
+
+# Parsing mmap (voir DSNParser.parse_mmap) : taille des fenêtres découpées en lignes,
+# et taille de fichier à partir de laquelle parse() l'utilise (0 = jamais)
+TAILLE_FENETRE_MMAP = 1024 * 1024
+SEUIL_MMAP = int(os.environ.get('DSN_MMAP_SEUIL_MB', 32)) * 1024 * 1024
+
+
+def rubrique_handler(*rubriques: str):
+    """Décorateur : déclare une méthode de DSNParser comme handler des rubriques données"""
+    def decorator(func):
+        func._rubriques = rubriques
+        return func
+    return decorator
+
+
+def _handler_champ_salarie(champ: str) -> Callable[['DSNParser', str], None]:
+    """Crée un handler qui recopie la valeur dans le champ `champ` du salarié en cours"""
+    # Valeurs internées : codes répétés d'un salarié à l'autre, noms et matricules d'un mois à l'autre
+    def handler(parser: 'DSNParser', valeur: str):
+        if parser.stats['salaries']:
+            parser.stats['salaries'][-1][champ] = sys.intern(valeur)
+    handler.__name__ = f'_handle_{champ}'
+    return handler
+
+
+def _handler_date_salarie(champ: str) -> Callable[['DSNParser', str], None]:
+    """Crée un handler qui recopie une date DDMMYYYY dans `champ` et son entier YYYYMMDD dans `champ`_int"""
+    champ_int = f'{champ}_int'
+
+    def handler(parser: 'DSNParser', valeur: str):
+        if parser.stats['salaries']:
+            salarie = parser.stats['salaries'][-1]
+            salarie[champ] = sys.intern(valeur)
+            salarie[champ_int] = dsn_dates.date_vers_int(valeur)
+    handler.__name__ = f'_handle_{champ}'
+    return handler
 
 
 class DSNParser:
@@ -17,6 +69,22 @@ class DSNParser:
 
     # Cache pour la nomenclature PCS-ESE
     _nomenclature_pcs_ese = None
+    # Index par préfixe de la nomenclature (groupe -> CSP -> code complet) : préfixe -> premier libellé
+    _prefixes_pcs_ese = None
+    # Index parallèle, mêmes préfixes : préfixe -> (groupe, CSP) du code
+    _niveaux_pcs_ese = None
+    # Résolution mémorisée par code PCS-ESE : (groupe, groupe_code, csp, libellé CSP, libellé emploi),
+    # seulement pour les préfixes de l'index (taille bornée par la nomenclature)
+    _resolutions_pcs_ese = {}
+
+    # Groupe de CSP selon le premier chiffre du code PCS-ESE (nomenclature INSEE)
+    GROUPES_PCS_ESE = {
+        '2': 'Artisans, commerçants et chefs d\'entreprise',
+        '3': 'Ingénieurs et cadres',  # Cadres et professions intellectuelles supérieures
+        '4': 'Techniciens et agents de maîtrise',  # Professions intermédiaires
+        '5': 'Employés',
+        '6': 'Ouvriers',
+    }
 
     # Table de correspondance des types de rémunération (S21.G00.51.011)
     TYPES_REMUNERATION = {
@@ -43,12 +111,62 @@ class DSNParser:
         '027': 'Autre type de rémunération',
     }
 
-    def __init__(self):
+    # Rubriques recopiées telles quelles sur le salarié en cours
+    CHAMPS_SALARIE = {
+        'S21.G00.30.002': 'nom',                   # Nom
+        'S21.G00.30.004': 'prenom',                # Prénom
+        'S21.G00.30.019': 'matricule',             # Matricule
+        'S21.G00.40.003': 'statut_retraite',       # Statut catégoriel Retraite Complémentaire
+        'S21.G00.40.007': 'statut',                # Statut conventionnel
+        'S21.G00.40.008': 'qualification',         # Niveau de qualification
+        'S21.G00.40.041': 'position_convention',   # Positionnement dans la convention collective
+    }
+
+    # Dates recopiées sur le salarié en cours, avec leur forme entière YYYYMMDD (champ_int)
+    DATES_SALARIE = {
+        'S21.G00.30.006': 'date_naissance',        # Date de naissance
+        'S21.G00.30.020': 'date_naissance',
+        'S21.G00.40.001': 'date_embauche',         # Date d'embauche
+        'S21.G00.62.001': 'date_sortie',           # Date de sortie
+    }
+
+    # Rubrique -> handler(parser, valeur). Les rubriques absentes sont ignorées sans autre coût
+    # qu'une recherche dans ce dictionnaire (voir register_handler pour en ajouter)
+    RUBRIQUE_HANDLERS: Dict[str, Callable[['DSNParser', str], None]] = {}
+
+    def __init__(self, keep_raw_lines: Optional[int] = 100,
+                 keep_blocks: Union[bool, Iterable[str]] = False,
+                 keep_remunerations: Optional[int] = None):
+        """
+        Args:
+            keep_raw_lines: Nombre de premières lignes brutes conservées (0 = aucune, None = toutes)
+            keep_blocks: Enregistrements conservés par rubrique dans self.blocks :
+                         False (aucun), True (tous) ou liste des rubriques à conserver
+            keep_remunerations: Nombre de premiers salariés pour lesquels le détail des
+                                rémunérations est conservé (0 = aucun, None = tous). Les totaux
+                                par type (remunerations_par_type) sont toujours calculés.
+        """
+        self.keep_raw_lines = keep_raw_lines
+        self.keep_remunerations = keep_remunerations
+        if keep_blocks is True:
+            self.keep_blocks = True
+        elif keep_blocks:
+            self.keep_blocks = frozenset(keep_blocks)
+        else:
+            self.keep_blocks = None
         self.blocks = defaultdict(list)
         self.raw_lines = []
+        self.rubriques_trouvees = set()  # Codes rubriques distincts rencontrés
         self.current_period = {}  # Pour stocker les dates et type de période en cours
         self.date_reference = None  # Date de référence pour le calcul de l'âge
         self.date_declaration = None  # Date du mois principal déclaré (S20.G00.05.005)
+        self.date_reference_int = None  # date_reference en entier YYYYMMDD
+        self.date_declaration_int = None  # date_declaration en entier YYYYMMDD
+        self.format_fichier = None  # Format des lignes détecté (virgule, edi, espaces)
+        self.nb_lignes_paie = 0  # Lignes de rémunération (S21.G00.51.013) lues
+        self.durees = {}  # Étape du parsing (encodage, lecture) -> secondes, voir dsn_timing
+        self.nomenclature_hits = 0  # Codes PCS-ESE résolus depuis la mémoire de resoudre_pcs_ese
+        self.nomenclature_misses = 0  # Codes PCS-ESE résolus par recherche dans la nomenclature
         self.stats = {
             'total_lines': 0,
             'entreprise': {},
@@ -57,6 +175,11 @@ class DSNParser:
             'versements': []
         }
 
+    @classmethod
+    def lean(cls) -> 'DSNParser':
+        """Parser qui ne conserve que les statistiques extraites (ni lignes brutes, ni blocks, ni détail des rémunérations)"""
+        return cls(keep_raw_lines=0, keep_blocks=False, keep_remunerations=0)
+
     @classmethod
     def _load_nomenclature_pcs_ese(cls) -> Dict[str, str]:
         """Charge la nomenclature PCS-ESE depuis la base de données (avec cache)"""
@@ -85,6 +208,7 @@ class DSNParser:
                 nomenclature[row[0]] = row[1]
 
             conn.close()
+            cls._build_index_pcs_ese(nomenclature)
             cls._nomenclature_pcs_ese = nomenclature
 
         except Exception as e:
@@ -92,6 +216,61 @@ class DSNParser:
 
         return nomenclature
 
+    @classmethod
+    def _build_index_pcs_ese(cls, nomenclature: Dict[str, str]):
+        """
+        Construit l'index par préfixe de la nomenclature PCS-ESE
+
+        Chaque préfixe d'un code (groupe "3", CSP "38", ..., code complet "382a") pointe
+        vers le libellé du premier code de la nomenclature qui commence par ce préfixe,
+        et, dans l'index parallèle des niveaux, vers son groupe (GROUPES_PCS_ESE, premier
+        caractère) et sa CSP (deux premiers chiffres, None pour un préfixe d'un caractère).
+        """
+        prefixes = {}
+        niveaux = {}
+        for code, libelle in nomenclature.items():
+            groupe = cls.GROUPES_PCS_ESE.get(code[:1])
+            csp = code[:2] if len(code) >= 2 and code[:2].isdigit() else None
+            for longueur in range(1, len(code) + 1):
+                prefixes.setdefault(code[:longueur], libelle)
+                niveaux.setdefault(code[:longueur], (groupe, csp if longueur >= 2 else None))
+        cls._prefixes_pcs_ese = prefixes
+        cls._niveaux_pcs_ese = niveaux
+        cls._resolutions_pcs_ese = {}
+
+    def resoudre_pcs_ese(self, code_pcs_ese: str) -> Tuple[Optional[str], Optional[str], Optional[str],
+                                                           Optional[str], Optional[str]]:
+        """
+        Résout un code PCS-ESE en une seule recherche (résultat mémorisé par code)
+
+        Args:
+            code_pcs_ese: Code PCS-ESE (S21.G00.40.004, ex: "382a")
+
+        Returns:
+            Tuple (groupe, groupe_code, csp, libellé CSP, libellé emploi)
+        """
+        resolution = self._resolutions_pcs_ese.get(code_pcs_ese)
+        if resolution is not None:
+            self.nomenclature_hits += 1
+            return resolution
+
+        self.nomenclature_misses += 1
+        groupe = self._determine_groupe_from_pcs_ese(code_pcs_ese)
+        csp = self._extract_csp_from_pcs_ese(code_pcs_ese)
+        resolution = (
+            groupe,
+            self._groupe_to_code(groupe),
+            csp,
+            self.get_libelle_csp(csp),
+            self.get_libelle_emploi(code_pcs_ese)
+        )
+
+        # Ne mémoriser qu'une fois la nomenclature chargée, et pour les seuls codes (ou préfixes)
+        # de la nomenclature : une valeur arbitraire du fichier n'agrandit pas la mémoire
+        if self._prefixes_pcs_ese is not None and code_pcs_ese in self._prefixes_pcs_ese:
+            self._resolutions_pcs_ese[code_pcs_ese] = resolution
+        return resolution
+
     def get_libelle_emploi(self, code_pcs_ese: Optional[str]) -> Optional[str]:
         """Récupère le libellé d'emploi à partir du code PCS-ESE"""
         if not code_pcs_ese:
@@ -103,276 +282,451 @@ class DSNParser:
     def detect_encoding(self, file_path: str) -> str:
         """Détecte l'encodage du fichier DSN"""
         with open(file_path, 'rb') as f:
-            result = chardet.detect(f.read(10000))
-            return result['encoding'] or 'utf-8'
+            return self.detect_encoding_bytes(f.read(TAILLE_DETECTION_ENCODAGE))
+
+    def detect_encoding_bytes(self, data: bytes) -> str:
+        """Détecte l'encodage à partir des premiers octets d'un fichier DSN (voir dsn_encodage)"""
+        return detecter_encodage(data)
 
     def parse_file(self, file_path: str) -> Dict[str, Any]:
         """Parse un fichier DSN et retourne les données structurées"""
+        self.parse(file_path)
+        return self.get_results()
+
+    def parse(self, file_path: str) -> 'DSNParser':
+        """
+        Parse un fichier DSN sans calculer les indicateurs
+
+        Args:
+            file_path: Chemin vers le fichier DSN
+
+        Returns:
+            Le parser lui-même (stats remplies), pour chaîner avec get_results()
+        """
+        if SEUIL_MMAP and os.path.getsize(file_path) >= SEUIL_MMAP:
+            return self.parse_mmap(file_path)
+
+        debut = time.perf_counter()
         encoding = self.detect_encoding(file_path)
+        debut_lecture = time.perf_counter()
 
         with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.rstrip('\n\r')
-                if not line:
-                    continue
+            self._parse_lignes(f)
 
-                self.raw_lines.append(line)
-                self.stats['total_lines'] += 1
+        self._ajouter_durees(debut, debut_lecture)
+        return self
 
-                # Parse la ligne DSN (format: S21.G00.05.001,valeur ou format EDI)
-                parsed = self.parse_line(line)
-                if parsed:
-                    self.blocks[parsed['rubrique']].append(parsed)
+    def parse_mmap(self, file_path: str) -> 'DSNParser':
+        """
+        Parse un fichier DSN projeté en mémoire (mmap), sans décoder les lignes
 
-                    # Extraction des informations clés
-                    self._extract_key_info(parsed)
+        Le fichier est découpé en lignes par fenêtres de TAILLE_FENETRE_MMAP octets : la
+        mémoire utilisée ne dépend pas de la taille du fichier. Seules les valeurs des
+        rubriques qui ont un handler sont décodées ; les résultats sont ceux de parse().
 
-        return self.get_results()
+        Repli sur la lecture en mode texte si l'encodage n'est pas compatible ASCII
+        (UTF-16...), si toutes les lignes brutes ou des blocks sont demandés, ou pour un
+        fichier vide.
 
-    def parse_line(self, line: str) -> Dict[str, Any]:
-        """Parse une ligne DSN au format standard ou EDI"""
-        # Format 1: S21.G00.05.001,valeur (format standard avec virgule)
-        # Peut inclure des guillemets simples: S21.G00.05.001,'valeur'
-        pattern1 = r'^(S\d{2}\.G\d{2}\.\d{2}\.\d{3}),(.*)$'
-        match1 = re.match(pattern1, line)
-
-        if match1:
-            rubrique, valeur = match1.groups()
-            # Retirer les guillemets simples si présents
-            valeur = valeur.strip().strip("'")
-            return {
-                'rubrique': rubrique,
-                'valeur': valeur,
-                'raw': line
-            }
+        Args:
+            file_path: Chemin vers le fichier DSN
 
-        # Format 2: EDI - Format positionnel (200 caractères fixes)
-        # Les 18 premiers caractères contiennent le code rubrique
-        # Le reste contient la valeur
-        if len(line) >= 18:
-            # Format EDI: S21G00050010001 suivi de la valeur (sans points ni virgule)
-            pattern2 = r'^(S\d{2}G\d{2}\d{2}\d{3})(.*)$'
-            match2 = re.match(pattern2, line)
-
-            if match2:
-                rubrique_edi, valeur = match2.groups()
-                # Convertir le format EDI en format standard
-                # S21G00050010001 -> S21.G00.05.001
-                if len(rubrique_edi) == 15:
-                    rubrique_standard = f"{rubrique_edi[0:3]}.{rubrique_edi[3:6]}.{rubrique_edi[6:8]}.{rubrique_edi[8:11]}"
-                    return {
-                        'rubrique': rubrique_standard,
-                        'valeur': valeur.strip(),
+        Returns:
+            Le parser lui-même (stats remplies), pour chaîner avec get_results()
+        """
+        debut = time.perf_counter()
+        encoding = self.detect_encoding(file_path)
+        debut_lecture = time.perf_counter()
+
+        with open(file_path, 'rb') as f:
+            if (self.keep_raw_lines is None or self.keep_blocks is not None
+                    or not encodage_compatible_ascii(encoding) or os.fstat(f.fileno()).st_size == 0):
+                with io.TextIOWrapper(f, encoding=encoding, errors='ignore') as lignes:
+                    self._parse_lignes(lignes)
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    self._parse_octets(mm, encoding)
+
+        self._ajouter_durees(debut, debut_lecture)
+        return self
+
+    def parse_stream(self, flux: io.BufferedReader) -> 'DSNParser':
+        """
+        Parse un flux binaire (ex: fichier uploadé) en une seule lecture
+
+        L'encodage est détecté sur les premiers octets du flux, lus par peek() sans être
+        consommés ; les lignes sont ensuite décodées comme avec parse() (mêmes résultats).
+
+        Args:
+            flux: Flux binaire bufferisé (tampon d'au moins TAILLE_DETECTION_ENCODAGE octets)
+
+        Returns:
+            Le parser lui-même (stats remplies), pour chaîner avec get_results()
+        """
+        debut = time.perf_counter()
+        encoding = self.detect_encoding_bytes(flux.peek(TAILLE_DETECTION_ENCODAGE)[:TAILLE_DETECTION_ENCODAGE])
+        debut_lecture = time.perf_counter()
+
+        lignes = io.TextIOWrapper(flux, encoding=encoding, errors='ignore')
+        self._parse_lignes(lignes)
+        # Rendre le flux à l'appelant (le wrapper le fermerait en étant détruit)
+        lignes.detach()
+
+        self._ajouter_durees(debut, debut_lecture)
+        return self
+
+    def _ajouter_durees(self, debut: float, debut_lecture: float):
+        """Cumule les durées de détection d'encodage et de lecture d'un parsing"""
+        durees = self.durees
+        durees['encodage'] = durees.get('encodage', 0.0) + debut_lecture - debut
+        durees['lecture'] = durees.get('lecture', 0.0) + time.perf_counter() - debut_lecture
+
+    def _parse_lignes(self, lignes: Iterable[str]):
+        """Parse des lignes DSN décodées (fichier ou flux ouvert en mode texte)"""
+        tokenizer = DSNTokenizer()
+        split = tokenizer.split
+        handlers = self.RUBRIQUE_HANDLERS
+        raw_lines = self.raw_lines
+        keep_raw_lines = self.keep_raw_lines
+        blocks = self.blocks
+        keep_blocks = self.keep_blocks
+        total_lines = 0
+
+        for line in lignes:
+            line = line.rstrip('\n\r')
+            if not line:
+                continue
+
+            total_lines += 1
+            if keep_raw_lines is None or len(raw_lines) < keep_raw_lines:
+                raw_lines.append(line)
+
+            # Découpe la ligne DSN (format virgule, EDI ou espaces détecté sur les premières lignes)
+            record = split(line)
+            if record:
+                rubrique, valeur = record
+                if keep_blocks is not None and (keep_blocks is True or rubrique in keep_blocks):
+                    blocks[rubrique].append({
+                        'rubrique': rubrique,
+                        'valeur': valeur,
                         'raw': line
-                    }
+                    })
+
+                # Extraction des informations clés (sortie immédiate si rubrique sans handler)
+                handler = handlers.get(rubrique)
+                if handler is not None:
+                    handler(self, valeur)
+
+        self.stats['total_lines'] += total_lines
+        self.rubriques_trouvees.update(tokenizer.rubriques)
+        self.format_fichier = tokenizer.format
+
+    def _parse_octets(self, mm: mmap.mmap, encoding: str):
+        """Parse un fichier projeté en mémoire, dans un encodage compatible ASCII (voir parse_mmap)"""
+        debut = 0
+        if codecs.lookup(encoding).name == 'utf-8-sig':
+            # BOM retiré comme en mode texte (et seulement en début de fichier)
+            encoding = 'utf-8'
+            if mm[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+                debut = len(codecs.BOM_UTF8)
+
+        tokenizer = DSNTokenizerOctets(encoding)
+        split = tokenizer.texte.split
+        decoder = tokenizer.decoder
+        handlers = self.RUBRIQUE_HANDLERS
+        raw_lines = self.raw_lines
+        keep_raw_lines = self.keep_raw_lines
+        # Clé de ligne (voir DSNTokenizerOctets.cle) -> (handler, début de la valeur, guillemets),
+        # ou False pour une rubrique sans handler
+        entrees: Dict[bytes, Any] = {}
+        get = entrees.get
+        longueur_cle = tokenizer.longueur_cle
+        total_lines = 0
+
+        taille = len(mm)
+        liberer = hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+        if liberer and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        while debut < taille:
+            # Fenêtre terminée par une fin de ligne (sauf la dernière)
+            fin = taille
+            if debut + TAILLE_FENETRE_MMAP < taille:
+                fin = max(mm.rfind(b'\n', debut, debut + TAILLE_FENETRE_MMAP),
+                          mm.rfind(b'\r', debut, debut + TAILLE_FENETRE_MMAP)) + 1
+                if not fin:
+                    fin = mm.find(b'\n', debut + TAILLE_FENETRE_MMAP) + 1 or taille
+            fenetre = mm[debut:fin]
+            if liberer:
+                # Pages déjà copiées rendues au système : la mémoire reste stable quelle que
+                # soit la taille du fichier (elles restent dans le cache disque)
+                page = debut - debut % mmap.PAGESIZE
+                mm.madvise(mmap.MADV_DONTNEED, page, fin - page)
+            debut = fin
+
+            # Fins de ligne universelles, comme en mode texte
+            if b'\r' in fenetre:
+                fenetre = fenetre.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            lignes = fenetre.split(b'\n')
+            del fenetre
+            total_lines += len(lignes) - lignes.count(b'')
+
+            if len(raw_lines) < keep_raw_lines:
+                for ligne in lignes:
+                    line = ligne.decode(encoding, 'ignore')
+                    if line:
+                        raw_lines.append(line)
+                        if len(raw_lines) >= keep_raw_lines:
+                            break
+
+            for ligne in lignes:
+                entree = get(ligne[:longueur_cle])
+                if entree is False:
+                    continue
+                if entree is None:
+                    if not ligne:
+                        continue
+                    cle = tokenizer.cle(ligne)
+                    if cle is None:
+                        # Ligne hors format du fichier : décodée et découpée comme en mode texte
+                        line = ligne.decode(encoding, 'ignore')
+                        if not line:
+                            total_lines -= 1
+                            continue
+                        record = split(line)
+                        longueur_cle = tokenizer.longueur_cle
+                        if record:
+                            handler = handlers.get(record[0])
+                            if handler is not None:
+                                handler(self, record[1])
+                        continue
+                    cle, rubrique, debut_valeur, guillemets = cle
+                    handler = handlers.get(rubrique)
+                    entree = entrees[cle] = (handler, debut_valeur, guillemets) if handler is not None else False
+                    longueur_cle = tokenizer.longueur_cle
+                    if entree is False:
+                        continue
+
+                handler, debut_valeur, guillemets = entree
+                valeur = decoder(ligne[debut_valeur:]).strip()
+                handler(self, valeur.strip("'") if guillemets else valeur)
+
+        self.stats['total_lines'] += total_lines
+        self.rubriques_trouvees.update(tokenizer.rubriques)
+        self.format_fichier = tokenizer.format
+
+    def iter_records(self, file_path: str) -> Iterator[Tuple[str, str]]:
+        """
+        Itère sur les rubriques d'un fichier DSN sans rien conserver en mémoire
 
-        # Format 3: Ligne avec espaces comme séparateurs (certains fichiers EDI)
-        pattern3 = r'^(S\d{2}\.G\d{2}\.\d{2}\.\d{3})\s+(.*)$'
-        match3 = re.match(pattern3, line)
+        Args:
+            file_path: Chemin vers le fichier DSN
 
-        if match3:
-            rubrique, valeur = match3.groups()
-            return {
-                'rubrique': rubrique,
-                'valeur': valeur.strip(),
-                'raw': line
-            }
+        Yields:
+            Tuples (rubrique, valeur) dans l'ordre du fichier
+        """
+        encoding = self.detect_encoding(file_path)
+        tokenizer = DSNTokenizer()
 
-        # Si pas de match, retourne None pour ignorer la ligne
-        return None
+        with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
+            yield from tokenizer.iter_records(f)
+
+    def parse_line(self, line: str) -> Dict[str, Any]:
+        """Parse une ligne DSN au format standard, EDI ou avec espaces"""
+        result = split_line(line)
+        if result is None:
+            # Si pas de match, retourne None pour ignorer la ligne
+            return None
+
+        rubrique, valeur, _ = result
+        return {
+            'rubrique': rubrique,
+            'valeur': valeur,
+            'raw': line
+        }
+
+    def _extract_key_info(self, rubrique: str, valeur: str):
+        """Extrait les informations importantes selon les rubriques (via RUBRIQUE_HANDLERS)"""
+        handler = self.RUBRIQUE_HANDLERS.get(rubrique)
+        if handler is not None:
+            handler(self, valeur)
+
+    @classmethod
+    def register_handler(cls, rubrique: str, handler: Callable[['DSNParser', str], None]):
+        """
+        Enregistre un handler d'extraction pour une rubrique
 
-    def _extract_key_info(self, parsed: Dict[str, Any]):
-        """Extrait les informations importantes selon les rubriques"""
-        rubrique = parsed['rubrique']
-        valeur = parsed['valeur']
-
-        # Date du mois principal déclaré (S20.G00.05.005)
-        if rubrique == 'S20.G00.05.005':
-            self.date_declaration = valeur
-            self.stats['entreprise']['date_declaration'] = valeur
-
-        # Informations entreprise (S21.G00.06 = SIRET)
-        elif rubrique == 'S21.G00.06.001':
-            self.stats['entreprise']['siret'] = valeur
-
-        # Raison sociale (S21.G00.11.001)
-        elif rubrique == 'S21.G00.11.001':
-            self.stats['entreprise']['raison_sociale'] = valeur
-
-        # Informations salarié
-        # NIR (S21.G00.30.001)
-        elif rubrique == 'S21.G00.30.001':
-            # Le premier chiffre du NIR indique aussi le sexe: 1=Homme, 2=Femme
-            sexe_from_nir = 'M' if valeur and valeur[0] == '1' else 'F' if valeur and valeur[0] == '2' else None
-            self.stats['salaries'].append({'nir': valeur, 'sexe': sexe_from_nir, 'remunerations': []})
-
-        # Nom (S21.G00.30.002)
-        elif rubrique == 'S21.G00.30.002':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['nom'] = valeur
-
-        # Prénom (S21.G00.30.004)
-        elif rubrique == 'S21.G00.30.004':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['prenom'] = valeur
-
-        # Sexe (S21.G00.30.005) - 1=Homme, 2=Femme
-        elif rubrique == 'S21.G00.30.005':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['sexe'] = 'M' if valeur == '1' else 'F' if valeur == '2' else None
-
-        # Matricule (S21.G00.30.019)
-        elif rubrique == 'S21.G00.30.019':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['matricule'] = valeur
-
-        # Date de naissance (S21.G00.30.006 ou S21.G00.30.020)
-        elif rubrique in ['S21.G00.30.006', 'S21.G00.30.020']:
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['date_naissance'] = valeur
-                # La tranche d'âge sera calculée après le parsing avec la date de référence
-
-        # Date d'embauche (S21.G00.40.001)
-        elif rubrique == 'S21.G00.40.001':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['date_embauche'] = valeur
-
-        # Date de sortie (S21.G00.62.001)
-        elif rubrique == 'S21.G00.62.001':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['date_sortie'] = valeur
-
-        # Statut du salarié conventionnel (S21.G00.40.002) - Important pour le Groupe CSP
-        elif rubrique == 'S21.G00.40.002':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['statut_conventionnel'] = valeur
-                # Calculer immédiatement le Groupe depuis ce code
-                groupe = self._determine_csp_from_statut(valeur)
-                if groupe:
-                    self.stats['salaries'][-1]['groupe'] = groupe
-                    self.stats['salaries'][-1]['groupe_code'] = self._groupe_to_code(groupe)
-
-        # Code statut catégoriel Retraite Complémentaire obligatoire (S21.G00.40.003)
-        elif rubrique == 'S21.G00.40.003':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['statut_retraite'] = valeur
-
-        # Code profession et catégorie socioprofessionnelle PCS-ESE (S21.G00.40.004)
-        elif rubrique == 'S21.G00.40.004':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['code_pcs_ese'] = valeur
-                # Récupérer le libellé d'emploi depuis la nomenclature
-                libelle_emploi = self.get_libelle_emploi(valeur)
-                if libelle_emploi:
-                    self.stats['salaries'][-1]['libelle_emploi'] = libelle_emploi
-
-                # Extraire le Groupe (1er chiffre) depuis le code PCS-ESE (prioritaire sur S21.G00.40.002)
-                groupe = self._determine_groupe_from_pcs_ese(valeur)
-                if groupe:
-                    self.stats['salaries'][-1]['groupe'] = groupe
-                    self.stats['salaries'][-1]['groupe_code'] = self._groupe_to_code(groupe)
-
-                # Extraire la CSP (2 premiers chiffres) depuis le code PCS-ESE
-                csp_code = self._extract_csp_from_pcs_ese(valeur)
-                if csp_code:
-                    self.stats['salaries'][-1]['csp'] = csp_code
-                    # Récupérer le libellé de la CSP
-                    csp_libelle = self.get_libelle_csp(csp_code)
-                    if csp_libelle:
-                        self.stats['salaries'][-1]['csp_libelle'] = csp_libelle
-
-        # Statut conventionnel (S21.G00.40.007)
-        elif rubrique == 'S21.G00.40.007':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['statut'] = valeur
-
-        # Niveau de qualification (S21.G00.40.008)
-        elif rubrique == 'S21.G00.40.008':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['qualification'] = valeur
-
-        # Positionnement dans la convention collective (S21.G00.40.041)
-        elif rubrique == 'S21.G00.40.041':
-            if self.stats['salaries']:
-                self.stats['salaries'][-1]['position_convention'] = valeur
-
-        # Date de début de période de rémunération (S21.G00.51.001)
-        elif rubrique == 'S21.G00.51.001':
-            self.current_period['date_debut'] = valeur
-
-        # Date de fin de période de rémunération (S21.G00.51.002)
-        elif rubrique == 'S21.G00.51.002':
-            self.current_period['date_fin'] = valeur
-            # Utiliser la première date de fin trouvée comme date de référence
-            if not self.date_reference:
-                self.date_reference = valeur
-
-        # Type de rémunération (S21.G00.51.011)
-        elif rubrique == 'S21.G00.51.011':
-            self.current_period['type_code'] = valeur
-            self.current_period['type_libelle'] = self.TYPES_REMUNERATION.get(valeur, f'Type {valeur}')
-
-        # Montant de rémunération (S21.G00.51.013)
-        elif rubrique == 'S21.G00.51.013':
-            if self.stats['salaries']:
-                try:
-                    montant = float(valeur.replace(',', '.'))
-                    # Créer un objet rémunération avec le montant, les dates et le type
-                    remuneration = {
-                        'montant': montant,
-                        'date_debut': self.current_period.get('date_debut', ''),
-                        'date_fin': self.current_period.get('date_fin', ''),
-                        'type_code': self.current_period.get('type_code', ''),
-                        'type_libelle': self.current_period.get('type_libelle', '')
-                    }
-                    self.stats['salaries'][-1]['remunerations'].append(remuneration)
-                except ValueError:
-                    pass
-
-    def _calculate_age_group(self, date_naissance: str, date_ref: str = None) -> str:
+        Args:
+            rubrique: Code rubrique au format standard (ex: 'S21.G00.60.001')
+            handler: Fonction appelée avec (parser, valeur) pour chaque occurrence
         """
-        Calcule la tranche d'âge à partir de la date de naissance
+        cls.RUBRIQUE_HANDLERS[rubrique] = handler
+
+    @classmethod
+    def _collect_handlers(cls):
+        """Construit RUBRIQUE_HANDLERS depuis CHAMPS_SALARIE, DATES_SALARIE et les méthodes décorées"""
+        for rubrique, champ in cls.CHAMPS_SALARIE.items():
+            cls.RUBRIQUE_HANDLERS.setdefault(rubrique, _handler_champ_salarie(champ))
+        for rubrique, champ in cls.DATES_SALARIE.items():
+            cls.RUBRIQUE_HANDLERS.setdefault(rubrique, _handler_date_salarie(champ))
+
+        for klass in reversed(cls.__mro__):
+            for attr in vars(klass).values():
+                for rubrique in getattr(attr, '_rubriques', ()):
+                    cls.RUBRIQUE_HANDLERS[rubrique] = attr
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Chaque sous-classe a son propre registre (hérité du parent)
+        cls.RUBRIQUE_HANDLERS = dict(cls.RUBRIQUE_HANDLERS)
+        cls._collect_handlers()
+
+    # Date du mois principal déclaré (S20.G00.05.005)
+    @rubrique_handler('S20.G00.05.005')
+    def _handle_date_declaration(self, valeur: str):
+        self.date_declaration = valeur
+        self.date_declaration_int = dsn_dates.date_vers_int(valeur)
+        self.stats['entreprise']['date_declaration'] = valeur
+
+    # Informations entreprise (S21.G00.06 = SIRET)
+    @rubrique_handler('S21.G00.06.001')
+    def _handle_siret(self, valeur: str):
+        self.stats['entreprise']['siret'] = valeur
+
+    # Raison sociale (S21.G00.11.001)
+    @rubrique_handler('S21.G00.11.001')
+    def _handle_raison_sociale(self, valeur: str):
+        self.stats['entreprise']['raison_sociale'] = valeur
+
+    # NIR (S21.G00.30.001) : ouvre un nouveau salarié
+    @rubrique_handler('S21.G00.30.001')
+    def _handle_nir(self, valeur: str):
+        # Le premier chiffre du NIR indique aussi le sexe: 1=Homme, 2=Femme
+        sexe_from_nir = 'M' if valeur and valeur[0] == '1' else 'F' if valeur and valeur[0] == '2' else None
+        self.stats['salaries'].append(Salarie(sys.intern(valeur), sexe_from_nir))
+
+    # Sexe (S21.G00.30.005) - 1=Homme, 2=Femme
+    @rubrique_handler('S21.G00.30.005')
+    def _handle_sexe(self, valeur: str):
+        if self.stats['salaries']:
+            self.stats['salaries'][-1]['sexe'] = 'M' if valeur == '1' else 'F' if valeur == '2' else None
+
+    # Statut du salarié conventionnel (S21.G00.40.002) - Important pour le Groupe CSP
+    @rubrique_handler('S21.G00.40.002')
+    def _handle_statut_conventionnel(self, valeur: str):
+        if self.stats['salaries']:
+            self.stats['salaries'][-1]['statut_conventionnel'] = sys.intern(valeur)
+            # Calculer immédiatement le Groupe depuis ce code
+            groupe = self._determine_csp_from_statut(valeur)
+            if groupe:
+                self.stats['salaries'][-1]['groupe'] = groupe
+                self.stats['salaries'][-1]['groupe_code'] = self._groupe_to_code(groupe)
+
+    # Code profession et catégorie socioprofessionnelle PCS-ESE (S21.G00.40.004)
+    @rubrique_handler('S21.G00.40.004')
+    def _handle_pcs_ese(self, valeur: str):
+        if self.stats['salaries']:
+            salarie = self.stats['salaries'][-1]
+            salarie['code_pcs_ese'] = sys.intern(valeur)
+            groupe, groupe_code, csp_code, csp_libelle, libelle_emploi = self.resoudre_pcs_ese(valeur)
+
+            # Libellé d'emploi depuis la nomenclature
+            if libelle_emploi:
+                salarie['libelle_emploi'] = libelle_emploi
+
+            # Groupe (1er chiffre du code PCS-ESE, prioritaire sur S21.G00.40.002)
+            if groupe:
+                salarie['groupe'] = groupe
+                salarie['groupe_code'] = groupe_code
+
+            # CSP (2 premiers chiffres du code PCS-ESE) et son libellé
+            if csp_code:
+                salarie['csp'] = csp_code
+                if csp_libelle:
+                    salarie['csp_libelle'] = csp_libelle
+
+    # Date de début de période de rémunération (S21.G00.51.001)
+    @rubrique_handler('S21.G00.51.001')
+    def _handle_periode_debut(self, valeur: str):
+        self.current_period['date_debut'] = sys.intern(valeur)
+        self.current_period['date_debut_int'] = dsn_dates.date_vers_int(valeur)
+
+    # Date de fin de période de rémunération (S21.G00.51.002)
+    @rubrique_handler('S21.G00.51.002')
+    def _handle_periode_fin(self, valeur: str):
+        self.current_period['date_fin'] = sys.intern(valeur)
+        self.current_period['date_fin_int'] = dsn_dates.date_vers_int(valeur)
+        # Utiliser la première date de fin trouvée comme date de référence
+        if not self.date_reference:
+            self.date_reference = valeur
+            self.date_reference_int = self.current_period['date_fin_int']
+
+    # Type de rémunération (S21.G00.51.011)
+    @rubrique_handler('S21.G00.51.011')
+    def _handle_type_remuneration(self, valeur: str):
+        valeur = sys.intern(valeur)
+        self.current_period['type_code'] = valeur
+        self.current_period['type_libelle'] = self.TYPES_REMUNERATION.get(valeur) or sys.intern(f'Type {valeur}')
+
+    # Montant de rémunération (S21.G00.51.013)
+    @rubrique_handler('S21.G00.51.013')
+    def _handle_montant_remuneration(self, valeur: str):
+        if self.stats['salaries']:
+            try:
+                montant = float(valeur.replace(',', '.'))
+            except ValueError:
+                return
+
+            salarie = self.stats['salaries'][-1]
+            type_code = self.current_period.get('type_code', '')
+            self.nb_lignes_paie += 1
+
+            # Cumul par type de rémunération, utilisé par tous les indicateurs
+            salarie['remunerations_par_type'].ajouter(type_code, montant)
+
+            # Détail de la rémunération (montant, dates et type), optionnel
+            if self.keep_remunerations is None or len(self.stats['salaries']) <= self.keep_remunerations:
+                remunerations = salarie['remunerations']
+                if not remunerations:
+                    remunerations = salarie['remunerations'] = []
+                remunerations.append(Remuneration(
+                    montant,
+                    self.current_period.get('date_debut', ''),
+                    self.current_period.get('date_fin', ''),
+                    type_code,
+                    self.current_period.get('type_libelle', '')
+                ))
+
+    @staticmethod
+    def total_remunerations(salarie: Dict[str, Any], types_filtres: list = None) -> float:
+        """
+        Rémunération totale d'un salarié à partir des cumuls par type
 
         Args:
-            date_naissance: Date au format DDMMYYYY
-            date_ref: Date de référence au format DDMMYYYY (par défaut: date du jour)
+            salarie: Salarié issu de stats['salaries']
+            types_filtres: Codes des types de rémunération à inclure (None = tous)
 
         Returns:
-            Tranche d'âge: '<30', '30-39', '40-49', '50+'
+            Somme des montants des types retenus
         """
-        if not date_naissance or len(date_naissance) != 8:
-            return 'Inconnu'
+        totaux = salarie.get('remunerations_par_type', {})
+        if types_filtres:
+            return sum(montant for code, montant in totaux.items() if code in types_filtres)
+        return sum(totaux.values())
 
-        try:
-            # Format DDMMYYYY pour la date de naissance
-            jour_naiss = int(date_naissance[0:2])
-            mois_naiss = int(date_naissance[2:4])
-            annee_naiss = int(date_naissance[4:8])
-
-            date_naiss = datetime(annee_naiss, mois_naiss, jour_naiss)
-
-            # Utiliser la date de référence ou la date du jour
-            if date_ref and len(date_ref) == 8:
-                jour_ref = int(date_ref[0:2])
-                mois_ref = int(date_ref[2:4])
-                annee_ref = int(date_ref[4:8])
-                date_reference = datetime(annee_ref, mois_ref, jour_ref)
-            else:
-                date_reference = datetime.now()
+    def _calculate_age_group(self, date_naissance: Optional[int], date_ref: int) -> str:
+        """
+        Calcule la tranche d'âge à partir de la date de naissance
 
-            # Calculer l'âge à la date de référence
-            age = date_reference.year - date_naiss.year - ((date_reference.month, date_reference.day) < (date_naiss.month, date_naiss.day))
+        Args:
+            date_naissance: Date de naissance en entier YYYYMMDD (None si absente ou invalide)
+            date_ref: Date de référence en entier YYYYMMDD
 
-            if age < 30:
-                return '<30'
-            elif age < 40:
-                return '30-39'
-            elif age < 50:
-                return '40-49'
-            else:
-                return '50+'
-        except:
+        Returns:
+            Tranche d'âge: '<30', '30-39', '40-49', '50+' ou 'Inconnu'
+        """
+        if date_naissance is None:
             return 'Inconnu'
+        return dsn_dates.tranche_age_index(dsn_dates.age(date_naissance, date_ref))
 
     def _determine_csp_from_statut(self, statut_code: str) -> str:
         """
@@ -431,19 +785,13 @@ class DSNParser:
         if not code_pcs_ese or len(code_pcs_ese) < 1:
             return None
 
-        # Extraire le premier caractère qui indique le groupe
-        premier_chiffre = code_pcs_ese[0]
-
-        # Mapping selon la nomenclature PCS-ESE de l'INSEE
-        mapping = {
-            '2': 'Artisans, commerçants et chefs d\'entreprise',
-            '3': 'Ingénieurs et cadres',  # Cadres et professions intellectuelles supérieures
-            '4': 'Techniciens et agents de maîtrise',  # Professions intermédiaires
-            '5': 'Employés',
-            '6': 'Ouvriers',
-        }
+        # Le premier caractère indique le groupe : niveau groupe de l'index de la nomenclature
+        self._load_nomenclature_pcs_ese()
+        if self._niveaux_pcs_ese is not None:
+            return self._niveaux_pcs_ese.get(code_pcs_ese[0], (None, None))[0]
 
-        return mapping.get(premier_chiffre, None)
+        # Nomenclature indisponible : table GROUPES_PCS_ESE
+        return self.GROUPES_PCS_ESE.get(code_pcs_ese[0])
 
     def _extract_csp_from_pcs_ese(self, code_pcs_ese: str) -> Optional[str]:
         """
@@ -451,6 +799,8 @@ class DSNParser:
 
         La CSP correspond aux 2 premiers chiffres du code PCS-ESE
         Ex: "382a" -> "38", "524a" -> "52", "636d" -> "63"
+        Résolue par le niveau CSP de l'index de la nomenclature : un préfixe absent de la
+        nomenclature n'est pas une CSP.
 
         Args:
             code_pcs_ese: Code PCS-ESE complet (ex: "382a")
@@ -461,7 +811,11 @@ class DSNParser:
         if not code_pcs_ese or len(code_pcs_ese) < 2:
             return None
 
-        # Extraire les 2 premiers caractères
+        self._load_nomenclature_pcs_ese()
+        if self._niveaux_pcs_ese is not None:
+            return self._niveaux_pcs_ese.get(code_pcs_ese[:2], (None, None))[1]
+
+        # Nomenclature indisponible : les 2 premiers caractères
         csp = code_pcs_ese[0:2]
 
         # Vérifier que ce sont bien des chiffres
@@ -484,17 +838,12 @@ class DSNParser:
         if not csp_code:
             return None
 
-        nomenclature = self._load_nomenclature_pcs_ese()
-
-        # Chercher un code qui commence par ces 2 chiffres pour récupérer le libellé de la catégorie
-        # On prend le premier code trouvé commençant par ces 2 chiffres
-        for code, libelle in nomenclature.items():
-            if code.startswith(csp_code):
-                # Extraire juste la partie catégorie du libellé (avant le détail)
-                # Par exemple pour "38": on veut juste "Professions intermédiaires..."
-                return libelle
+        self._load_nomenclature_pcs_ese()
+        if self._prefixes_pcs_ese is None:
+            return None
 
-        return None
+        # Libellé du premier code de la nomenclature commençant par ces 2 chiffres (index par préfixe)
+        return self._prefixes_pcs_ese.get(csp_code)
 
     def _groupe_to_code(self, groupe: str) -> str:
         """
@@ -565,10 +914,80 @@ class DSNParser:
             # Codes bas = ouvriers, codes moyens = employés, etc.
             return None
 
+    @staticmethod
+    def score_indicateur_remuneration(ecart_moyen: float) -> int:
+        """
+        Barème de l'indicateur 1 (écart de rémunération, sur 40 points)
+
+        Args:
+            ecart_moyen: Écart moyen pondéré en %
+
+        Returns:
+            Score de 0 à 40
+        """
+        # Si écart ≤ 0% : 40 points
+        # Si écart > 0% et ≤ 1% : 39 points
+        # ... jusqu'à écart > 20% : 0 points
+        if ecart_moyen <= 0:
+            return 40
+        elif ecart_moyen <= 1:
+            return 39
+        elif ecart_moyen <= 2:
+            return 38
+        elif ecart_moyen <= 3:
+            return 37
+        elif ecart_moyen <= 4:
+            return 35
+        elif ecart_moyen <= 5:
+            return 33
+        elif ecart_moyen <= 6:
+            return 31
+        elif ecart_moyen <= 7:
+            return 29
+        elif ecart_moyen <= 8:
+            return 27
+        elif ecart_moyen <= 9:
+            return 25
+        elif ecart_moyen <= 10:
+            return 23
+        elif ecart_moyen <= 11:
+            return 21
+        elif ecart_moyen <= 12:
+            return 19
+        elif ecart_moyen <= 13:
+            return 17
+        elif ecart_moyen <= 14:
+            return 14
+        elif ecart_moyen <= 15:
+            return 11
+        elif ecart_moyen <= 16:
+            return 8
+        elif ecart_moyen <= 17:
+            return 5
+        elif ecart_moyen <= 18:
+            return 2
+        elif ecart_moyen <= 19:
+            return 1
+        else:
+            return 0
+
+    @staticmethod
+    def score_indicateur_top10(nb_sexe_sous_represente: int) -> int:
+        """Barème de l'indicateur 5 (sexe sous-représenté parmi les 10 plus hautes rémunérations)"""
+        if nb_sexe_sous_represente >= 4:
+            return 10
+        elif nb_sexe_sous_represente >= 2:
+            return 5
+        return 0
+
     def calculer_index_officiel(self, types_filtres: list = None) -> Dict[str, Any]:
         """
         Calcule l'Index Égalité Professionnelle officiel selon la méthodologie gouvernementale
 
+        Calcul par boucle conservé comme référence : get_results utilise
+        IndicateursFrame.index_officiel, dont test_dsn_indicateurs vérifie la parité.
+        Lit le champ tranche_age des salariés (voir recalculer_tranches_age).
+
         Args:
             types_filtres: Liste des codes de types de rémunération à inclure
 
@@ -594,14 +1013,7 @@ class DSNParser:
                 continue
 
             # Calculer la rémunération totale (filtrée)
-            remunerations = salarie.get('remunerations', [])
-            if types_filtres:
-                remunerations = [
-                    r for r in remunerations
-                    if isinstance(r, dict) and r.get('type_code') in types_filtres
-                ]
-
-            remun_totale = sum(r['montant'] if isinstance(r, dict) else r for r in remunerations) if remunerations else 0
+            remun_totale = self.total_remunerations(salarie, types_filtres)
 
             if remun_totale > 0 and age_group != 'Inconnu':
                 cle_groupe = f"{csp}|{age_group}"
@@ -646,51 +1058,7 @@ class DSNParser:
         ecart_moyen = sum(ecarts_non_corriges) / len(ecarts_non_corriges) if ecarts_non_corriges else 0
 
         # Calcul du score (barème indicateur 1: 40 points)
-        # Si écart ≤ 0% : 40 points
-        # Si écart > 0% et ≤ 1% : 39 points
-        # ... jusqu'à écart > 20% : 0 points
-        if ecart_moyen <= 0:
-            score = 40
-        elif ecart_moyen <= 1:
-            score = 39
-        elif ecart_moyen <= 2:
-            score = 38
-        elif ecart_moyen <= 3:
-            score = 37
-        elif ecart_moyen <= 4:
-            score = 35
-        elif ecart_moyen <= 5:
-            score = 33
-        elif ecart_moyen <= 6:
-            score = 31
-        elif ecart_moyen <= 7:
-            score = 29
-        elif ecart_moyen <= 8:
-            score = 27
-        elif ecart_moyen <= 9:
-            score = 25
-        elif ecart_moyen <= 10:
-            score = 23
-        elif ecart_moyen <= 11:
-            score = 21
-        elif ecart_moyen <= 12:
-            score = 19
-        elif ecart_moyen <= 13:
-            score = 17
-        elif ecart_moyen <= 14:
-            score = 14
-        elif ecart_moyen <= 15:
-            score = 11
-        elif ecart_moyen <= 16:
-            score = 8
-        elif ecart_moyen <= 17:
-            score = 5
-        elif ecart_moyen <= 18:
-            score = 2
-        elif ecart_moyen <= 19:
-            score = 1
-        else:
-            score = 0
+        score = self.score_indicateur_remuneration(ecart_moyen)
 
         return {
             'ecart_moyen_pondere': round(ecart_moyen, 2),
@@ -805,6 +1173,9 @@ class DSNParser:
         - 2 ou 3 personnes = 5 points
         - 0 ou 1 personne = 0 points
 
+        Calcul par boucle conservé comme référence : get_results utilise
+        IndicateursFrame.top10, dont test_dsn_indicateurs vérifie la parité.
+
         Args:
             types_filtres: Liste des codes de types de rémunération à inclure
 
@@ -820,14 +1191,7 @@ class DSNParser:
                 continue
 
             # Calculer la rémunération totale (filtrée)
-            remunerations = salarie.get('remunerations', [])
-            if types_filtres:
-                remunerations = [
-                    r for r in remunerations
-                    if isinstance(r, dict) and r.get('type_code') in types_filtres
-                ]
-
-            remun_totale = sum(r['montant'] if isinstance(r, dict) else r for r in remunerations) if remunerations else 0
+            remun_totale = self.total_remunerations(salarie, types_filtres)
 
             if remun_totale > 0:
                 salaries_avec_remun.append({
@@ -870,12 +1234,7 @@ class DSNParser:
             nb_sexe_sous_represente = nb_hommes
 
         # Calcul du score selon le barème officiel
-        if nb_sexe_sous_represente >= 4:
-            score = 10
-        elif nb_sexe_sous_represente >= 2:
-            score = 5
-        else:
-            score = 0
+        score = self.score_indicateur_top10(nb_sexe_sous_represente)
 
         return {
             'score': score,
@@ -894,6 +1253,9 @@ class DSNParser:
         """
         Calcule les statistiques d'égalité homme-femme
 
+        Calcul par boucle conservé comme référence : get_results utilise
+        IndicateursFrame.egalite_hf, dont test_dsn_indicateurs vérifie la parité.
+
         Args:
             types_filtres: Liste des codes de types de rémunération à inclure (ex: ['001', '010'])
                           Si None, tous les types sont inclus
@@ -905,17 +1267,9 @@ class DSNParser:
 
         for salarie in self.stats['salaries']:
             sexe = salarie.get('sexe')
-            remunerations = salarie.get('remunerations', [])
-
-            # Filtrer les rémunérations selon les types sélectionnés
-            if types_filtres:
-                remunerations = [
-                    r for r in remunerations
-                    if isinstance(r, dict) and r.get('type_code') in types_filtres
-                ]
 
-            # Les rémunérations sont maintenant des objets avec 'montant', 'date_debut', 'date_fin'
-            remun_totale = sum(r['montant'] if isinstance(r, dict) else r for r in remunerations) if remunerations else 0
+            # Rémunération totale filtrée selon les types sélectionnés
+            remun_totale = self.total_remunerations(salarie, types_filtres)
 
             if sexe == 'M':
                 total_h += 1
@@ -948,28 +1302,54 @@ class DSNParser:
             'nb_avec_remuneration_f': len(remun_f)
         }
 
-    def recalculer_tranches_age(self, date_reference: str = None):
+    def tranches_age(self, date_reference: str = None) -> List[Optional[str]]:
         """
-        Recalcule les tranches d'âge de tous les salariés avec une date de référence
+        Tranche d'âge de chaque salarié (dans l'ordre de stats['salaries']) à une date de référence
+
+        Les salariés ne sont pas modifiés : un parser partagé (cache de parsing) peut servir
+        à plusieurs analyses simultanées avec des dates de référence différentes.
 
         Args:
             date_reference: Date de référence au format DDMMYYYY (par défaut: date de fin de période DSN)
+
+        Returns:
+            Tranche d'âge de chaque salarié, None s'il n'a pas de date de naissance
         """
         # Utiliser la date de référence fournie, sinon celle extraite du fichier, sinon la date du jour
-        date_ref = date_reference or self.date_reference
+        if date_reference:
+            date_ref = dsn_dates.date_vers_int(date_reference)
+        else:
+            date_ref = self.date_reference_int
+        if date_ref is None:
+            date_ref = dsn_dates.aujourd_hui()
+
+        return [
+            self._calculate_age_group(salarie.get('date_naissance_int'), date_ref)
+            if salarie.get('date_naissance') else None
+            for salarie in self.stats['salaries']
+        ]
 
-        for salarie in self.stats['salaries']:
-            date_naissance = salarie.get('date_naissance')
-            if date_naissance:
-                salarie['tranche_age'] = self._calculate_age_group(date_naissance, date_ref)
+    def recalculer_tranches_age(self, date_reference: str = None):
+        """
+        Écrit les tranches d'âge dans les salariés (champ tranche_age), pour les calculs
+        par boucle de référence (calculer_index_officiel) sur un parser non partagé
+
+        get_results n'appelle pas cette méthode : voir tranches_age()
+        """
+        for salarie, tranche in zip(self.stats['salaries'], self.tranches_age(date_reference)):
+            if tranche is not None:
+                salarie['tranche_age'] = tranche
 
     def _calculer_indicateur_augmentations_multi_mois(self, parsers_list: list,
-                                                       types_filtres: list = None) -> Dict[str, Any]:
+                                                       types_filtres: list = None,
+                                                       timeline: Optional[TimelineIndex] = None) -> Dict[str, Any]:
         """
         Calcule l'Indicateur 2 - Écart de taux d'augmentations individuelles (mode multi-mois)
 
         Compare le premier et le dernier mois pour détecter les augmentations de salaire.
         Une augmentation est détectée si le salaire du dernier mois > salaire du premier mois + 5%
+        Les salariés des deux mois sont appariés par l'index chronologique (matricule, à défaut NIR),
+        construit une fois par get_results_multi_mois.
 
         Barème: écart ≤ 2% = 20 pts, ≤ 3% = 10 pts, ≤ 5% = 5 pts, > 5% = 0 pts
         """
@@ -983,47 +1363,24 @@ class DSNParser:
 
         parser_debut = parsers_list[0]
         parser_fin = parsers_list[-1]
+        if timeline is None:
+            timeline = TimelineIndex.depuis_parsers(parsers_list)
 
-        # Construire un dictionnaire matricule -> rémunération pour chaque période
-        salaires_debut = {}
-        for salarie in parser_debut.stats['salaries']:
-            matricule = salarie.get('matricule')
-            sexe = salarie.get('sexe')
-            csp = salarie.get('csp')
-            if matricule and sexe in ['M', 'F']:
-                remunerations = salarie.get('remunerations', [])
-                if types_filtres:
-                    remunerations = [r for r in remunerations
-                                   if isinstance(r, dict) and r.get('type_code') in types_filtres]
-                total = sum(r['montant'] if isinstance(r, dict) else r for r in remunerations)
-                salaires_debut[matricule] = {'salaire': total, 'sexe': sexe, 'csp': csp}
-
-        salaires_fin = {}
-        for salarie in parser_fin.stats['salaries']:
-            matricule = salarie.get('matricule')
-            sexe = salarie.get('sexe')
-            csp = salarie.get('csp')
-            if matricule and sexe in ['M', 'F']:
-                remunerations = salarie.get('remunerations', [])
-                if types_filtres:
-                    remunerations = [r for r in remunerations
-                                   if isinstance(r, dict) and r.get('type_code') in types_filtres]
-                total = sum(r['montant'] if isinstance(r, dict) else r for r in remunerations)
-                salaires_fin[matricule] = {'salaire': total, 'sexe': sexe, 'csp': csp}
-
-        # Détecter les augmentations (salaire fin > salaire début * 1.05)
+        # Détecter les augmentations (salaire fin > salaire début * 1.05) : jointure premier / dernier mois
         augmentations = {'M': 0, 'F': 0}
         effectifs = {'M': 0, 'F': 0}
 
-        for matricule, data_debut in salaires_debut.items():
-            if matricule in salaires_fin:
-                data_fin = salaires_fin[matricule]
-                if data_debut['salaire'] > 0 and data_fin['salaire'] > 0:
-                    sexe = data_debut['sexe']
-                    effectifs[sexe] += 1
-                    # Augmentation détectée si +5% ou plus
-                    if data_fin['salaire'] > data_debut['salaire'] * 1.05:
-                        augmentations[sexe] += 1
+        for _, salarie_debut, salarie_fin in timeline.jointure(0, -1):
+            sexe = salarie_debut.get('sexe')
+            if sexe not in ('M', 'F') or salarie_fin.get('sexe') not in ('M', 'F'):
+                continue
+            salaire_debut = self.total_remunerations(salarie_debut, types_filtres)
+            salaire_fin = self.total_remunerations(salarie_fin, types_filtres)
+            if salaire_debut > 0 and salaire_fin > 0:
+                effectifs[sexe] += 1
+                # Augmentation détectée si +5% ou plus
+                if salaire_fin > salaire_debut * 1.05:
+                    augmentations[sexe] += 1
 
         # Calculer les taux d'augmentation par sexe
         taux_h = (augmentations['M'] / effectifs['M'] * 100) if effectifs['M'] > 0 else 0
@@ -1055,11 +1412,13 @@ class DSNParser:
         }
 
     def _calculer_indicateur_promotions_multi_mois(self, parsers_list: list,
-                                                    types_filtres: list = None) -> Dict[str, Any]:
+                                                    types_filtres: list = None,
+                                                    timeline: Optional[TimelineIndex] = None) -> Dict[str, Any]:
         """
         Calcule l'Indicateur 3 - Écart de taux de promotions (mode multi-mois)
 
-        Détecte les changements de CSP (catégorie socio-professionnelle) entre premier et dernier mois.
+        Détecte les changements de CSP (catégorie socio-professionnelle) entre premier et dernier mois,
+        sur les salariés appariés par l'index chronologique (matricule, à défaut NIR).
 
         Barème: écart ≤ 2% = 15 pts, ≤ 3% = 10 pts, ≤ 5% = 5 pts, > 5% = 0 pts
         """
@@ -1073,23 +1432,8 @@ class DSNParser:
 
         parser_debut = parsers_list[0]
         parser_fin = parsers_list[-1]
-
-        # Construire un dictionnaire matricule -> CSP pour chaque période
-        csp_debut = {}
-        for salarie in parser_debut.stats['salaries']:
-            matricule = salarie.get('matricule')
-            sexe = salarie.get('sexe')
-            csp = salarie.get('csp')
-            if matricule and sexe in ['M', 'F'] and csp:
-                csp_debut[matricule] = {'csp': csp, 'sexe': sexe}
-
-        csp_fin = {}
-        for salarie in parser_fin.stats['salaries']:
-            matricule = salarie.get('matricule')
-            sexe = salarie.get('sexe')
-            csp = salarie.get('csp')
-            if matricule and sexe in ['M', 'F'] and csp:
-                csp_fin[matricule] = {'csp': csp, 'sexe': sexe}
+        if timeline is None:
+            timeline = TimelineIndex.depuis_parsers(parsers_list)
 
         # Hiérarchie CSP (du plus bas au plus haut)
         hierarchie_csp = {
@@ -1104,19 +1448,18 @@ class DSNParser:
         promotions = {'M': 0, 'F': 0}
         effectifs = {'M': 0, 'F': 0}
 
-        for matricule, data_debut in csp_debut.items():
-            if matricule in csp_fin:
-                data_fin = csp_fin[matricule]
-                sexe = data_debut['sexe']
-                effectifs[sexe] += 1
-
-                csp_d = data_debut['csp']
-                csp_f = data_fin['csp']
+        for _, salarie_debut, salarie_fin in timeline.jointure(0, -1):
+            sexe = salarie_debut.get('sexe')
+            csp_d = salarie_debut.get('csp')
+            csp_f = salarie_fin.get('csp')
+            if sexe not in ('M', 'F') or salarie_fin.get('sexe') not in ('M', 'F') or not csp_d or not csp_f:
+                continue
+            effectifs[sexe] += 1
 
-                # Promotion si CSP fin > CSP début dans la hiérarchie
-                if (csp_d in hierarchie_csp and csp_f in hierarchie_csp and
-                    hierarchie_csp[csp_f] > hierarchie_csp[csp_d]):
-                    promotions[sexe] += 1
+            # Promotion si CSP fin > CSP début dans la hiérarchie
+            if (csp_d in hierarchie_csp and csp_f in hierarchie_csp and
+                hierarchie_csp[csp_f] > hierarchie_csp[csp_d]):
+                promotions[sexe] += 1
 
         # Calculer les taux de promotion par sexe
         taux_h = (promotions['M'] / effectifs['M'] * 100) if effectifs['M'] > 0 else 0
@@ -1171,30 +1514,37 @@ class DSNParser:
             )
         }
 
-    def get_results(self, types_filtres: list = None, date_reference: str = None) -> Dict[str, Any]:
+    def get_results(self, types_filtres: list = None, date_reference: str = None,
+                    chrono: Chronometre = CHRONO_INACTIF, complet: bool = True) -> Dict[str, Any]:
         """
         Retourne les résultats de l'analyse
 
         Args:
             types_filtres: Liste des codes de types de rémunération à inclure
             date_reference: Date de référence pour le calcul de l'âge (format DDMMYYYY)
+            chrono: Chronomètre de la requête (étapes tranches_age et indicateurs)
+            complet: False = indicateurs seuls, sans stats, blocks ni raw_lines (API JSON)
         """
-        # Recalculer les tranches d'âge avec la date de référence
-        self.recalculer_tranches_age(date_reference)
-
-        egalite = self.calculer_egalite_hf(types_filtres)
-        index_officiel = self.calculer_index_officiel(types_filtres)
-        indicateur_augmentations = self.calculer_indicateur_augmentations(types_filtres)
-        indicateur_promotions = self.calculer_indicateur_promotions(types_filtres)
-        indicateur_conge_maternite = self.calculer_indicateur_conge_maternite(types_filtres)
-        indicateur_top10 = self.calculer_indicateur_top10(types_filtres)
+        # Tranches d'âge à la date de référence (propres à cet appel : le parser n'est pas modifié)
+        with chrono.etape('tranches_age'):
+            tranches_age = self.tranches_age(date_reference)
+
+        # Indicateurs 1 et 5 et statistiques H/F : moteur vectorisé (mêmes résultats que calculer_*)
+        from dsn_indicateurs import IndicateursFrame
+        with chrono.etape('indicateurs'):
+            indicateurs = IndicateursFrame(self.stats['salaries'], types_filtres, tranches_age)
+
+            egalite = indicateurs.egalite_hf()
+            index_officiel = indicateurs.index_officiel()
+            indicateur_augmentations = self.calculer_indicateur_augmentations(types_filtres)
+            indicateur_promotions = self.calculer_indicateur_promotions(types_filtres)
+            indicateur_conge_maternite = self.calculer_indicateur_conge_maternite(types_filtres)
+            indicateur_top10 = indicateurs.top10()
 
         # Extraire tous les types de rémunération trouvés dans le fichier
         types_trouves = set()
         for salarie in self.stats['salaries']:
-            for remun in salarie.get('remunerations', []):
-                if isinstance(remun, dict) and remun.get('type_code'):
-                    types_trouves.add(remun['type_code'])
+            types_trouves.update(code for code in salarie.get('remunerations_par_type', {}) if code)
 
         # Créer une liste des types avec leurs libellés
         types_disponibles = [
@@ -1205,13 +1555,10 @@ class DSNParser:
             for code in sorted(types_trouves)
         ]
 
-        return {
-            'stats': self.stats,
-            'blocks': dict(self.blocks),
-            'raw_lines': self.raw_lines[:100],  # Limite aux 100 premières lignes
+        resultats = {
             'summary': {
                 'total_lines': self.stats['total_lines'],
-                'nb_blocks': len(self.blocks),
+                'nb_blocks': len(self.rubriques_trouvees),
                 'nb_salaries': len(self.stats['salaries']),
                 'entreprise': self.stats['entreprise']
             },
@@ -1224,9 +1571,17 @@ class DSNParser:
             'types_disponibles': types_disponibles,
             'date_reference': date_reference or self.date_reference
         }
+        if complet:
+            resultats['stats'] = self.stats
+            resultats['tranches_age'] = tranches_age  # Alignées sur stats['salaries']
+            resultats['blocks'] = dict(self.blocks)
+            resultats['raw_lines'] = self.raw_lines[:100]  # Limite aux 100 premières lignes
+        return resultats
 
     def get_results_multi_mois(self, parsers_list: list, types_filtres: list = None,
-                                date_reference: str = None) -> Dict[str, Any]:
+                                date_reference: str = None,
+                                chrono: Chronometre = CHRONO_INACTIF,
+                                complet: bool = True) -> Dict[str, Any]:
         """
         Obtient les résultats de l'analyse en mode multi-mois (comparaison entre plusieurs DSN)
 
@@ -1234,39 +1589,45 @@ class DSNParser:
             parsers_list: Liste des objets DSNParser (un par mois)
             types_filtres: Liste des codes de types de rémunération à inclure
             date_reference: Date de référence pour le calcul de l'âge (format DDMMYYYY)
+            chrono: Chronomètre de la requête (étapes tranches_age et indicateurs)
+            complet: False = indicateurs seuls, sans stats, blocks ni raw_lines (API JSON)
 
         Returns:
             Dictionnaire avec les résultats incluant les indicateurs 2, 3, 4
         """
         # Trier les parsers par date de période (du plus ancien au plus récent)
-        parsers_list = sorted(parsers_list, key=lambda p: p.current_period.get('date_fin', ''))
+        parsers_list = sorted(parsers_list, key=lambda p: p.current_period.get('date_fin_int') or 0)
 
         # Utiliser le dernier parser comme référence pour les stats de base
         parser_dernier = parsers_list[-1]
-        parser_dernier.recalculer_tranches_age(date_reference)
-
-        # Calculer les indicateurs classiques (1 et 5) sur le dernier mois
-        egalite = parser_dernier.calculer_egalite_hf(types_filtres)
-        index_officiel = parser_dernier.calculer_index_officiel(types_filtres)
-        indicateur_top10 = parser_dernier.calculer_indicateur_top10(types_filtres)
-
-        # Calculer les indicateurs multi-mois (2, 3, 4)
-        indicateur_augmentations = self._calculer_indicateur_augmentations_multi_mois(
-            parsers_list, types_filtres
-        )
-        indicateur_promotions = self._calculer_indicateur_promotions_multi_mois(
-            parsers_list, types_filtres
-        )
-        indicateur_conge_maternite = self._calculer_indicateur_conge_maternite_multi_mois(
-            parsers_list, types_filtres
-        )
+        with chrono.etape('tranches_age'):
+            tranches_age = parser_dernier.tranches_age(date_reference)
+
+        # Calculer les indicateurs classiques (1 et 5) sur le dernier mois (moteur vectorisé)
+        from dsn_indicateurs import IndicateursFrame
+        with chrono.etape('indicateurs'):
+            indicateurs = IndicateursFrame(parser_dernier.stats['salaries'], types_filtres, tranches_age)
+
+            egalite = indicateurs.egalite_hf()
+            index_officiel = indicateurs.index_officiel()
+            indicateur_top10 = indicateurs.top10()
+
+            # Calculer les indicateurs multi-mois (2, 3, 4) : jointures sur l'index chronologique
+            timeline = TimelineIndex.depuis_parsers(parsers_list)
+            indicateur_augmentations = self._calculer_indicateur_augmentations_multi_mois(
+                parsers_list, types_filtres, timeline
+            )
+            indicateur_promotions = self._calculer_indicateur_promotions_multi_mois(
+                parsers_list, types_filtres, timeline
+            )
+            indicateur_conge_maternite = self._calculer_indicateur_conge_maternite_multi_mois(
+                parsers_list, types_filtres
+            )
 
         # Extraire tous les types de rémunération trouvés
         types_trouves = set()
         for salarie in parser_dernier.stats['salaries']:
-            for remun in salarie.get('remunerations', []):
-                if isinstance(remun, dict) and remun.get('type_code'):
-                    types_trouves.add(remun['type_code'])
+            types_trouves.update(code for code in salarie.get('remunerations_par_type', {}) if code)
 
         types_disponibles = [
             {
@@ -1276,13 +1637,10 @@ class DSNParser:
             for code in sorted(types_trouves)
         ]
 
-        return {
-            'stats': parser_dernier.stats,
-            'blocks': dict(parser_dernier.blocks),
-            'raw_lines': parser_dernier.raw_lines[:100],
+        resultats = {
             'summary': {
                 'total_lines': parser_dernier.stats['total_lines'],
-                'nb_blocks': len(parser_dernier.blocks),
+                'nb_blocks': len(parser_dernier.rubriques_trouvees),
                 'nb_salaries': len(parser_dernier.stats['salaries']),
                 'entreprise': parser_dernier.stats['entreprise'],
                 'nb_mois_analyses': len(parsers_list),
@@ -1297,9 +1655,15 @@ class DSNParser:
             'types_disponibles': types_disponibles,
             'date_reference': date_reference or parser_dernier.date_reference
         }
+        if complet:
+            resultats['stats'] = parser_dernier.stats
+            resultats['tranches_age'] = tranches_age  # Alignées sur stats['salaries']
+            resultats['blocks'] = dict(parser_dernier.blocks)
+            resultats['raw_lines'] = parser_dernier.raw_lines[:100]
+        return resultats
 
     def to_dataframe(self):
-        """Convertit les données en DataFrame pandas"""
+        """Convertit les données en DataFrame pandas (nécessite keep_blocks à l'initialisation)"""
         import pandas as pd
 
         data = []
@@ -1313,6 +1677,9 @@ class DSNParser:
         return pd.DataFrame(data)
 
 
+DSNParser._collect_handlers()
+
+
 def analyze_dsn_file(file_path: str) -> Dict[str, Any]:
     """
     Fonction helper pour analyser un fichier DSN
@@ -1325,3 +1692,16 @@ def analyze_dsn_file(file_path: str) -> Dict[str, Any]:
     """
     parser = DSNParser()
     return parser.parse_file(file_path)
+
+
+def iter_records(file_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Itère sur les tuples (rubrique, valeur) d'un fichier DSN, en flux
+
+    Args:
+        file_path: Chemin vers le fichier DSN
+
+    Returns:
+        Générateur de tuples (rubrique, valeur)
+    """
+    return DSNParser.lean().iter_records(file_path)
@@ -0,0 +1,126 @@
+"""
+Parsing parallèle de plusieurs fichiers DSN
+Chaque fichier est parsé dans un processus séparé (le travail est purement CPU)
+et le parser allégé (stats uniquement) est renvoyé au processus appelant.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from dsn_parser import DSNParser
+from dsn_timing import CHRONO_INACTIF, Chronometre
+
+if TYPE_CHECKING:
+    from dsn_cache import ParseCache
+
+# Nombre de processus de parsing (0 ou absent = nombre de cœurs)
+DEFAULT_WORKERS = int(os.environ.get('DSN_PARSE_WORKERS', '0') or 0) or (os.cpu_count() or 1)
+
+# Salariés dont le détail des rémunérations est conservé (affichés dans egalite_hf.html)
+NB_SALARIES_DETAIL = 20
+
+
+def _parse_worker(file_path: str) -> DSNParser:
+    """Parse un fichier dans un processus du pool et renvoie un parser picklable sans lignes brutes"""
+    parser = DSNParser(keep_raw_lines=0, keep_blocks=False, keep_remunerations=NB_SALARIES_DETAIL)
+    return parser.parse(file_path)
+
+
+def parse_files(file_paths: List[str], workers: Optional[int] = None,
+                cache: Optional['ParseCache'] = None,
+                chrono: Chronometre = CHRONO_INACTIF,
+                suivi: Optional[Callable[[DSNParser], None]] = None,
+                empreintes: Optional[List[Optional[str]]] = None,
+                parsers_recus: Optional[List[Optional[DSNParser]]] = None) -> List[DSNParser]:
+    """
+    Parse plusieurs fichiers DSN en parallèle
+
+    Args:
+        file_paths: Chemins des fichiers DSN (None pour un fichier reçu sans copie dans
+                    uploads/ : son parser doit être fourni ou se trouver dans le cache)
+        workers: Nombre de processus (par défaut DEFAULT_WORKERS, 1 = séquentiel)
+        cache: Cache de parsing optionnel ; seuls les fichiers absents du cache sont parsés
+        chrono: Chronomètre de la requête (étapes cache, encodage et lecture cumulées
+                sur les processus, compteurs de fichiers, octets et lignes parsés,
+                fichiers servis par le cache, résolutions PCS-ESE)
+        suivi: Appelé avec chaque parser dès qu'il est disponible (avancement d'un job)
+        empreintes: Empreintes SHA-256 déjà connues des fichiers (None = calculées en les relisant)
+        parsers_recus: Parsers déjà obtenus à la réception des fichiers (voir dsn_ingestion),
+                       utilisés tels quels (None pour un fichier à chercher dans le cache ou à parser)
+
+    Returns:
+        Liste des parsers, dans le même ordre que file_paths
+
+    Raises:
+        FileNotFoundError: Fichier sans copie dans uploads/, ni parser reçu, ni parser en cache
+    """
+    parsers: List[Optional[DSNParser]] = list(parsers_recus) if parsers_recus else [None] * len(file_paths)
+    keys = [None] * len(file_paths)
+
+    if suivi is not None:
+        for parser in parsers:
+            if parser is not None:
+                suivi(parser)
+
+    if cache is not None:
+        with chrono.etape('cache'):
+            for idx, path in enumerate(file_paths):
+                if parsers[idx] is not None:
+                    continue
+                digest = empreintes[idx] if empreintes else None
+                if not digest and path is None:
+                    continue
+                keys[idx] = cache.key_for_digest(digest) if digest else cache.key(path)
+                parsers[idx] = cache.get(keys[idx])
+                if parsers[idx] is not None and suivi is not None:
+                    suivi(parsers[idx])
+
+    a_parser = [idx for idx, parser in enumerate(parsers) if parser is None]
+    # Un fichier reçu sans copie ne peut être relu : jamais de repli sur un autre fichier de uploads/
+    sans_copie = sum(1 for idx in a_parser if file_paths[idx] is None)
+    if sans_copie:
+        raise FileNotFoundError(
+            f"{sans_copie} fichier(s) reçu(s) sans copie dans uploads/ (DSN_CONSERVER_FICHIERS) "
+            "et absent(s) du cache de parsing : veuillez renvoyer les fichiers"
+        )
+    resultats = _parse_all([file_paths[idx] for idx in a_parser], workers, suivi)
+    chrono.compter('fichiers_parses', len(a_parser))
+    chrono.compter('fichiers_en_cache', len(file_paths) - len(a_parser))
+
+    for idx, parser in zip(a_parser, resultats):
+        parsers[idx] = parser
+        if chrono.actif:
+            chrono.compter_parsing(parser, os.path.getsize(file_paths[idx]))
+        if cache is not None:
+            cache.put(keys[idx], parser)
+
+    return parsers
+
+
+def _parse_all(file_paths: List[str], workers: Optional[int],
+               suivi: Optional[Callable[[DSNParser], None]] = None) -> List[DSNParser]:
+    """Parse les fichiers sur le pool de processus (ou en séquentiel si un seul)"""
+    workers = min(workers or DEFAULT_WORKERS, len(file_paths))
+
+    if workers <= 1:
+        return _collecter(map(_parse_worker, file_paths), suivi)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map conserve l'ordre des fichiers : le résultat est déterministe
+            return _collecter(executor.map(_parse_worker, file_paths), suivi)
+    except (OSError, NotImplementedError) as e:
+        # Environnement sans multiprocessing (ex: sandbox) : repli séquentiel
+        print(f"Parsing parallèle indisponible, repli séquentiel : {e}")
+        return _collecter(map(_parse_worker, file_paths), suivi)
+
+
+def _collecter(parsers, suivi: Optional[Callable[[DSNParser], None]]) -> List[DSNParser]:
+    """Liste des parsers, en signalant chacun dès qu'il est disponible"""
+    resultats = []
+    for parser in parsers:
+        resultats.append(parser)
+        if suivi is not None:
+            suivi(parser)
+    return resultats
@@ -0,0 +1,347 @@
+"""
+Enregistrements compacts des salariés et des rémunérations
+Classes à __slots__ (pas de dictionnaire par instance) lisibles comme des dict :
+salarie['nom'], salarie.get('csp'), salarie.items()... Les templates Jinja y accèdent
+par attribut (salarie.nom, avec repli sur salarie['nom']) et les indicateurs par get(),
+sans changement.
+
+Les champs non prévus (handlers ajoutés par une sous-classe de DSNParser) restent
+possibles via salarie['champ'] = valeur : ils sont rangés dans un dictionnaire annexe
+créé seulement à la première utilisation.
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Séquences de codes de types de rémunération mémorisées (les plus récemment utilisées)
+TAILLE_CODES_PARTAGES = 4096
+
+
+@lru_cache(maxsize=TAILLE_CODES_PARTAGES)
+def _partager_codes(codes: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Tuple de codes partagé entre salariés : ('001', '002', '003')...
+
+    Mémorisée : renvoie le premier tuple égal rencontré, que se partagent tous les salariés
+    ayant les mêmes types dans le même ordre. Cache borné : un worker de longue durée ne
+    garde pas les séquences de tous les fichiers qu'il a parsés.
+    """
+    return codes
+
+# Marqueur de champ non renseigné
+_ABSENT = object()
+
+
+class Enregistrement:
+    """Enregistrement à __slots__ exposant une vue dict (champs renseignés uniquement)"""
+
+    # Champs hors CHAMPS (dictionnaire créé au premier besoin, absent sinon)
+    __slots__ = ('_extra',)
+
+    # Champs prévus, dans l'ordre de la vue dict (redéfini par les sous-classes)
+    CHAMPS = ()
+    # Mêmes champs en ensemble (calculé pour chaque sous-classe) : la vue dict ne lit que
+    # les slots déclarés, jamais les méthodes ('get', 'keys'...) ni '_extra'
+    _CHAMPS = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._CHAMPS = frozenset(cls.CHAMPS)
+
+    def __getitem__(self, champ: str) -> Any:
+        if champ in self._CHAMPS:
+            valeur = getattr(self, champ, _ABSENT)
+            if valeur is not _ABSENT:
+                return valeur
+        extra = getattr(self, '_extra', None)
+        if extra is None or champ not in extra:
+            raise KeyError(champ)
+        return extra[champ]
+
+    def __setitem__(self, champ: str, valeur: Any):
+        if champ in self._CHAMPS:
+            setattr(self, champ, valeur)
+            return
+        extra = getattr(self, '_extra', None)
+        if extra is None:
+            extra = self._extra = {}
+        extra[champ] = valeur
+
+    def __delitem__(self, champ: str):
+        extra = getattr(self, '_extra', None)
+        if extra is not None and champ in extra:
+            del extra[champ]
+            return
+        if champ not in self._CHAMPS:
+            raise KeyError(champ)
+        try:
+            delattr(self, champ)
+        except AttributeError:
+            raise KeyError(champ) from None
+
+    def __contains__(self, champ: str) -> bool:
+        if champ in self._CHAMPS and hasattr(self, champ):
+            return True
+        extra = getattr(self, '_extra', None)
+        return extra is not None and champ in extra
+
+    def get(self, champ: str, default: Any = None) -> Any:
+        if champ in self._CHAMPS:
+            valeur = getattr(self, champ, _ABSENT)
+            if valeur is not _ABSENT:
+                return valeur
+        extra = getattr(self, '_extra', None)
+        return default if extra is None else extra.get(champ, default)
+
+    def setdefault(self, champ: str, default: Any = None) -> Any:
+        if champ not in self:
+            self[champ] = default
+        return self[champ]
+
+    def keys(self) -> List[str]:
+        champs = [champ for champ in self.CHAMPS if hasattr(self, champ)]
+        extra = getattr(self, '_extra', None)
+        if extra:
+            champs.extend(extra)
+        return champs
+
+    def values(self) -> List[Any]:
+        return [self[champ] for champ in self.keys()]
+
+    def items(self) -> List[tuple]:
+        return [(champ, self[champ]) for champ in self.keys()]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __setstate__(self, state: Dict[str, Any]):
+        # Chaînes ré-internées au chargement (pool de processus, cache disque) : les valeurs
+        # identiques d'un mois à l'autre (nom, matricule, codes...) ne sont stockées qu'une fois
+        for champ, valeur in state.items():
+            self[champ] = sys.intern(valeur) if type(valeur) is str else valeur
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (Enregistrement, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class Salarie(Enregistrement):
+    """Salarié d'un fichier DSN (un élément de stats['salaries'])"""
+
+    CHAMPS = (
+        'nir', 'sexe', 'nom', 'prenom', 'matricule',
+        'date_naissance', 'date_naissance_int', 'date_embauche', 'date_embauche_int',
+        'date_sortie', 'date_sortie_int',
+        'statut_retraite', 'statut', 'qualification', 'position_convention',
+        'statut_conventionnel', 'code_pcs_ese', 'libelle_emploi',
+        'groupe', 'groupe_code', 'csp', 'csp_libelle', 'tranche_age',
+        'remunerations', 'remunerations_par_type',
+    )
+    __slots__ = CHAMPS
+
+    def __init__(self, nir: str, sexe: str = None):
+        self.nir = nir
+        self.sexe = sexe
+        # Détail des rémunérations : tuple vide partagé, remplacé par une liste au premier ajout
+        self.remunerations = ()
+        self.remunerations_par_type = MontantsParType()  # type_code -> montant total
+
+
+class Remuneration(Enregistrement):
+    """Ligne de rémunération (S21.G00.51) d'un salarié"""
+
+    CHAMPS = ('montant', 'date_debut', 'date_fin', 'type_code', 'type_libelle')
+    __slots__ = CHAMPS
+
+    def __init__(self, montant: float, date_debut: str, date_fin: str,
+                 type_code: str, type_libelle: str):
+        self.montant = montant
+        self.date_debut = date_debut
+        self.date_fin = date_fin
+        self.type_code = type_code
+        self.type_libelle = type_libelle
+
+
+class LigneEffectif:
+    """
+    Salarié présent dans un mois de l'évolution de l'effectif (détail affiché par période)
+
+    Vue en lecture seule sur le Salarie du mois : seuls l'âge et les indicateurs
+    d'entrée / de sortie propres au mois sont stockés, les autres champs sont lus
+    sur le salarié à la demande.
+    """
+
+    CHAMPS = (
+        'matricule', 'nir', 'nom', 'prenom', 'sexe', 'date_naissance', 'age',
+        'groupe', 'groupe_code', 'csp', 'csp_libelle', 'code_emploi', 'libelle_emploi',
+        'statut_conventionnel', 'date_embauche', 'date_sortie', 'est_entree', 'est_sortie',
+    )
+    __slots__ = ('salarie', 'age', 'est_entree', 'est_sortie')
+
+    # Codes groupe (21-26) -> libellés affichés
+    LIBELLES_GROUPE = {
+        '21': 'Ouvriers',
+        '22': 'Employés',
+        '23': 'Agents de maîtrise',
+        '24': 'Cadres',
+        '25': 'Cadres dirigeants',
+        '26': 'Autres'
+    }
+
+    # Champ affiché -> (champ du salarié, valeur par défaut)
+    CHAMPS_SALARIE = {
+        'matricule': ('matricule', ''),
+        'nir': ('nir', ''),
+        'nom': ('nom', ''),
+        'prenom': ('prenom', ''),
+        'date_naissance': ('date_naissance', ''),
+        'groupe_code': ('groupe_code', None),
+        'csp': ('csp', None),
+        'csp_libelle': ('csp_libelle', ''),
+        'code_emploi': ('code_pcs_ese', ''),
+        'libelle_emploi': ('libelle_emploi', ''),
+        'statut_conventionnel': ('statut_conventionnel', ''),
+        'date_embauche': ('date_embauche', ''),
+        'date_sortie': ('date_sortie', ''),
+    }
+
+    def __init__(self, salarie: Salarie, age: Any, est_entree: bool, est_sortie: bool):
+        self.salarie = salarie
+        self.age = age
+        self.est_entree = est_entree
+        self.est_sortie = est_sortie
+
+    def __getattr__(self, champ: str) -> Any:
+        # Appelé pour les champs lus sur le salarié (les slots sont trouvés directement)
+        if champ in self.CHAMPS_SALARIE:
+            champ_salarie, defaut = self.CHAMPS_SALARIE[champ]
+            return self.salarie.get(champ_salarie, defaut)
+        if champ == 'sexe':
+            nir = self.salarie.get('nir', '')
+            return 'Homme' if nir[:1] == '1' else 'Femme' if nir[:1] == '2' else ''
+        if champ == 'groupe':
+            groupe_code = self.salarie.get('groupe_code')
+            return self.LIBELLES_GROUPE.get(groupe_code, self.salarie.get('groupe', 'Non renseigné'))
+        raise AttributeError(champ)
+
+    def __getitem__(self, champ: str) -> Any:
+        if champ not in self.CHAMPS:
+            raise KeyError(champ)
+        return getattr(self, champ)
+
+    def get(self, champ: str, default: Any = None) -> Any:
+        return getattr(self, champ) if champ in self.CHAMPS else default
+
+    def __contains__(self, champ: str) -> bool:
+        return champ in self.CHAMPS
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.CHAMPS
+
+    def values(self) -> List[Any]:
+        return [getattr(self, champ) for champ in self.CHAMPS]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(champ, getattr(self, champ)) for champ in self.CHAMPS]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.CHAMPS)
+
+    def __len__(self) -> int:
+        return len(self.CHAMPS)
+
+    def __repr__(self) -> str:
+        return f"LigneEffectif({dict(self.items())!r})"
+
+
+class MontantsParType:
+    """
+    Cumuls des montants par type de rémunération d'un salarié, lisibles comme un dict
+
+    Les codes sont un tuple partagé par tous les salariés ayant les mêmes types dans le
+    même ordre (voir _partager_codes) ; les montants sont dans un array('d') (8 octets par type).
+    """
+
+    __slots__ = ('codes', 'montants')
+
+    def __init__(self, montants: Dict[str, float] = None):
+        self.codes = ()
+        self.montants = array('d')
+        for code, montant in (montants or {}).items():
+            self.ajouter(code, montant)
+
+    def ajouter(self, code: str, montant: float):
+        """Ajoute un montant au cumul du type `code`"""
+        try:
+            self.montants[self.codes.index(code)] += montant
+        except ValueError:
+            self.codes = _partager_codes(self.codes + (code,))
+            self.montants.append(montant)
+
+    def __getitem__(self, code: str) -> float:
+        try:
+            return self.montants[self.codes.index(code)]
+        except ValueError:
+            raise KeyError(code) from None
+
+    def get(self, code: str, default: Any = None) -> Any:
+        try:
+            return self[code]
+        except KeyError:
+            return default
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.codes
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.codes
+
+    def values(self) -> List[float]:
+        return self.montants.tolist()
+
+    def items(self) -> List[Tuple[str, float]]:
+        return list(zip(self.codes, self.montants))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getstate__(self) -> Tuple[Tuple[str, ...], array]:
+        return self.codes, self.montants
+
+    def __setstate__(self, state: Tuple[Tuple[str, ...], array]):
+        codes, self.montants = state
+        self.codes = _partager_codes(tuple(sys.intern(code) for code in codes))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (MontantsParType, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"MontantsParType({dict(self.items())!r})"
+
+
+# Reconnus comme des mappings (test Jinja `is mapping`, isinstance(x, Mapping))
+Mapping.register(Enregistrement)
+Mapping.register(LigneEffectif)
+Mapping.register(MontantsParType)
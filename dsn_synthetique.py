@@ -0,0 +1,382 @@
+"""
+Générateur de fichiers DSN synthétiques
+Produit des DSN mensuelles réalistes et déterministes (même graine = mêmes fichiers)
+aux formats virgule, EDI compact et espaces, pour les benchmarks et les essais.
+
+Les fichiers sont rangés par entreprise puis par mois : <dossier>/<SIRET>/<YYYYMM>.dsn
+
+Usage :
+    python dsn_synthetique.py dossier [--salaries 1000] [--etablissements 1] [--mois 12]
+                              [--lignes-paie 4] [--rotation 0.02] [--format virgule]
+                              [--pcs 382a:2,524a:5,...] [--graine 0]
+"""
+
+import argparse
+import calendar
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from dsn_tokenizer import FORMAT_EDI, FORMAT_ESPACES, FORMAT_VIRGULE
+
+FORMATS = (FORMAT_VIRGULE, FORMAT_EDI, FORMAT_ESPACES)
+
+# Répartition par défaut des codes PCS-ESE (code -> poids)
+MIX_PCS_ESE = {
+    '233a': 1,   # Chefs d'entreprise du BTP
+    '372c': 2,   # Cadres spécialistes des ressources humaines
+    '382a': 4,   # Ingénieurs et cadres d'étude du BTP
+    '388a': 6,   # Ingénieurs et cadres d'étude en informatique
+    '461d': 5,   # Maîtrise et techniciens des services financiers ou comptables
+    '475a': 5,   # Techniciens de recherche-développement
+    '487a': 3,   # Responsables d'entrepôt, de magasinage
+    '542a': 8,   # Secrétaires
+    '545a': 6,   # Employés administratifs des services techniques de la banque
+    '552a': 8,   # Caissiers de magasin
+    '621a': 4,   # Chefs d'équipe du gros œuvre
+    '628a': 8,   # Mécaniciens qualifiés de maintenance
+    '652a': 10,  # Caristes
+    '684a': 6,   # Nettoyeurs
+}
+
+# Statut conventionnel (S21.G00.40.002) et statut retraite (S21.G00.40.003) par groupe PCS-ESE
+STATUTS_GROUPE = {
+    '2': ('03', '01'),  # Cadre dirigeant
+    '3': ('04', '01'),  # Autres cadres
+    '4': ('05', '04'),  # Profession intermédiaire
+    '5': ('06', '04'),  # Employé
+    '6': ('07', '04'),  # Ouvrier
+}
+
+# Salaire de base mensuel (min, max) par groupe PCS-ESE
+SALAIRES_GROUPE = {
+    '2': (6000, 11000),
+    '3': (3800, 7500),
+    '4': (2500, 4200),
+    '5': (1800, 2800),
+    '6': (1800, 3000),
+}
+
+# Écart moyen de salaire de base femmes / hommes
+ECART_HF = 0.06
+
+# Types de rémunération (S21.G00.51.011) dans l'ordre d'émission
+TYPES_REMUNERATION = ['001', '002', '003', '010', '017', '019', '025', '026']
+
+NOMS = [
+    'MARTIN', 'BERNARD', 'THOMAS', 'PETIT', 'ROBERT', 'RICHARD', 'DURAND', 'DUBOIS',
+    'MOREAU', 'LAURENT', 'SIMON', 'MICHEL', 'LEFEBVRE', 'LEROY', 'ROUX', 'DAVID',
+    'BERTRAND', 'MOREL', 'FOURNIER', 'GIRARD', 'BONNET', 'DUPONT', 'LAMBERT', 'FONTAINE',
+    'ROUSSEAU', 'VINCENT', 'MULLER', 'LEFEVRE', 'FAURE', 'ANDRE', 'MERCIER', 'BLANC',
+]
+PRENOMS = {
+    '1': ['JEAN', 'PIERRE', 'MICHEL', 'ANDRÉ', 'PHILIPPE', 'NICOLAS', 'JÉRÔME', 'LUC',
+          'THOMAS', 'NOËL', 'HUGO', 'LÉO', 'JULIEN', 'FRANÇOIS', 'KARIM', 'YANNICK'],
+    '2': ['MARIE', 'NATHALIE', 'ISABELLE', 'SYLVIE', 'HÉLÈNE', 'CÉLINE', 'CHLOÉ', 'ZOÉ',
+          'LÉA', 'FRANÇOISE', 'INÈS', 'AMÉLIE', 'SOPHIE', 'EMMA', 'NADIA', 'AGNÈS'],
+}
+
+# Motifs de fin de contrat (S21.G00.62.002)
+MOTIFS_SORTIE = ['059', '011', '020', '031', '034']
+
+
+def _siren(rng: random.Random) -> str:
+    """SIREN à 9 chiffres avec clé de Luhn valide"""
+    base = f"{rng.randint(10000000, 99999999)}"
+    for cle in range(10):
+        candidat = base + str(cle)
+        total = 0
+        for position, chiffre in enumerate(reversed(candidat)):
+            valeur = int(chiffre) * (2 if position % 2 else 1)
+            total += valeur - 9 if valeur > 9 else valeur
+        if total % 10 == 0:
+            return candidat
+    return base + '0'
+
+
+def _nir(rng: random.Random, sexe: str, annee: int, mois: int) -> str:
+    """NIR à 15 caractères (sexe, année et mois de naissance, lieu, ordre et clé)"""
+    corps = (f"{sexe}{annee % 100:02d}{mois:02d}{rng.randint(1, 95):02d}"
+             f"{rng.randint(1, 999):03d}{rng.randint(1, 999):03d}")
+    return f"{corps}{97 - int(corps) % 97:02d}"
+
+
+def _choisir_pcs(rng: random.Random, mix_pcs_ese: Dict[str, float]) -> str:
+    return rng.choices(list(mix_pcs_ese), weights=list(mix_pcs_ese.values()))[0]
+
+
+def _nouveau_salarie(rng: random.Random, numero: int, annee: int, mois: int,
+                     nb_etablissements: int, mix_pcs_ese: Dict[str, float],
+                     embauche_dans_mois: bool) -> Dict[str, Any]:
+    """Crée un salarié ; embauché dans le mois déclaré ou avant le début de la série"""
+    sexe = rng.choice('12')
+    annee_naissance = rng.randint(annee - 64, annee - 18)
+    mois_naissance = rng.randint(1, 12)
+    jour_naissance = rng.randint(1, calendar.monthrange(annee_naissance, mois_naissance)[1])
+
+    if embauche_dans_mois:
+        embauche = (annee, mois, rng.randint(1, calendar.monthrange(annee, mois)[1]))
+    else:
+        premiere_annee = min(max(annee_naissance + 18, annee - 30), annee - 1)
+        annee_embauche = rng.randint(premiere_annee, annee - 1)
+        embauche = (annee_embauche, rng.randint(1, 12), rng.randint(1, 28))
+
+    pcs = _choisir_pcs(rng, mix_pcs_ese)
+    minimum, maximum = SALAIRES_GROUPE.get(pcs[0], (1800, 3500))
+    salaire = rng.uniform(minimum, maximum)
+    if sexe == '2':
+        salaire *= 1 - rng.uniform(0, 2 * ECART_HF)
+
+    return {
+        'numero': numero,
+        'nir': _nir(rng, sexe, annee_naissance, mois_naissance),
+        'nom': rng.choice(NOMS),
+        'prenom': rng.choice(PRENOMS[sexe]),
+        'naissance': f"{jour_naissance:02d}{mois_naissance:02d}{annee_naissance:04d}",
+        'embauche': f"{embauche[2]:02d}{embauche[1]:02d}{embauche[0]:04d}",
+        'matricule': f"M{numero:07d}",
+        'pcs': pcs,
+        'etablissement': rng.randrange(nb_etablissements),
+        'salaire': round(salaire, 2),
+        'sortie': None,
+    }
+
+
+def _ecrire(f, format_lignes: str, rubrique: str, valeur: str):
+    if format_lignes == FORMAT_VIRGULE:
+        f.write(f"{rubrique},'{valeur}'\n")
+    elif format_lignes == FORMAT_EDI:
+        f.write(f"{rubrique.replace('.', '')}{valeur}\n")
+    else:
+        f.write(f"{rubrique} {valeur}\n")
+
+
+def ecrire_dsn(chemin: str, salaries: List[Dict[str, Any]], siren: str, nics: List[str],
+               annee: int, mois: int, lignes_paie: int = 4, format_lignes: str = FORMAT_VIRGULE,
+               encodage: str = 'latin-1', rng: Optional[random.Random] = None) -> int:
+    """
+    Écrit la DSN mensuelle d'une entreprise
+
+    Args:
+        chemin: Fichier à écrire
+        salaries: Salariés présents dans le mois (voir generer_serie)
+        siren: SIREN de l'entreprise
+        nics: NIC des établissements (le premier est le siège)
+        annee, mois: Mois principal déclaré
+        lignes_paie: Nombre de blocs rémunération (S21.G00.51) par salarié
+        format_lignes: virgule, edi ou espaces
+        encodage: Encodage du fichier
+        rng: Générateur aléatoire (primes, heures supplémentaires)
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    rng = rng or random.Random(0)
+    dernier_jour = calendar.monthrange(annee, mois)[1]
+    debut = f"01{mois:02d}{annee:04d}"
+    fin = f"{dernier_jour:02d}{mois:02d}{annee:04d}"
+    nb_lignes = 0
+
+    with open(chemin, 'w', encoding=encodage, newline='\n') as f:
+        def rubrique(code: str, valeur: str):
+            nonlocal nb_lignes
+            _ecrire(f, format_lignes, code, valeur)
+            nb_lignes += 1
+
+        # Envoi et émetteur
+        rubrique('S10.G00.00.001', 'PAIE SYNTHETIQUE')
+        rubrique('S10.G00.00.002', 'DSN ANALYZER')
+        rubrique('S10.G00.00.003', '1.0')
+        rubrique('S10.G00.00.005', '02')
+        rubrique('S10.G00.00.006', 'P25V01')
+        rubrique('S10.G00.00.008', '01')
+        rubrique('S10.G00.01.001', siren)
+        rubrique('S10.G00.01.002', nics[0])
+        rubrique('S10.G00.01.003', f'ENTREPRISE {siren}')
+
+        # Déclaration
+        rubrique('S20.G00.05.001', '01')
+        rubrique('S20.G00.05.002', '01')
+        rubrique('S20.G00.05.003', '11')
+        rubrique('S20.G00.05.004', '1')
+        rubrique('S20.G00.05.005', debut)
+        rubrique('S20.G00.05.007', fin)
+        rubrique('S20.G00.05.008', '01')
+
+        # Entreprise
+        rubrique('S21.G00.06.001', siren)
+        rubrique('S21.G00.06.002', nics[0])
+        rubrique('S21.G00.06.003', '6201Z')
+
+        par_etablissement = [[] for _ in nics]
+        for salarie in salaries:
+            par_etablissement[salarie['etablissement']].append(salarie)
+
+        for idx_etab, nic in enumerate(nics):
+            rubrique('S21.G00.11.001', nic)
+            rubrique('S21.G00.11.002', '6201Z')
+            rubrique('S21.G00.11.003', f'{idx_etab + 1} RUE DE LA PAIX')
+            rubrique('S21.G00.11.004', '75001')
+            rubrique('S21.G00.11.005', 'PARIS')
+
+            for salarie in par_etablissement[idx_etab]:
+                # Individu
+                rubrique('S21.G00.30.001', salarie['nir'])
+                rubrique('S21.G00.30.002', salarie['nom'])
+                rubrique('S21.G00.30.004', salarie['prenom'])
+                rubrique('S21.G00.30.006', salarie['naissance'])
+                rubrique('S21.G00.30.019', salarie['matricule'])
+
+                # Contrat
+                statut, retraite = STATUTS_GROUPE.get(salarie['pcs'][0], ('06', '04'))
+                rubrique('S21.G00.40.001', salarie['embauche'])
+                rubrique('S21.G00.40.002', statut)
+                rubrique('S21.G00.40.003', retraite)
+                rubrique('S21.G00.40.004', salarie['pcs'])
+                rubrique('S21.G00.40.007', '01')
+                rubrique('S21.G00.40.008', '99')
+                rubrique('S21.G00.40.009', f"{salarie['numero']:05d}")
+
+                # Versement et rémunérations
+                salaire = salarie['salaire']
+                heures_sup = round(rng.uniform(0, 0.08) * salaire, 2) if rng.random() < 0.3 else 0.0
+                prime = round(rng.uniform(0.02, 0.15) * salaire, 2) if rng.random() < 0.2 else 0.0
+                brut = round(salaire + heures_sup + prime, 2)
+                rubrique('S21.G00.50.001', fin)
+                rubrique('S21.G00.50.002', f"{brut * 0.78:.2f}")
+
+                montants = {
+                    '001': brut, '002': brut, '003': brut, '010': salaire,
+                    '017': heures_sup, '019': prime, '025': 0.0, '026': 0.0,
+                }
+                for ligne in range(lignes_paie):
+                    type_code = TYPES_REMUNERATION[ligne % len(TYPES_REMUNERATION)]
+                    rubrique('S21.G00.51.001', debut)
+                    rubrique('S21.G00.51.002', fin)
+                    rubrique('S21.G00.51.010', f"{salarie['numero']:05d}")
+                    rubrique('S21.G00.51.011', type_code)
+                    rubrique('S21.G00.51.013', f"{montants[type_code]:.2f}")
+
+                # Fin de contrat dans le mois
+                if salarie['sortie']:
+                    rubrique('S21.G00.62.001', salarie['sortie'])
+                    rubrique('S21.G00.62.002', rng.choice(MOTIFS_SORTIE))
+
+        # Totaux (la rubrique S90.G00.90.001 compte aussi les deux lignes S90)
+        rubrique('S90.G00.90.001', str(nb_lignes + 2))
+        rubrique('S90.G00.90.002', '1')
+
+    return nb_lignes
+
+
+def generer_serie(dossier: str, nb_salaries: int = 1000, nb_etablissements: int = 1,
+                  nb_mois: int = 1, lignes_paie: int = 4, taux_rotation: float = 0.02,
+                  mix_pcs_ese: Optional[Dict[str, float]] = None,
+                  format_lignes: str = FORMAT_VIRGULE, graine: int = 0,
+                  annee: int = 2024, mois_debut: int = 1,
+                  encodage: str = 'latin-1') -> List[str]:
+    """
+    Génère une série de DSN mensuelles consécutives pour une entreprise
+
+    Chaque mois, une part `taux_rotation` de l'effectif sort (date de fin de contrat
+    dans le mois) et autant de salariés sont embauchés : les entrées et sorties sont
+    cohérentes d'un fichier à l'autre (mêmes matricules et NIR).
+
+    Args:
+        dossier: Dossier racine ; les fichiers sont écrits dans <dossier>/<SIRET>/<YYYYMM>.dsn
+        nb_salaries: Effectif du premier mois
+        nb_etablissements: Nombre d'établissements (blocs S21.G00.11)
+        nb_mois: Nombre de mois consécutifs
+        lignes_paie: Nombre de blocs rémunération (S21.G00.51) par salarié et par mois
+        taux_rotation: Part de l'effectif qui sort (et est remplacée) chaque mois
+        mix_pcs_ese: Répartition des codes PCS-ESE (code -> poids), MIX_PCS_ESE par défaut
+        format_lignes: virgule, edi ou espaces
+        graine: Graine aléatoire (même graine = mêmes fichiers)
+        annee, mois_debut: Premier mois déclaré
+        encodage: Encodage des fichiers
+
+    Returns:
+        Chemins des fichiers générés, du plus ancien au plus récent
+    """
+    if format_lignes not in FORMATS:
+        raise ValueError(f"Format inconnu : {format_lignes} (attendu : {', '.join(FORMATS)})")
+
+    rng = random.Random(graine)
+    mix_pcs_ese = mix_pcs_ese or MIX_PCS_ESE
+    siren = _siren(rng)
+    nics = [f"{(idx + 1) * 10 + 2:05d}" for idx in range(nb_etablissements)]
+    siret_dir = os.path.join(dossier, siren + nics[0])
+    os.makedirs(siret_dir, exist_ok=True)
+
+    salaries = [
+        _nouveau_salarie(rng, numero, annee, mois_debut, nb_etablissements, mix_pcs_ese, False)
+        for numero in range(1, nb_salaries + 1)
+    ]
+    prochain_numero = nb_salaries + 1
+
+    chemins = []
+    for idx_mois in range(nb_mois):
+        annee_mois, mois = divmod(mois_debut - 1 + idx_mois, 12)
+        annee_mois += annee
+        mois += 1
+        dernier_jour = calendar.monthrange(annee_mois, mois)[1]
+
+        # Sorties du mois (présentes dans ce fichier, absentes du suivant) et embauches
+        nb_mouvements = int(round(len(salaries) * taux_rotation))
+        for salarie in rng.sample(salaries, min(nb_mouvements, len(salaries))):
+            salarie['sortie'] = f"{rng.randint(1, dernier_jour):02d}{mois:02d}{annee_mois:04d}"
+        for _ in range(nb_mouvements):
+            salaries.append(_nouveau_salarie(rng, prochain_numero, annee_mois, mois,
+                                             nb_etablissements, mix_pcs_ese, True))
+            prochain_numero += 1
+
+        # Augmentations individuelles (environ une par salarié et par an)
+        for salarie in salaries:
+            if rng.random() < 1 / 12:
+                salarie['salaire'] = round(salarie['salaire'] * rng.uniform(1.01, 1.05), 2)
+
+        chemin = os.path.join(siret_dir, f"{annee_mois:04d}{mois:02d}.dsn")
+        ecrire_dsn(chemin, salaries, siren, nics, annee_mois, mois, lignes_paie,
+                   format_lignes, encodage, rng)
+        chemins.append(chemin)
+
+        salaries = [salarie for salarie in salaries if not salarie['sortie']]
+
+    return chemins
+
+
+def _lire_mix(valeur: str) -> Dict[str, float]:
+    """Lit une répartition PCS-ESE 'code:poids,code:poids'"""
+    mix = {}
+    for element in valeur.split(','):
+        code, _, poids = element.partition(':')
+        mix[code.strip()] = float(poids or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère des fichiers DSN synthétiques")
+    parser.add_argument('dossier', help="Dossier de sortie (<dossier>/<SIRET>/<YYYYMM>.dsn)")
+    parser.add_argument('--salaries', type=int, default=1000, help="Effectif du premier mois")
+    parser.add_argument('--etablissements', type=int, default=1)
+    parser.add_argument('--mois', type=int, default=1, help="Nombre de mois consécutifs")
+    parser.add_argument('--lignes-paie', type=int, default=4, help="Blocs S21.G00.51 par salarié")
+    parser.add_argument('--rotation', type=float, default=0.02, help="Taux de sortie mensuel")
+    parser.add_argument('--format', choices=FORMATS, default=FORMAT_VIRGULE)
+    parser.add_argument('--pcs', type=_lire_mix, default=None,
+                        help="Répartition PCS-ESE, ex: 388a:3,542a:5,652a:2")
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--annee', type=int, default=2024)
+    args = parser.parse_args()
+
+    chemins = generer_serie(
+        args.dossier, nb_salaries=args.salaries, nb_etablissements=args.etablissements,
+        nb_mois=args.mois, lignes_paie=args.lignes_paie, taux_rotation=args.rotation,
+        mix_pcs_ese=args.pcs, format_lignes=args.format, graine=args.graine, annee=args.annee
+    )
+    for chemin in chemins:
+        print(chemin)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Index chronologique des salariés sur plusieurs mois DSN
+Construit une fois par analyse, il associe à chaque salarié (matricule S21.G00.30.019,
+à défaut NIR) un vecteur dense d'un élément par mois : le Salarie du mois (présence,
+rémunérations par type, CSP, dates de contrat) ou None s'il est absent ce mois-là.
+
+Les calculs multi-mois (indicateurs 2 et 3, mouvements de l'évolution de l'effectif)
+sont des jointures sur cet index plutôt que des parcours répétés des salariés de
+chaque mois.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def cle_salarie(salarie: Any) -> str:
+    """Identifiant d'un salarié d'un mois à l'autre : matricule, à défaut NIR ('' si aucun)"""
+    return salarie.get('matricule') or salarie.get('nir') or ''
+
+
+class TimelineIndex:
+    """
+    Salarié -> vecteur mensuel (Salarie ou None), sur des mois triés chronologiquement
+
+    Args:
+        mois_salaries: Salariés de chaque mois (stats['salaries']), du plus ancien au plus récent
+    """
+
+    def __init__(self, mois_salaries: List[Iterable[Any]]):
+        self.nb_mois = len(mois_salaries)
+        self.vecteurs: Dict[str, List[Optional[Any]]] = {}
+
+        vecteurs = self.vecteurs
+        nb_mois = self.nb_mois
+        for idx, salaries in enumerate(mois_salaries):
+            for salarie in salaries:
+                cle = cle_salarie(salarie)
+                if not cle:
+                    continue
+                vecteur = vecteurs.get(cle)
+                if vecteur is None:
+                    vecteur = vecteurs[cle] = [None] * nb_mois
+                # Plusieurs lignes pour le même salarié dans un mois : la dernière est retenue
+                vecteur[idx] = salarie
+
+    @classmethod
+    def depuis_parsers(cls, parsers: List[Any]) -> 'TimelineIndex':
+        """Index des parsers d'une analyse (déjà triés par mois)"""
+        return cls([parser.stats.get('salaries', []) for parser in parsers])
+
+    def __len__(self) -> int:
+        return len(self.vecteurs)
+
+    def __contains__(self, cle: str) -> bool:
+        return cle in self.vecteurs
+
+    def vecteur(self, cle: str) -> List[Optional[Any]]:
+        """Salarie de chaque mois (None = absent)"""
+        return self.vecteurs[cle]
+
+    def presence(self, cle: str) -> List[bool]:
+        """Présence du salarié dans chaque mois"""
+        return [salarie is not None for salarie in self.vecteurs[cle]]
+
+    def jointure(self, mois_a: int = 0, mois_b: int = -1) -> Iterator[Tuple[str, Any, Any]]:
+        """
+        Salariés présents dans les deux mois (par défaut le premier et le dernier)
+
+        Returns:
+            Itérateur de tuples (clé, Salarie du mois a, Salarie du mois b)
+        """
+        for cle, vecteur in self.vecteurs.items():
+            salarie_a = vecteur[mois_a]
+            if salarie_a is None:
+                continue
+            salarie_b = vecteur[mois_b]
+            if salarie_b is not None:
+                yield cle, salarie_a, salarie_b
+
+    def mouvements(self) -> Tuple[List[int], List[int]]:
+        """
+        Arrivées et départs de chaque mois d'après la présence (indépendamment des dates
+        d'embauche et de fin de contrat déclarées)
+
+        Une arrivée est un salarié présent ce mois-ci et absent le mois précédent ; un départ,
+        un salarié présent le mois précédent et absent ce mois-ci. Le premier mois n'a ni
+        arrivée ni départ (pas de mois précédent).
+
+        Returns:
+            Tuple (arrivées par mois, départs par mois)
+        """
+        arrivees = [0] * self.nb_mois
+        departs = [0] * self.nb_mois
+        for vecteur in self.vecteurs.values():
+            precedent = vecteur[0] is not None
+            for idx in range(1, self.nb_mois):
+                present = vecteur[idx] is not None
+                if present != precedent:
+                    if present:
+                        arrivees[idx] += 1
+                    else:
+                        departs[idx] += 1
+                    precedent = present
+        return arrivees, departs
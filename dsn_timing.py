@@ -0,0 +1,134 @@
+"""
+Mesure du temps par étape des analyses DSN
+Un Chronometre par requête cumule les durées des étapes (détection d'encodage, lecture
+des lignes, tranches d'âge, indicateurs, rendu...) et des compteurs (lignes, salariés,
+lignes de paie). Le résultat est écrit sur une ligne de log JSON et, si demandé, dans
+l'en-tête HTTP Server-Timing (visible dans l'onglet Réseau du navigateur).
+
+Désactivé (DSN_TIMING=0, par défaut), le chronomètre ne mesure rien : etape() renvoie
+un gestionnaire de contexte vide partagé et les compteurs ne sont pas mis à jour.
+
+Variables d'environnement :
+    DSN_TIMING=1         active la mesure et la ligne de log
+    DSN_SERVER_TIMING=1  ajoute l'en-tête Server-Timing (active aussi DSN_TIMING)
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterable
+
+# Activation par défaut (voir app.config['DSN_TIMING'] / ['DSN_SERVER_TIMING'])
+SERVER_TIMING_ACTIF = os.environ.get('DSN_SERVER_TIMING', '0') not in ('', '0')
+TIMING_ACTIF = SERVER_TIMING_ACTIF or os.environ.get('DSN_TIMING', '0') not in ('', '0')
+
+
+class _Etape:
+    """Mesure d'une étape (gestionnaire de contexte)"""
+
+    __slots__ = ('chrono', 'nom', 'debut')
+
+    def __init__(self, chrono: 'Chronometre', nom: str):
+        self.chrono = chrono
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.chrono.ajouter(self.nom, time.perf_counter() - self.debut)
+        return False
+
+
+class _EtapeInactive:
+    """Étape d'un chronomètre désactivé : ne mesure rien"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_ETAPE_INACTIVE = _EtapeInactive()
+
+
+class Chronometre:
+    """Durées par étape et compteurs d'une requête d'analyse"""
+
+    def __init__(self, actif: bool = True):
+        self.actif = actif
+        self.debut = time.perf_counter()
+        self.durees: Dict[str, float] = {}  # étape -> secondes (cumulées)
+        self.compteurs: Dict[str, int] = {}
+
+    def etape(self, nom: str):
+        """Gestionnaire de contexte mesurant une étape : with chrono.etape('indicateurs'): ..."""
+        if not self.actif:
+            return _ETAPE_INACTIVE
+        return _Etape(self, nom)
+
+    def ajouter(self, nom: str, secondes: float):
+        """Ajoute une durée (secondes) à une étape"""
+        if self.actif:
+            self.durees[nom] = self.durees.get(nom, 0.0) + secondes
+
+    def ajouter_durees(self, durees: Dict[str, float]):
+        """Ajoute des durées mesurées ailleurs (ex: DSNParser.durees, rapporté par un processus du pool)"""
+        if self.actif:
+            for nom, secondes in durees.items():
+                self.ajouter(nom, secondes)
+
+    def compter(self, nom: str, nombre: int = 1):
+        """Incrémente un compteur"""
+        if self.actif:
+            self.compteurs[nom] = self.compteurs.get(nom, 0) + nombre
+
+    def compter_parsing(self, parser: Any, octets: int):
+        """Compte un fichier effectivement parsé (hors cache) : durées, octets, lignes, nomenclature"""
+        if not self.actif:
+            return
+        self.ajouter_durees(parser.durees)
+        self.compter('octets_parses', octets)
+        self.compter('lignes_parsees', parser.stats['total_lines'])
+        self.compter('nomenclature_hits', parser.nomenclature_hits)
+        self.compter('nomenclature_misses', parser.nomenclature_misses)
+
+    def compter_parsers(self, parsers: Iterable[Any]):
+        """Compte les lignes, salariés et lignes de paie des parsers analysés"""
+        if not self.actif:
+            return
+        for parser in parsers:
+            self.compter('lignes', parser.stats['total_lines'])
+            self.compter('salaries', len(parser.stats['salaries']))
+            self.compter('lignes_paie', getattr(parser, 'nb_lignes_paie', 0))
+
+    def total(self) -> float:
+        """Secondes écoulées depuis la création du chronomètre"""
+        return time.perf_counter() - self.debut
+
+    def resume(self) -> Dict[str, Any]:
+        """Durées en millisecondes et compteurs"""
+        return {
+            'total_ms': round(self.total() * 1000, 1),
+            'etapes_ms': {nom: round(secondes * 1000, 1) for nom, secondes in self.durees.items()},
+            'compteurs': dict(self.compteurs),
+        }
+
+    def journaliser(self, route: str):
+        """Écrit la ligne de log structurée (JSON) de la requête"""
+        if self.actif:
+            print(f"Timing {json.dumps(dict(route=route, **self.resume()), ensure_ascii=False)}")
+
+    def server_timing(self) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en millisecondes)"""
+        metriques = [f"{nom};dur={secondes * 1000:.1f}" for nom, secondes in self.durees.items()]
+        metriques.append(f"total;dur={self.total() * 1000:.1f}")
+        return ', '.join(metriques)
+
+
+# Chronomètre partagé des appels sans mesure (valeur par défaut des paramètres chrono)
+CHRONO_INACTIF = Chronometre(actif=False)
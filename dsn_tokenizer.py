@@ -0,0 +1,247 @@
+"""
+Tokenizer des lignes DSN
+Détecte une seule fois le format du fichier (virgule, EDI compact ou espaces)
+puis découpe chaque ligne avec un chemin rapide propre à ce format
+
+DSNTokenizerOctets découpe les lignes sans les décoder (parsing mmap, voir
+DSNParser.parse_mmap) : seules les valeurs utiles sont décodées.
+"""
+
+import codecs
+import re
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+# Formats de ligne reconnus
+FORMAT_VIRGULE = 'virgule'   # S21.G00.30.001,valeur (ou 'valeur')
+FORMAT_EDI = 'edi'           # S21G0030001valeur (code rubrique sans points)
+FORMAT_ESPACES = 'espaces'   # S21.G00.30.001   valeur
+
+# Expressions compilées une seule fois (utilisées pour la détection et en repli)
+RE_VIRGULE = re.compile(r'^(S\d{2}\.G\d{2}\.\d{2}\.\d{3}),(.*)$')
+RE_EDI = re.compile(r'^(S\d{2}G\d{2}\d{2}\d{3})(.*)$')
+RE_ESPACES = re.compile(r'^(S\d{2}\.G\d{2}\.\d{2}\.\d{3})\s+(.*)$')
+RE_RUBRIQUE = re.compile(r'S\d{2}\.G\d{2}\.\d{2}\.\d{3}')
+RE_RUBRIQUE_EDI = re.compile(r'S\d{2}G\d{2}\d{2}\d{3}')
+
+LONGUEUR_RUBRIQUE = 14      # S21.G00.30.001
+LONGUEUR_RUBRIQUE_EDI = 11  # S21G0030001
+
+# Séparateurs code / valeur reconnus sans décodage (virgule, espaces ASCII)
+SEPARATEURS_OCTETS = b', \t\x0b\x0c'
+
+
+def edi_vers_standard(rubrique_edi: str) -> str:
+    """Convertit un code rubrique EDI en format standard (S21G0030001 -> S21.G00.30.001)"""
+    return f"{rubrique_edi[0:3]}.{rubrique_edi[3:6]}.{rubrique_edi[6:8]}.{rubrique_edi[8:11]}"
+
+
+def split_line(line: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Découpe une ligne DSN sans connaissance préalable du format
+
+    Essaie successivement le format virgule, le format EDI compact puis le format
+    avec espaces.
+
+    Args:
+        line: Ligne DSN sans caractère de fin de ligne
+
+    Returns:
+        Tuple (rubrique, valeur, format) ou None si la ligne n'est pas une rubrique DSN
+    """
+    match = RE_VIRGULE.match(line)
+    if match:
+        rubrique, valeur = match.groups()
+        # Retirer les guillemets simples si présents
+        return rubrique, valeur.strip().strip("'"), FORMAT_VIRGULE
+
+    match = RE_EDI.match(line)
+    if match:
+        rubrique_edi, valeur = match.groups()
+        return edi_vers_standard(rubrique_edi), valeur.strip(), FORMAT_EDI
+
+    match = RE_ESPACES.match(line)
+    if match:
+        rubrique, valeur = match.groups()
+        return rubrique, valeur.strip(), FORMAT_ESPACES
+
+    return None
+
+
+class DSNTokenizer:
+    """
+    Découpe les lignes d'un fichier DSN en tuples (rubrique, valeur)
+
+    Le format est détecté sur la première rubrique reconnue. Les lignes suivantes
+    passent par un découpage sans expression régulière (partition ou découpage
+    positionnel) ; les codes rubriques déjà validés sont mémorisés pour ne les
+    vérifier qu'une fois. Une ligne qui ne respecte pas le format détecté repasse
+    par `split_line`, ce qui garde les fichiers mixtes lisibles.
+    """
+
+    def __init__(self):
+        self.format = None
+        # Code rubrique brut -> code rubrique standard (validé une seule fois)
+        self._rubriques: Dict[str, str] = {}
+        self._split_rapide = None
+
+    def split(self, line: str) -> Optional[Tuple[str, str]]:
+        """Découpe une ligne et retourne (rubrique, valeur) ou None"""
+        if self._split_rapide is not None:
+            record = self._split_rapide(line)
+            if record is not None:
+                return record
+
+        result = split_line(line)
+        if result is None:
+            return None
+
+        rubrique, valeur, format_ligne = result
+        if self.format is None:
+            self._set_format(format_ligne)
+        # Le code standard est aussi une clé valide pour les formats virgule et espaces
+        self._rubriques.setdefault(rubrique, rubrique)
+        return rubrique, valeur
+
+    @property
+    def rubriques(self) -> Set[str]:
+        """Codes rubriques (format standard) rencontrés jusqu'ici"""
+        return set(self._rubriques.values())
+
+    def iter_records(self, lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Itère sur les tuples (rubrique, valeur) des lignes fournies"""
+        split = self.split
+        for line in lines:
+            line = line.rstrip('\n\r')
+            if not line:
+                continue
+            record = split(line)
+            if record is not None:
+                yield record
+
+    def _set_format(self, format_ligne: str):
+        """Fixe le format du fichier et le chemin rapide associé"""
+        self.format = format_ligne
+        if format_ligne == FORMAT_VIRGULE:
+            self._split_rapide = self._split_virgule
+        elif format_ligne == FORMAT_EDI:
+            self._split_rapide = self._split_edi
+        else:
+            self._split_rapide = self._split_espaces
+
+    def _rubrique(self, code: str, pattern) -> Optional[str]:
+        """Valide un code rubrique brut (avec mémorisation) et retourne sa forme standard"""
+        rubrique = self._rubriques.get(code)
+        if rubrique is None:
+            if not pattern.fullmatch(code):
+                return None
+            rubrique = edi_vers_standard(code) if pattern is RE_RUBRIQUE_EDI else code
+            self._rubriques[code] = rubrique
+        return rubrique
+
+    def _split_virgule(self, line: str) -> Optional[Tuple[str, str]]:
+        code, sep, valeur = line.partition(',')
+        if not sep:
+            return None
+        rubrique = self._rubriques.get(code) or self._rubrique(code, RE_RUBRIQUE)
+        if rubrique is None:
+            return None
+        return rubrique, valeur.strip().strip("'")
+
+    def _split_edi(self, line: str) -> Optional[Tuple[str, str]]:
+        code = line[:LONGUEUR_RUBRIQUE_EDI]
+        rubrique = self._rubriques.get(code) or self._rubrique(code, RE_RUBRIQUE_EDI)
+        if rubrique is None:
+            return None
+        return rubrique, line[LONGUEUR_RUBRIQUE_EDI:].strip()
+
+    def _split_espaces(self, line: str) -> Optional[Tuple[str, str]]:
+        separateur = line[LONGUEUR_RUBRIQUE:LONGUEUR_RUBRIQUE + 1]
+        if not separateur.isspace():
+            return None
+        code = line[:LONGUEUR_RUBRIQUE]
+        rubrique = self._rubriques.get(code) or self._rubrique(code, RE_RUBRIQUE)
+        if rubrique is None:
+            return None
+        return rubrique, line[LONGUEUR_RUBRIQUE:].strip()
+
+
+def encodage_compatible_ascii(encoding: str) -> bool:
+    """
+    Vrai si les octets 0x00-0x7F sont toujours des caractères ASCII dans cet encodage
+
+    C'est le cas de l'UTF-8, des encodages Latin / Windows-125x et des encodages
+    multi-octets dont les octets suivants sont >= 0x40 (Big5, Shift-JIS, GBK...) :
+    fins de ligne, codes rubriques et séparateurs se lisent alors directement en octets.
+    Pas de l'UTF-16/32, de l'UTF-7 ni des encodages à états (ISO-2022).
+    """
+    try:
+        nom = codecs.lookup(encoding).name
+        ascii_ = bytes(range(128))
+        return not nom.startswith(('utf-16', 'utf-32', 'iso2022')) and ascii_.decode(nom) == ascii_.decode('ascii')
+    except (LookupError, UnicodeDecodeError):
+        return False
+
+
+class DSNTokenizerOctets:
+    """
+    Découpe des lignes DSN en octets, pour un encodage compatible ASCII
+
+    Une ligne est identifiée par sa clé : code rubrique et séparateur (15 octets,
+    formats virgule et espaces) ou code EDI (11 octets). Chaque clé est validée une
+    seule fois et mémorisée avec sa rubrique et la façon de lire la valeur ; les lignes
+    dont la clé n'est pas reconnue sont décodées et découpées par DSNTokenizer (mêmes
+    résultats qu'en mode texte, y compris pour les fichiers mixtes).
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = codecs.lookup(encoding).name
+        self.texte = DSNTokenizer()
+
+    @property
+    def format(self) -> Optional[str]:
+        return self.texte.format
+
+    @property
+    def longueur_cle(self) -> int:
+        """Longueur de la clé des lignes au format du fichier (15 tant qu'il n'est pas détecté)"""
+        return LONGUEUR_RUBRIQUE_EDI if self.texte.format == FORMAT_EDI else LONGUEUR_RUBRIQUE + 1
+
+    @property
+    def rubriques(self) -> Set[str]:
+        return self.texte.rubriques
+
+    def decoder(self, octets: bytes) -> str:
+        """Décode une valeur (les valeurs ASCII, les plus fréquentes, sans passer par le codec)"""
+        return octets.decode('ascii') if octets.isascii() else octets.decode(self.encoding, 'ignore')
+
+    def cle(self, ligne: bytes) -> Optional[Tuple[bytes, str, int, bool]]:
+        """
+        Clé mémorisable d'une ligne
+
+        Returns:
+            Tuple (clé, rubrique, début de la valeur, guillemets à retirer), ou None si la
+            ligne doit être décodée et passer par DSNTokenizer.split (hors format, invalide)
+        """
+        if len(ligne) > LONGUEUR_RUBRIQUE and ligne[LONGUEUR_RUBRIQUE] in SEPARATEURS_OCTETS:
+            code = ligne[:LONGUEUR_RUBRIQUE]
+            # Validation mémorisée par DSNTokenizer._rubrique (une seule fois par code)
+            rubrique = self._rubrique(code, RE_RUBRIQUE)
+            if rubrique is not None:
+                virgule = ligne[LONGUEUR_RUBRIQUE] == 0x2C
+                if self.texte.format is None:
+                    self.texte._set_format(FORMAT_VIRGULE if virgule else FORMAT_ESPACES)
+                # Format virgule : valeur entre guillemets simples retirés ; espaces : valeur seule
+                return ligne[:LONGUEUR_RUBRIQUE + 1], rubrique, LONGUEUR_RUBRIQUE + 1, virgule
+        elif self.texte.format == FORMAT_EDI:
+            code = ligne[:LONGUEUR_RUBRIQUE_EDI]
+            rubrique = self._rubrique(code, RE_RUBRIQUE_EDI)
+            if rubrique is not None:
+                return code, rubrique, LONGUEUR_RUBRIQUE_EDI, False
+        return None
+
+    def _rubrique(self, code: bytes, pattern) -> Optional[str]:
+        """Rubrique standard d'un code en octets (None si non ASCII ou invalide)"""
+        if not code.isascii():
+            return None
+        code = code.decode('ascii')
+        return self.texte._rubriques.get(code) or self.texte._rubrique(code, pattern)
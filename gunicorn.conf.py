@@ -0,0 +1,29 @@
+"""
+Configuration gunicorn (chargée automatiquement depuis le dossier courant)
+Active le mode multi-processus de prometheus_client : chaque worker écrit ses métriques
+dans PROMETHEUS_MULTIPROC_DIR et /metrics agrège tous les workers (voir dsn_metrics).
+"""
+
+import os
+import shutil
+import tempfile
+
+# Dossier partagé des métriques (doit être positionné avant le chargement de l'application)
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'dsn_prometheus')
+)
+
+
+def on_starting(server):
+    """Repart d'un dossier de métriques vide à chaque démarrage du serveur"""
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Libère les métriques 'live' d'un worker arrêté (les compteurs sont conservés)"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
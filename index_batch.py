@@ -0,0 +1,251 @@
+"""
+Calcul de l'Index Égalité en lot pour une arborescence d'entreprises
+
+Parcourt un dossier organisé en <SIRET>/<YYYYMM>.dsn, regroupe les fichiers par
+entreprise et calcule l'Index (get_results_multi_mois, ou get_results pour un seul mois)
+de chaque entreprise sur un pool de processus. Chaque entreprise produit une ligne CSV
+ou JSONL, écrite dès qu'elle est calculée.
+
+Reprise : chaque SIRET terminé est ajouté au fichier de reprise (par défaut
+<sortie>.reprise). Une exécution relancée avec la même sortie ignore les entreprises
+déjà calculées et complète le fichier de sortie.
+
+Usage :
+    python index_batch.py RACINE [--sortie index.csv] [--format csv|jsonl]
+                                 [--workers N] [--types 003,001]
+                                 [--date-reference 2024-12-31]
+                                 [--reprise index.csv.reprise] [--recommencer]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dsn_api import date_reference_api
+from dsn_parser import DSNParser
+
+# Extensions des fichiers DSN d'une entreprise
+EXTENSIONS_DSN = ('.dsn', '.txt', '.edi')
+
+# Colonnes des lignes produites (CSV et JSONL)
+COLONNES = (
+    'siret', 'nb_mois', 'premier_mois', 'dernier_mois', 'nb_salaries',
+    'score_total', 'score_max',
+    'indicateur_1', 'indicateur_2', 'indicateur_3', 'indicateur_4', 'indicateur_5',
+    'lignes', 'octets', 'secondes', 'erreur',
+)
+
+# Intervalle (secondes) entre deux lignes d'avancement
+INTERVALLE_AVANCEMENT = 10.0
+
+
+def lister_entreprises(racine: str) -> Dict[str, List[str]]:
+    """
+    Fichiers DSN de chaque entreprise d'une arborescence <SIRET>/<YYYYMM>.dsn
+
+    Returns:
+        SIRET -> chemins des fichiers triés par nom (donc par mois), SIRET triés
+    """
+    entreprises = {}
+    for dossier in sorted(os.scandir(racine), key=lambda entree: entree.name):
+        if not dossier.is_dir() or dossier.name.startswith('.'):
+            continue
+        chemins = sorted(
+            entree.path for entree in os.scandir(dossier.path)
+            if entree.is_file() and entree.name.lower().endswith(EXTENSIONS_DSN)
+        )
+        if chemins:
+            entreprises[dossier.name] = chemins
+    return entreprises
+
+
+def calculer_entreprise(siret: str, chemins: List[str], types_filtres: List[str],
+                        date_reference: Optional[str]) -> Dict[str, Any]:
+    """
+    Index Égalité d'une entreprise (exécuté dans un processus du pool)
+
+    Les mois sont parsés à la suite dans le processus : le parallélisme se fait entre
+    entreprises. Une erreur est renvoyée dans la colonne erreur, sans interrompre le lot.
+    """
+    debut = time.perf_counter()
+    ligne = {colonne: None for colonne in COLONNES}
+    ligne.update(siret=siret, nb_mois=len(chemins),
+                 premier_mois=_mois(chemins[0]), dernier_mois=_mois(chemins[-1]),
+                 octets=sum(os.path.getsize(chemin) for chemin in chemins))
+
+    try:
+        parsers = [DSNParser.lean().parse(chemin) for chemin in chemins]
+        if len(parsers) == 1:
+            resultats = parsers[0].get_results(types_filtres=types_filtres, date_reference=date_reference,
+                                               complet=False)
+        else:
+            resultats = parsers[0].get_results_multi_mois(parsers_list=parsers, types_filtres=types_filtres,
+                                                          date_reference=date_reference, complet=False)
+        ligne.update(_scores(resultats))
+        ligne['nb_salaries'] = resultats['summary']['nb_salaries']
+        ligne['lignes'] = sum(parser.stats['total_lines'] for parser in parsers)
+    except Exception as e:
+        ligne['erreur'] = f"{type(e).__name__}: {e}"
+
+    ligne['secondes'] = round(time.perf_counter() - debut, 3)
+    return ligne
+
+
+def _mois(chemin: str) -> str:
+    """Mois d'un fichier <YYYYMM>.dsn (nom du fichier sans extension)"""
+    return os.path.splitext(os.path.basename(chemin))[0]
+
+
+def _scores(resultats: Dict[str, Any]) -> Dict[str, Any]:
+    """Scores des indicateurs et total (mêmes règles que la page egalite_hf)"""
+    scores = {
+        'indicateur_1': resultats['index_officiel']['score'],
+        'indicateur_5': resultats['indicateur_top10']['score'],
+    }
+    score_total = scores['indicateur_1'] + scores['indicateur_5']
+    score_max = 50
+
+    # Indicateurs 2, 3 et 4 : comptés seulement s'ils sont calculables (plusieurs mois)
+    for colonne, cle, points in (('indicateur_2', 'indicateur_augmentations', 20),
+                                 ('indicateur_3', 'indicateur_promotions', 15),
+                                 ('indicateur_4', 'indicateur_conge_maternite', 15)):
+        indicateur = resultats[cle]
+        if indicateur.get('calculable'):
+            scores[colonne] = indicateur['score']
+            score_total += indicateur['score']
+            score_max += points
+
+    scores['score_total'] = score_total
+    scores['score_max'] = score_max
+    return scores
+
+
+def lire_reprise(chemin: str) -> set:
+    """SIRET déjà calculés lors d'une exécution précédente"""
+    if not os.path.exists(chemin):
+        return set()
+    with open(chemin, 'r', encoding='utf-8') as f:
+        return {ligne.strip() for ligne in f if ligne.strip()}
+
+
+class Sortie:
+    """Écriture des lignes (CSV ou JSONL) et du fichier de reprise, ligne par ligne"""
+
+    def __init__(self, chemin: str, format_sortie: str, chemin_reprise: str, reprendre: bool):
+        mode = 'a' if reprendre else 'w'
+        nouveau = not reprendre or not os.path.exists(chemin) or os.path.getsize(chemin) == 0
+        self.format = format_sortie
+        self.fichier = open(chemin, mode, encoding='utf-8', newline='')
+        self.reprise = open(chemin_reprise, mode, encoding='utf-8')
+        if self.format == 'csv':
+            self.csv = csv.DictWriter(self.fichier, fieldnames=COLONNES)
+            if nouveau:
+                self.csv.writeheader()
+
+    def ecrire(self, ligne: Dict[str, Any]):
+        """Écrit la ligne d'une entreprise, puis la marque comme terminée"""
+        if self.format == 'csv':
+            self.csv.writerow(ligne)
+        else:
+            self.fichier.write(json.dumps(ligne, ensure_ascii=False) + '\n')
+        self.fichier.flush()
+        self.reprise.write(ligne['siret'] + '\n')
+        self.reprise.flush()
+
+    def fermer(self):
+        self.fichier.close()
+        self.reprise.close()
+
+
+def executer(taches: List[Tuple[str, List[str]]], types_filtres: List[str],
+             date_reference: Optional[str], workers: int) -> Iterator[Dict[str, Any]]:
+    """Calcule les entreprises sur le pool de processus, dans l'ordre où elles se terminent"""
+    if workers <= 1:
+        for siret, chemins in taches:
+            yield calculer_entreprise(siret, chemins, types_filtres, date_reference)
+        return
+
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError) as e:
+        # Environnement sans multiprocessing (ex: sandbox) : repli séquentiel
+        print(f"Calcul parallèle indisponible, repli séquentiel : {e}")
+        yield from executer(taches, types_filtres, date_reference, 1)
+        return
+
+    with executor:
+        futures = [executor.submit(calculer_entreprise, siret, chemins, types_filtres, date_reference)
+                   for siret, chemins in taches]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index Égalité en lot (arborescence SIRET/YYYYMM.dsn)")
+    parser.add_argument('racine', help="Dossier contenant un sous-dossier par SIRET")
+    parser.add_argument('--sortie', default='index_batch.csv', help="Fichier des résultats (une ligne par entreprise)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'),
+                        help="Format de sortie (par défaut : extension de --sortie, sinon csv)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument('--types', default='003', help="Types de rémunération inclus, séparés par des virgules")
+    parser.add_argument('--date-reference', help="Date de référence des âges (YYYY-MM-DD ou DDMMYYYY)")
+    parser.add_argument('--reprise', help="Fichier de reprise (par défaut : <sortie>.reprise)")
+    parser.add_argument('--recommencer', action='store_true',
+                        help="Ignorer le fichier de reprise et réécrire la sortie")
+    args = parser.parse_args()
+
+    format_sortie = args.format or ('jsonl' if args.sortie.endswith(('.jsonl', '.json')) else 'csv')
+    chemin_reprise = args.reprise or args.sortie + '.reprise'
+    types_filtres = [code.strip() for code in args.types.split(',') if code.strip()]
+    try:
+        date_reference = date_reference_api(args.date_reference)
+    except ValueError:
+        parser.error("--date-reference invalide (YYYY-MM-DD ou DDMMYYYY)")
+
+    entreprises = lister_entreprises(args.racine)
+    deja_faites = set() if args.recommencer else lire_reprise(chemin_reprise)
+    taches = [(siret, chemins) for siret, chemins in entreprises.items() if siret not in deja_faites]
+    print(f"{len(entreprises)} entreprise(s) trouvée(s), {len(entreprises) - len(taches)} déjà calculée(s), "
+          f"{len(taches)} à calculer sur {args.workers} processus")
+
+    sortie = Sortie(args.sortie, format_sortie, chemin_reprise, reprendre=not args.recommencer)
+    debut = time.perf_counter()
+    dernier_avancement = debut
+    nb = nb_erreurs = nb_fichiers = lignes = octets = 0
+    try:
+        for ligne in executer(taches, types_filtres, date_reference, args.workers):
+            sortie.ecrire(ligne)
+            nb += 1
+            nb_fichiers += ligne['nb_mois']
+            lignes += ligne['lignes'] or 0
+            octets += ligne['octets'] or 0
+            if ligne['erreur']:
+                nb_erreurs += 1
+                print(f"Erreur {ligne['siret']} : {ligne['erreur']}")
+
+            maintenant = time.perf_counter()
+            if maintenant - dernier_avancement >= INTERVALLE_AVANCEMENT:
+                dernier_avancement = maintenant
+                debit = nb / (maintenant - debut)
+                print(f"  {nb}/{len(taches)} entreprises, {debit:.1f}/s, "
+                      f"reste ~{(len(taches) - nb) / debit / 60:.1f} min")
+    finally:
+        sortie.fermer()
+
+    duree = time.perf_counter() - debut
+    print(f"\n{nb} entreprise(s) calculée(s) en {duree:.1f} s ({nb_erreurs} en erreur)")
+    if duree > 0 and nb:
+        print(f"  {nb / duree:.2f} entreprises/s, {nb_fichiers / duree:.1f} fichiers/s, "
+              f"{lignes / duree:,.0f} lignes/s, {octets / duree / (1024 * 1024):.1f} Mo/s")
+    print(f"Résultats : {args.sortie} ({format_sortie}), reprise : {chemin_reprise}")
+    if nb_erreurs:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Tests du moteur de l'évolution de l'effectif (dsn_effectif.EffectifEngine)
+Les tables des salariés sont construites à la main via table_salaries() sur des
+dictionnaires : aucun fichier DSN ni parser n'est nécessaire.
+
+Lancement : python -m pytest -q test_dsn_effectif.py (ou python -m unittest test_dsn_effectif)
+"""
+
+import unittest
+
+import dsn_dates
+from dsn_effectif import EffectifEngine, MoisEffectif, table_salaries
+
+
+def salarie(nir='', matricule='', naissance=None, embauche=None, sortie=None, groupe_code=None):
+    """Salarié minimal, au format des dictionnaires de stats['salaries']"""
+    return {
+        'nir': nir,
+        'matricule': matricule,
+        'nom': 'NOM',
+        'prenom': 'PRENOM',
+        'groupe_code': groupe_code,
+        'date_naissance_int': naissance,
+        'date_embauche_int': embauche,
+        'date_sortie_int': sortie,
+    }
+
+
+def mois(date_declaration_int, *salaries, label='DSN'):
+    return MoisEffectif(label, label, date_declaration_int, table_salaries(salaries))
+
+
+def effectif_pyramide(evolution, sexe):
+    """Tranche -> nombre de salariés du sexe donné ('hommes' / 'femmes') dans la pyramide"""
+    pyramide = evolution['pyramide']
+    return {tranche: nb for tranche, nb in zip(pyramide['tranches'], pyramide[sexe]) if nb}
+
+
+class TestTableSalaries(unittest.TestCase):
+
+    def test_sexe_et_identification(self):
+        table = table_salaries([
+            salarie(nir='1850575123456', matricule='A1'),
+            salarie(nir='2900175123456'),
+            salarie(matricule='B2'),
+            salarie(),
+        ])
+        self.assertEqual([(ligne[0], ligne[1]) for ligne in table],
+                         [(True, 1), (True, 2), (True, 0), (False, 0)])
+
+
+class TestAgesFinDeMois(unittest.TestCase):
+
+    def test_age_au_29_fevrier(self):
+        # Février 2024 : référence au 29/02, l'anniversaire du 29/02 est atteint
+        resultat, pyramide = EffectifEngine().calculer_mois(mois(20240201,
+            salarie(nir='1000299123456', matricule='A', naissance=20000229),
+            salarie(nir='1000399123456', matricule='B', naissance=20000301),
+        ), True)
+        self.assertEqual([ligne.age for ligne in resultat['salaries_details']], [24, 23])
+        self.assertEqual(pyramide['date_reference'], '29/02/2024')
+
+    def test_age_au_28_fevrier_annee_non_bissextile(self):
+        # Février 2023 : référence au 28/02, l'anniversaire du 29/02 n'est pas encore atteint
+        resultat, pyramide = EffectifEngine().calculer_mois(mois(20230201,
+            salarie(nir='1000299123456', matricule='A', naissance=20000229),
+        ), True)
+        self.assertEqual(resultat['salaries_details'][0].age, 22)
+        self.assertEqual(pyramide['date_reference'], '28/02/2023')
+
+    def test_age_au_dernier_jour_du_mois_declare(self):
+        # Mars 2024 déclaré au 01/03 : l'âge est calculé au 31/03, pas au jour de la déclaration
+        resultat, _ = EffectifEngine().calculer_mois(mois(20240301,
+            salarie(nir='2900375123456', matricule='A', naissance=19900331),
+        ), False)
+        self.assertEqual(dsn_dates.fin_de_mois(20240301), 20240331)
+        self.assertEqual(resultat['salaries_details'][0].age, 34)
+        self.assertEqual(resultat['age_moyen_femmes'], 34)
+
+
+class TestAgeAffiche(unittest.TestCase):
+
+    def test_age_affiche_seulement_si_sexe_connu(self):
+        resultat, _ = EffectifEngine().calculer_mois(mois(20240101,
+            salarie(nir='1800175123456', matricule='H', naissance=19800115),
+            salarie(nir='7800175123456', matricule='X', naissance=19800115),
+            salarie(matricule='M', naissance=19800115),
+        ), False)
+        self.assertEqual([ligne.age for ligne in resultat['salaries_details']], [44, '', ''])
+        # Sans sexe connu, le salarié n'entre ni dans l'effectif H/F ni dans les âges moyens
+        self.assertEqual(resultat['effectif_total'], 1)
+        self.assertEqual(resultat['age_moyen'], 44)
+
+
+class TestPyramide(unittest.TestCase):
+
+    def test_pyramide_compte_les_salaries_non_identifies(self):
+        evolution = EffectifEngine().calculer([mois(20240101,
+            salarie(nir='1800175123456', matricule='A', naissance=19800115),
+            salarie(nir='2950175123456', naissance=19950115),
+            # Ni matricule ni NIR exploitable : hors effectif, mais compté dans la pyramide
+            salarie(nir='', naissance=19700115),
+        )])
+        self.assertEqual(evolution['effectif_total'], [2])
+        self.assertEqual(effectif_pyramide(evolution, 'hommes'), {'40-44': 1})
+        self.assertEqual(effectif_pyramide(evolution, 'femmes'), {'25-29': 1})
+        # Âge moyen global : pyramide (tous les âges connus), non identifiés compris
+        self.assertEqual(evolution['stats']['age_moyen'], round((44 + 29 + 54) / 3))
+
+    def test_pyramide_du_dernier_mois_seulement(self):
+        evolution = EffectifEngine().calculer([
+            mois(20240101, salarie(nir='1800175123456', matricule='A', naissance=19800115), label='JAN'),
+            mois(20240201, salarie(nir='2950175123456', matricule='B', naissance=19950115), label='FEV'),
+        ])
+        self.assertEqual(evolution['pyramide']['date_reference'], '29/02/2024')
+        self.assertEqual(effectif_pyramide(evolution, 'hommes'), {})
+        self.assertEqual(effectif_pyramide(evolution, 'femmes'), {'25-29': 1})
+
+
+class TestMoisNonDates(unittest.TestCase):
+
+    def test_mois_non_date_trie_en_dernier(self):
+        # dsn_analyses.analyser_evolution_effectif place les fichiers sans date à la fin :
+        # le dernier mois n'est pas daté, aucune pyramide ni date de référence
+        sal = salarie(nir='1800175123456', matricule='A', naissance=19800115, embauche=20240110)
+        evolution = EffectifEngine().calculer([
+            mois(20240101, sal, label='JAN'),
+            mois(None, sal, label='SANS DATE'),
+        ])
+        self.assertEqual(evolution['mois'], ['JAN', 'SANS DATE'])
+        self.assertEqual(evolution['effectif_total'], [1, 1])
+        self.assertNotIn('pyramide', evolution)
+        self.assertNotIn('date_reference_csp', evolution)
+        self.assertNotIn('age_moyen', evolution['stats'])
+
+    def test_mois_non_date_sans_age_ni_mouvement(self):
+        resultat, pyramide = EffectifEngine().calculer_mois(mois(None,
+            salarie(nir='1800175123456', matricule='A', naissance=19800115,
+                    embauche=20240110, sortie=20240120),
+        ), False)
+        self.assertIsNone(pyramide)
+        self.assertEqual((resultat['entrees'], resultat['sorties']), (0, 0))
+        self.assertEqual(resultat['salaries_details'][0].age, '')
+        self.assertEqual(resultat['age_moyen'], 0)
+
+    def test_sans_details(self):
+        evolution = EffectifEngine(details=False).calculer([
+            mois(20240101, salarie(nir='1800175123456', matricule='A', embauche=20240110)),
+        ])
+        self.assertEqual(evolution['entrees'], [1])
+        self.assertNotIn('salaries_details', evolution)
+        self.assertNotIn('entrees_details', evolution)
+
+
+if __name__ == '__main__':
+    unittest.main()
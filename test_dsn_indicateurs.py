@@ -0,0 +1,77 @@
+"""
+Parité du moteur vectorisé des indicateurs (dsn_indicateurs.IndicateursFrame) avec les
+calculs par boucle de DSNParser (calculer_index_officiel, calculer_indicateur_top10,
+calculer_egalite_hf), conservés comme référence
+
+Les fichiers sont générés par dsn_synthetique (comme pour benchmark_dsn) dans un
+dossier temporaire ; les résultats doivent être identiques, valeur pour valeur.
+
+Lancement : python -m pytest -q test_dsn_indicateurs.py (ou python -m unittest test_dsn_indicateurs)
+"""
+
+import shutil
+import tempfile
+import unittest
+
+from dsn_indicateurs import IndicateursFrame
+from dsn_parser import DSNParser
+from dsn_synthetique import generer_serie
+
+# Filtres de types de rémunération comparés (None = tous les types)
+FILTRES = (None, ['003'], ['001', '002'], ['999'])
+
+# Dates de référence comparées (None = fin de période de la DSN)
+DATES_REFERENCE = (None, '01012000', '31122040')
+
+
+class TestParite(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dossier = tempfile.mkdtemp()
+        chemins = generer_serie(cls.dossier, nb_salaries=400, nb_mois=2, lignes_paie=4,
+                                nb_etablissements=2, graine=7)
+        cls.parsers = [DSNParser.lean().parse(chemin) for chemin in chemins]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dossier, ignore_errors=True)
+
+    def comparer(self, parser: DSNParser):
+        for date_reference in DATES_REFERENCE:
+            # Les boucles lisent la tranche d'âge écrite dans les salariés (parser non partagé)
+            parser.recalculer_tranches_age(date_reference)
+            tranches_age = parser.tranches_age(date_reference)
+            for filtre in FILTRES:
+                with self.subTest(date_reference=date_reference, filtre=filtre):
+                    indicateurs = IndicateursFrame(parser.stats['salaries'], filtre, tranches_age)
+                    self.assertEqual(indicateurs.egalite_hf(), parser.calculer_egalite_hf(filtre))
+                    self.assertEqual(indicateurs.index_officiel(), parser.calculer_index_officiel(filtre))
+                    self.assertEqual(indicateurs.top10(), parser.calculer_indicateur_top10(filtre))
+
+    def test_parite_mois_generes(self):
+        for parser in self.parsers:
+            self.comparer(parser)
+
+    def test_parite_cas_limites(self):
+        # Sexe inconnu, salariés sans rémunération et sans date de naissance
+        parser = DSNParser.lean().parse(generer_serie(tempfile.mkdtemp(dir=self.dossier), nb_salaries=60,
+                                                      nb_mois=1, graine=11)[0])
+        for idx, salarie in enumerate(parser.stats['salaries']):
+            if idx % 7 == 0:
+                salarie['sexe'] = None
+            if idx % 5 == 0:
+                salarie['remunerations_par_type'] = {}
+            if idx % 9 == 0:
+                del salarie['date_naissance']
+                del salarie['date_naissance_int']
+        self.comparer(parser)
+
+    def test_parite_moins_de_dix_remunerations(self):
+        parser = DSNParser.lean().parse(generer_serie(tempfile.mkdtemp(dir=self.dossier), nb_salaries=8,
+                                                      nb_mois=1, graine=3)[0])
+        self.comparer(parser)
+
+
+if __name__ == '__main__':
+    unittest.main()